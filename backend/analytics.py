@@ -0,0 +1,138 @@
+"""
+Content Analytics Aggregation
+Computes every dashboard metric in a single round trip using conditional
+aggregates, optionally reading lifetime counters from a per-user summary
+row that is kept up to date incrementally
+"""
+import os
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import case, func, select, true, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import ContentGeneration, SavedContent, UsageStats, UserAnalyticsSummary
+
+PLATFORMS = ["twitter", "linkedin", "instagram"]
+
+# Read lifetime counters from user_analytics_summary instead of counting rows
+ANALYTICS_SUMMARY_ENABLED = os.getenv("ANALYTICS_SUMMARY_ENABLED", "false").lower() == "true"
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _platform_usage(user_id: int, since: datetime):
+    """One row with a copy count per platform over the window"""
+    return select(
+        *[_count_if(UsageStats.platform == platform).label(platform) for platform in PLATFORMS]
+    ).where(
+        UsageStats.user_id == user_id,
+        UsageStats.action == "copy",
+        UsageStats.created_at >= since
+    ).subquery()
+
+
+def _saved_totals(user_id: int):
+    return select(
+        func.count().label("saved_content"),
+        _count_if(SavedContent.is_favorite == True).label("favorites")
+    ).where(SavedContent.user_id == user_id).subquery()
+
+
+def _format(row) -> Dict:
+    return {
+        "total_generations": int(row["total_generations"]),
+        "recent_generations": int(row["recent_generations"]),
+        "platform_usage": {platform: int(row[platform]) for platform in PLATFORMS},
+        "saved_content": int(row["saved_content"]),
+        "favorites": int(row["favorites"]),
+    }
+
+
+def get_content_analytics(db: Session, user_id: int, since: datetime) -> Dict:
+    """Generation, platform and saved-content metrics for one user.
+
+    Each table is reduced to a single row by its own aggregate and the rows
+    are cross joined, so the whole dashboard is one statement.
+    """
+    if ANALYTICS_SUMMARY_ENABLED:
+        return _get_content_analytics_from_summary(db, user_id, since)
+
+    generations = select(
+        func.count().label("total_generations"),
+        _count_if(ContentGeneration.created_at >= since).label("recent_generations")
+    ).where(ContentGeneration.user_id == user_id).subquery()
+    usage = _platform_usage(user_id, since)
+    saved = _saved_totals(user_id)
+
+    statement = select(generations, usage, saved).select_from(
+        generations.join(usage, true()).join(saved, true())
+    )
+    return _format(db.execute(statement).mappings().one())
+
+
+def _get_content_analytics_from_summary(db: Session, user_id: int, since: datetime) -> Dict:
+    """Windowed metrics are still aggregated; lifetime counters come from the summary row"""
+    summary = UserAnalyticsSummary.__table__
+    recent = select(
+        func.count().label("recent_generations")
+    ).where(
+        ContentGeneration.user_id == user_id,
+        ContentGeneration.created_at >= since
+    ).subquery()
+    usage = _platform_usage(user_id, since)
+
+    statement = select(
+        recent, usage,
+        summary.c.total_generations, summary.c.saved_content, summary.c.favorites
+    ).select_from(
+        recent.join(usage, true()).outerjoin(summary, summary.c.user_id == user_id)
+    )
+    row = dict(db.execute(statement).mappings().one())
+
+    if row["total_generations"] is None:
+        row.update(refresh_analytics_summary(db, user_id))
+
+    return _format(row)
+
+
+def refresh_analytics_summary(db: Session, user_id: int) -> Dict:
+    """Recount a user's lifetime counters and store them in the summary row"""
+    generations = select(
+        func.count().label("total_generations")
+    ).where(ContentGeneration.user_id == user_id).subquery()
+    saved = _saved_totals(user_id)
+
+    counts = dict(db.execute(
+        select(generations, saved).select_from(generations.join(saved, true()))
+    ).mappings().one())
+
+    table = UserAnalyticsSummary.__table__
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    statement = insert(table).values(user_id=user_id, **counts)
+    statement = statement.on_conflict_do_update(index_elements=[table.c.user_id], set_=counts)
+    db.execute(statement)
+    db.commit()
+
+    return counts
+
+
+def bump_analytics_summary(db: Session, user_id: int, generations: int = 0, saved_content: int = 0, favorites: int = 0):
+    """Apply deltas to the user's summary row inside the caller's transaction.
+
+    Users without a row are untouched; their row is seeded with exact
+    counts on first read. This runs even when the summary is disabled so
+    existing rows never go stale if it is switched back on.
+    """
+    table = UserAnalyticsSummary.__table__
+    db.execute(
+        update(table).where(table.c.user_id == user_id).values(
+            total_generations=table.c.total_generations + generations,
+            saved_content=table.c.saved_content + saved_content,
+            favorites=table.c.favorites + favorites,
+            updated_at=func.now()
+        )
+    )
@@ -6,9 +6,13 @@ from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from database import get_db
 from models import User
 from db_utils import db_retry
+from db_executor import run_db
+from identity_cache import identity_cache
+from subscription_manager import subscription_manager
 import os
 from dotenv import load_dotenv
 import requests
@@ -70,18 +74,20 @@ def create_refresh_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str, token_type: str = "access"):
-    """Verify JWT token"""
+def decode_token(token: str, token_type: str = "access") -> Optional[dict]:
+    """Verified JWT claims (``sub`` email, ``uid`` user id on newer tokens), or None"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        token_type_check: str = payload.get("type")
-        
-        if email is None or token_type_check != token_type:
-            return None
-        return email
     except PyJWTError:
         return None
+    if payload.get("sub") is None or payload.get("type") != token_type:
+        return None
+    return payload
+
+def verify_token(token: str, token_type: str = "access"):
+    """Verify JWT token"""
+    payload = decode_token(token, token_type)
+    return payload["sub"] if payload else None
 
 @db_retry(max_retries=3, delay=0.5)
 def get_user_by_email(db: Session, email: str):
@@ -189,41 +195,41 @@ async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
-    """Get current authenticated user with real-time subscription checking"""
+    """Get current authenticated user with subscription expiry applied
+
+    Resolved users are held briefly in the identity cache, keyed by the
+    token's email and user id, so repeat requests with the same token skip
+    the user lookup entirely. Tokens issued before they carried a user id
+    are looked up every time.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        token = credentials.credentials
-        email = verify_token(token, "access")
-        if email is None:
-            raise credentials_exception
-    except PyJWTError:
+    claims = decode_token(credentials.credentials, "access")
+    if claims is None:
         raise credentials_exception
+    email, user_id = claims["sub"], claims.get("uid")
     
-    user = get_user_by_email(db, email=email)
-    if user is None:
-        raise credentials_exception
+    cached = identity_cache.get(email, user_id) if user_id is not None else None
+    if cached is not None:
+        user = identity_cache.attach(db, cached)
+    else:
+        # Off the event loop, so connection retries can back off without stalling other requests
+        user = await run_db(get_user_by_email, db, email=email)
+        # The email may have moved to a different account since the token was issued
+        if user is None or (user_id is not None and user.id != user_id):
+            raise credentials_exception
+        if user_id is not None:
+            identity_cache.put(email, user)
     
-    # Real-time subscription expiration check
-    try:
-        from subscription_manager import subscription_manager
-        subscription_status = subscription_manager.check_user_subscription_status(user.id, db)
-        
-        # Update user's premium status if it changed
-        if subscription_status != user.is_premium:
-            user.is_premium = subscription_status
-            # Note: The subscription_manager already commits the changes
-            
-            # Refresh user object to get updated data
-            db.refresh(user)
-            
-    except Exception as e:
-        # Log the error but don't fail authentication
-        print(f"Warning: Subscription check failed for user {user.id}: {e}")
+    # Subscription expiry is precomputed in premium_until, so this is an in-memory
+    # comparison. The downgrade itself (and its PaymentHistory record) is written by
+    # the periodic sweep; here we only hide premium for the rest of this request.
+    if user.is_premium and not subscription_manager.has_premium_access(user):
+        set_committed_value(user, "is_premium", False)
     
     return user
 
@@ -258,15 +264,9 @@ def check_rate_limit(user: User, db: Session) -> bool:
         limit = 20 if user.is_premium else 2
         
         # Check usage in last 24 hours
-        from datetime import datetime, timedelta, timezone
-        from models import UsageStats
+        from quota import get_usage_in_window
         
-        twenty_four_hours_ago = datetime.now(timezone.utc) - timedelta(hours=24)
-        recent_usage = db.query(UsageStats).filter(
-            UsageStats.user_id == user.id,
-            UsageStats.action == "generate",
-            UsageStats.created_at >= twenty_four_hours_ago
-        ).count()
+        recent_usage = get_usage_in_window(db, user.id, "generate", hours=24)
         
         return recent_usage < limit
         
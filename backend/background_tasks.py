@@ -10,6 +10,7 @@ from typing import Optional
 from sqlalchemy.orm import Session
 from database import get_db
 from subscription_manager import SubscriptionManager
+from quota import prune_usage_counters
 
 logger = logging.getLogger(__name__)
 
@@ -122,6 +123,11 @@ class BackgroundTaskManager:
             
             # Add cleanup tasks here as needed
             # For example: clean up old logs, temporary files, etc.
+            db = next(get_db())
+            try:
+                prune_usage_counters(db)
+            finally:
+                db.close()
             
             logger.info("Daily cleanup completed")
             
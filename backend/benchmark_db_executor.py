@@ -0,0 +1,136 @@
+"""
+Database Executor Load Benchmark
+Simulates concurrent repurpose-style requests (DB read, LLM await, DB
+write) and compares running the blocking DB calls inline on the event
+loop with running them on the database executor. Reports throughput and
+event loop lag, which is what every concurrent LLM await pays for.
+
+    python benchmark_db_executor.py                  # seeded SQLite + simulated network latency
+    BENCH_DATABASE_URL=postgresql://... python benchmark_db_executor.py
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from db_executor import DBExecutor
+
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "200"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "50"))
+LLM_SECONDS = float(os.getenv("BENCH_LLM_SECONDS", "0.5"))
+# Round trip added to each query against the local SQLite file, to stand in for a remote database
+SIMULATED_DB_LATENCY = float(os.getenv("BENCH_DB_LATENCY_SECONDS", "0.02"))
+WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "10"))
+
+LAG_TICK_SECONDS = 0.01
+
+READ_SQL = "SELECT COUNT(*) FROM bench_usage WHERE user_id = :user_id"
+WRITE_SQL = "INSERT INTO bench_usage (user_id, action) VALUES (:user_id, 'generate')"
+
+
+def make_engine():
+    url = os.getenv("BENCH_DATABASE_URL")
+    temp_dir = None
+    if not url:
+        temp_dir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(temp_dir.name, 'bench.db')}"
+
+    kwargs = {"pool_size": WORKERS, "max_overflow": 0}
+    if url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False}
+    engine = create_engine(url, **kwargs)
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS bench_usage"))
+        conn.execute(text("CREATE TABLE bench_usage (user_id INTEGER, action VARCHAR(20))"))
+        conn.execute(text("CREATE INDEX ix_bench_usage_user ON bench_usage (user_id)"))
+    return engine, temp_dir, url.startswith("sqlite")
+
+
+def db_call(db, sql: str, params: dict, simulate_latency: bool):
+    result = db.execute(text(sql), params)
+    if sql.startswith("INSERT"):
+        db.commit()
+    else:
+        result.all()
+    if simulate_latency:
+        time.sleep(SIMULATED_DB_LATENCY)
+
+
+async def measure_lag(samples: list, stop: asyncio.Event):
+    """Record how late a short sleep wakes up; blocking calls on the loop show up here"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_TICK_SECONDS)
+        samples.append(time.perf_counter() - start - LAG_TICK_SECONDS)
+
+
+async def run_mode(mode: str, session_factory, simulate_latency: bool):
+    executor = DBExecutor(max_workers=WORKERS)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def run_db_step(db, sql, params):
+        if mode == "executor":
+            await executor.run(db_call, db, sql, params, simulate_latency)
+        else:
+            db_call(db, sql, params, simulate_latency)
+
+    async def request(index: int):
+        async with semaphore:
+            db = session_factory()
+            try:
+                params = {"user_id": index % 20}
+                await run_db_step(db, READ_SQL, params)   # quota check / memory read
+                await asyncio.sleep(LLM_SECONDS)          # LLM completion
+                await run_db_step(db, WRITE_SQL, params)  # save generation
+            finally:
+                db.close()
+
+    lag_samples = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_lag(lag_samples, stop))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[request(index) for index in range(REQUESTS)])
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await lag_task
+    executor.shutdown()
+
+    lag_samples.sort()
+    return {
+        "throughput": REQUESTS / elapsed,
+        "elapsed": elapsed,
+        "lag_p50": lag_samples[len(lag_samples) // 2] if lag_samples else 0.0,
+        "lag_p99": lag_samples[int(len(lag_samples) * 0.99)] if lag_samples else 0.0,
+    }
+
+
+def main():
+    engine, temp_dir, is_sqlite = make_engine()
+    session_factory = sessionmaker(bind=engine)
+
+    print(f"[INFO] {REQUESTS} requests, concurrency {CONCURRENCY}, LLM {LLM_SECONDS}s, "
+          f"{WORKERS} executor workers{f', +{SIMULATED_DB_LATENCY}s per query' if is_sqlite else ''}\n")
+
+    print(f"{'mode':<9} {'req/s':>7} {'total s':>8} {'lag p50 ms':>11} {'lag p99 ms':>11}")
+    results = {}
+    for mode in ("inline", "executor"):
+        results[mode] = row = asyncio.run(run_mode(mode, session_factory, is_sqlite))
+        print(f"{mode:<9} {row['throughput']:>7.1f} {row['elapsed']:>8.2f} "
+              f"{row['lag_p50'] * 1000:>11.1f} {row['lag_p99'] * 1000:>11.1f}")
+
+    speedup = results["executor"]["throughput"] / results["inline"]["throughput"]
+    print(f"\n[INFO] Executor throughput: {speedup:.2f}x inline")
+
+    engine.dispose()
+    if temp_dir is not None:
+        temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
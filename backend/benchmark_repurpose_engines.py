@@ -0,0 +1,123 @@
+"""
+Repurpose Engine Benchmark
+Compares the per-platform fan-out engine with the single-call JSON engine
+on the same input: completions made, prompt/output tokens and wall-clock
+latency. Calls bypass the generation cache.
+
+    python benchmark_repurpose_engines.py                 # live, uses the configured LLM keys
+    python benchmark_repurpose_engines.py notes.md 5      # own input file, 5 rounds
+    BENCH_DRY_RUN=true python benchmark_repurpose_engines.py   # prompt sizes only, no LLM calls
+"""
+import asyncio
+import os
+import sys
+import time
+
+from content_compaction import content_compactor
+from routes import snippetstream_routes as routes
+
+PLATFORMS = ["twitter", "linkedin", "instagram"]
+
+SAMPLE_CONTENT = """Morning Plan:
+- [x] Ship the onboarding checklist
+- [x] Fix the Stripe webhook retries
+- [ ] Write the launch email
+- [ ] Record the demo video
+
+Evening Reflection:
+The webhook fix took four hours longer than planned because the retries were
+hitting a stale idempotency key. Onboarding shipped and three users finished
+it in the first hour. The launch email and demo slipped to tomorrow, which
+stings, but the product is finally in a state I'm not embarrassed to show.
+""" * 8
+
+SAMPLE_MEMORY = """Product: SnippetStream, turns daily founder logs into social posts.
+Audience: indie hackers and early-stage SaaS founders.
+Voice: candid, technical, a little self-deprecating. Never use 'synergy'.
+""" * 6
+
+
+def estimate_tokens(text: str) -> int:
+    return content_compactor.count_tokens(text or "")
+
+
+class CompletionRecorder:
+    """Stands in for safe_completion_async and tallies every call the engines make"""
+
+    def __init__(self, completion, dry_run: bool):
+        self.completion = completion
+        self.dry_run = dry_run
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    async def __call__(self, messages, max_tokens=2000, on_delta=None, use_cache=True):
+        self.calls += 1
+        self.input_tokens += sum(estimate_tokens(message["content"]) for message in messages)
+        if self.dry_run:
+            return None
+        result = await self.completion(messages, max_tokens=max_tokens, on_delta=on_delta, use_cache=False)
+        self.output_tokens += estimate_tokens(result)
+        return result
+
+
+async def run_engine(engine: str, content: str, dry_run: bool):
+    if dry_run and engine == "single":
+        # Without a reply the single-call engine would fall back; only its own prompt matters here
+        try:
+            await routes.create_all_platforms_async(PLATFORMS, content, None, SAMPLE_MEMORY)
+        except ValueError:
+            pass
+        return
+    await routes.generate_platforms(PLATFORMS, content, None, SAMPLE_MEMORY, engine)
+
+
+async def benchmark(content: str, rounds: int, dry_run: bool):
+    recorder = CompletionRecorder(routes.safe_completion_async, dry_run)
+    routes.safe_completion_async = recorder
+
+    print(f"[INFO] Input: {len(content)} chars, memory: {len(SAMPLE_MEMORY)} chars, {rounds} round(s)"
+          f"{' (dry run)' if dry_run else ''}\n")
+
+    summary = {}
+    for engine in routes.REPURPOSE_ENGINES:
+        latencies = []
+        totals = {"calls": 0, "input_tokens": 0, "output_tokens": 0}
+        for _ in range(rounds):
+            recorder.reset()
+            start = time.perf_counter()
+            await run_engine(engine, content, dry_run)
+            latencies.append(time.perf_counter() - start)
+            totals["calls"] += recorder.calls
+            totals["input_tokens"] += recorder.input_tokens
+            totals["output_tokens"] += recorder.output_tokens
+
+        latencies.sort()
+        summary[engine] = {key: value / rounds for key, value in totals.items()}
+        summary[engine]["p50"] = latencies[len(latencies) // 2]
+        summary[engine]["max"] = latencies[-1]
+
+    print(f"{'engine':<8} {'calls':>6} {'input tok':>10} {'output tok':>11} {'p50 s':>7} {'max s':>7}")
+    for engine, row in summary.items():
+        print(f"{engine:<8} {row['calls']:>6.1f} {row['input_tokens']:>10.0f} {row['output_tokens']:>11.0f} "
+              f"{row['p50']:>7.2f} {row['max']:>7.2f}")
+
+    fanout, single = summary["fanout"], summary["single"]
+    if fanout["input_tokens"]:
+        print(f"\n[INFO] Single-call input tokens: {single['input_tokens'] / fanout['input_tokens']:.0%} of fan-out")
+    if single["calls"] > 1:
+        print("[WARN] Single-call engine fell back to per-platform calls in some rounds")
+
+
+if __name__ == "__main__":
+    content = SAMPLE_CONTENT
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            content = f.read()
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    dry_run = os.getenv("BENCH_DRY_RUN", "false").lower() == "true"
+
+    asyncio.run(benchmark(content, rounds, dry_run))
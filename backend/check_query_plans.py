@@ -0,0 +1,304 @@
+"""
+Query Plan Check
+Runs EXPLAIN on the per-user hot queries against a seeded (or real)
+database and exits non-zero if any of them falls back to a sequential scan.
+Paged endpoints are checked with the SQL that pagination.paginate actually
+emits, first page and keyset (cursor) page, and additionally fail if the
+newest-first ORDER BY has to sort every row the user owns. Plans are taken
+after ANALYZE on realistically sized tables; the planner is never forced.
+
+    python check_query_plans.py                 # temporary seeded SQLite DB
+    CHECK_DATABASE_URL=postgresql://... python check_query_plans.py
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import re
+
+from sqlalchemy import create_engine, event, func, text
+from sqlalchemy.orm import Session, defer
+
+from models import Base, ContentGeneration, PaymentHistory, SavedContent
+from pagination import paginate
+
+USER_ID = 1
+# Large enough that an index beats a seq scan on cost alone
+SEED_USERS = 100
+SEED_ROWS_PER_USER = 1000
+# Below this many rows the planner's choices say little about production
+MIN_REALISTIC_ROWS = 10_000
+# Matches routes/content_routes.py
+HISTORY_PREVIEW_CHARS = 200
+
+# (name, table that must be reached through an index, SQL)
+HOT_QUERIES = [
+    (
+        "quota window (usage_stats)",
+        "usage_stats",
+        "SELECT COUNT(*) FROM usage_stats "
+        "WHERE user_id = :user_id AND action = 'generate' AND created_at >= :since",
+    ),
+    (
+        "quota window (usage_counters)",
+        "usage_counters",
+        "SELECT COALESCE(SUM(count), 0) FROM usage_counters "
+        "WHERE user_id = :user_id AND action = 'generate' AND bucket_start >= :bucket",
+    ),
+    (
+        "analytics generations this month",
+        "content_generations",
+        "SELECT COUNT(*) FROM content_generations "
+        "WHERE user_id = :user_id AND created_at >= :since",
+    ),
+    (
+        "analytics usage by platform",
+        "usage_stats",
+        "SELECT platform, COUNT(*) FROM usage_stats "
+        "WHERE user_id = :user_id AND action = 'copy' GROUP BY platform",
+    ),
+    (
+        "active subscription lookup",
+        "subscriptions",
+        "SELECT id FROM subscriptions WHERE user_id = :user_id AND status = 'active'",
+    ),
+]
+
+
+def seed(engine):
+    """Create the schema and fill the hot tables with production-sized per-user histories"""
+    Base.metadata.create_all(bind=engine)
+    now = datetime.now(timezone.utc)
+
+    with engine.begin() as conn:
+        for user_id in range(1, SEED_USERS + 1):
+            conn.execute(text(
+                "INSERT INTO users (id, email, username, is_active, is_premium) "
+                "VALUES (:id, :email, :username, 1, 0)"
+            ), {"id": user_id, "email": f"user{user_id}@example.com", "username": f"user{user_id}"})
+
+            # Rows come in pairs sharing a timestamp so the keyset's id tie-break is exercised
+            rows = [
+                {"user_id": user_id, "i": i, "created_at": now - timedelta(minutes=7 * (i // 2))}
+                for i in range(SEED_ROWS_PER_USER)
+            ]
+            conn.execute(text(
+                "INSERT INTO usage_stats (user_id, action, platform, created_at) "
+                "VALUES (:user_id, CASE WHEN :i % 2 = 1 THEN 'generate' ELSE 'copy' END, 'twitter', :created_at)"
+            ), rows)
+            conn.execute(text(
+                "INSERT INTO content_generations (user_id, original_content, created_at) "
+                "VALUES (:user_id, 'seed', :created_at)"
+            ), rows)
+            conn.execute(text(
+                "INSERT INTO saved_content (user_id, title, content_type, content, created_at) "
+                "VALUES (:user_id, 'seed', 'twitter', 'seed', :created_at)"
+            ), rows)
+            conn.execute(text(
+                "INSERT INTO payment_history (user_id, payment_id, amount, status, plan_type, billing_cycle, created_at) "
+                "VALUES (:user_id, 'seed_' || :user_id || '_' || :i, 9.0, 'completed', 'pro', 'monthly', :created_at)"
+            ), rows)
+
+            buckets = {}
+            for row in rows:
+                bucket = int(row["created_at"].timestamp() // 3600)
+                buckets[bucket] = buckets.get(bucket, 0) + 1
+            conn.execute(text(
+                "INSERT INTO usage_counters (user_id, action, bucket_start, count) "
+                "VALUES (:user_id, 'generate', :bucket, :count)"
+            ), [{"user_id": user_id, "bucket": bucket, "count": count} for bucket, count in buckets.items()])
+
+            conn.execute(text(
+                "INSERT INTO subscriptions (user_id, plan_type, status) VALUES (:user_id, 'pro', 'active')"
+            ), {"user_id": user_id})
+
+
+def analyze(engine, tables):
+    """Refresh planner statistics so plans reflect the real row counts"""
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+        else:
+            for table in sorted(tables):
+                conn.execute(text(f"ANALYZE {table}"))
+
+
+def busiest_user(engine):
+    """User with the most generations, so paged plans see a deep history"""
+    with engine.connect() as conn:
+        user_id = conn.execute(text(
+            "SELECT user_id FROM content_generations GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1"
+        )).scalar()
+    return user_id or USER_ID
+
+
+def paginated_queries(session, user_id):
+    """(name, table, query, model, entity, limit) for each endpoint that pages through paginate()"""
+    return [
+        (
+            # Same shape as get_content_history
+            "generation history page",
+            "content_generations",
+            session.query(
+                ContentGeneration,
+                func.substr(ContentGeneration.original_content, 1, HISTORY_PREVIEW_CHARS).label("preview"),
+                func.length(ContentGeneration.original_content).label("content_length"),
+            ).options(defer(ContentGeneration.original_content)).filter(ContentGeneration.user_id == user_id),
+            ContentGeneration,
+            lambda row: row[0],
+            20,
+        ),
+        (
+            "saved content page",
+            "saved_content",
+            session.query(SavedContent).filter(SavedContent.user_id == user_id),
+            SavedContent,
+            lambda row: row,
+            20,
+        ),
+        (
+            "payment history page",
+            "payment_history",
+            session.query(PaymentHistory).filter(PaymentHistory.user_id == user_id),
+            PaymentHistory,
+            lambda row: row,
+            50,
+        ),
+    ]
+
+
+def emitted_sql(engine, run):
+    """Result of ``run()`` and the last statement it sent to the driver, with its parameters"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        result = run()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return result, statements[-1]
+
+
+def explain(conn, dialect, statement, parameters):
+    """Plan lines for one statement exactly as the driver received it"""
+    if dialect == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        return [row[-1] for row in rows]
+    rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).fetchall()
+    return [row[0] for row in rows]
+
+
+def sequential_scans(dialect, plan, table):
+    """Plan lines that read ``table`` without an index"""
+    if dialect == "sqlite":
+        return [
+            line for line in plan
+            if line.startswith(f"SCAN {table}") and "INDEX" not in line
+        ]
+    return [line for line in plan if "Seq Scan" in line and f" on {table}" in line]
+
+
+def full_sorts(dialect, plan):
+    """Plan lines that sort the whole result instead of reading it in index order.
+
+    Sorting only the rows that tie on created_at (SQLite's "RIGHT PART OF
+    ORDER BY", Postgres' Incremental Sort) is fine for a page.
+    """
+    if dialect == "sqlite":
+        return [line for line in plan if "USE TEMP B-TREE FOR ORDER BY" in line]
+    return [line for line in plan if re.match(r"(->\s+)?Sort\s+\(", line.strip())]
+
+
+def report(name, plan, problems):
+    """Print one query's verdict and plan; returns 1 on failure"""
+    if problems:
+        print(f"[FAIL] {name}: {'; '.join(problems)}")
+    else:
+        print(f"[OK] {name}")
+    for line in plan:
+        print(f"      {line}")
+    return 1 if problems else 0
+
+
+def check_query_plans(database_url=None):
+    temp_dir = None
+    if not database_url:
+        temp_dir = tempfile.TemporaryDirectory()
+        database_url = f"sqlite:///{os.path.join(temp_dir.name, 'plans.db')}"
+        print(f"[INFO] Seeding temporary SQLite database at {database_url}")
+        engine = create_engine(database_url)
+        seed(engine)
+    else:
+        print("[INFO] Checking query plans against CHECK_DATABASE_URL")
+        engine = create_engine(database_url)
+        from migrations import create_missing_indexes
+        create_missing_indexes(engine)
+
+    tables = {table for _, table, _ in HOT_QUERIES} | {"content_generations", "saved_content", "payment_history"}
+    analyze(engine, tables)
+
+    dialect = engine.dialect.name
+    user_id = busiest_user(engine)
+    now = datetime.now(timezone.utc)
+    params = {
+        "user_id": user_id,
+        "since": now - timedelta(hours=24),
+        "bucket": int(now.timestamp() // 3600) - 24,
+    }
+
+    if temp_dir is None:
+        with engine.connect() as conn:
+            for table in sorted(tables):
+                rows = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+                if rows < MIN_REALISTIC_ROWS:
+                    print(f"[WARN] {table} has only {rows} rows; its plan may not match production")
+
+    failures = 0
+    checked = 0
+    with engine.connect() as conn:
+        for name, table, sql in HOT_QUERIES:
+            _, (statement, parameters) = emitted_sql(engine, lambda: conn.execute(text(sql), params).fetchall())
+            plan = explain(conn, dialect, statement, parameters)
+            problems = [f"sequential scan on {table}"] if sequential_scans(dialect, plan, table) else []
+            failures += report(name, plan, problems)
+            checked += 1
+
+    with Session(engine) as session:
+        for name, table, query, model, entity, limit in paginated_queries(session, user_id):
+            (_, next_cursor), first_page = emitted_sql(engine, lambda: paginate(query, model, limit, entity=entity))
+            pages = [(name, first_page)]
+            if next_cursor:
+                _, cursor_page = emitted_sql(
+                    engine, lambda: paginate(query, model, limit, cursor=next_cursor, entity=entity)
+                )
+                pages.append((f"{name} (cursor)", cursor_page))
+            else:
+                print(f"[WARN] {name}: user {user_id} has a single page, keyset query not checked")
+
+            for page_name, (statement, parameters) in pages:
+                plan = explain(session.connection(), dialect, statement, parameters)
+                problems = []
+                if sequential_scans(dialect, plan, table):
+                    problems.append(f"sequential scan on {table}")
+                if full_sorts(dialect, plan):
+                    problems.append("sorts every row instead of reading in index order")
+                failures += report(page_name, plan, problems)
+                checked += 1
+
+    engine.dispose()
+    if temp_dir is not None:
+        temp_dir.cleanup()
+
+    if failures:
+        print(f"\n[FAIL] {failures} of {checked} hot queries use a sequential scan or a full sort")
+    else:
+        print(f"\n[OK] All {checked} hot queries use an index")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if check_query_plans(os.getenv("CHECK_DATABASE_URL")) else 0)
@@ -0,0 +1,238 @@
+"""
+Content Compaction
+Shrinks repurpose input before it is prompted: counts tokens, drops
+boilerplate and duplicate lines, and when the text is still over budget
+keeps the most salient paragraphs (extractive, local, no API call) while
+always keeping the daily-log structure the prompts rely on
+"""
+import logging
+import math
+import os
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+
+# Exact token counts need the optional "tiktoken" package; otherwise estimate
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+# A paragraph is trimmed into the leftover budget only if at least this much is left
+MIN_TRIM_TOKENS = 16
+SENTENCE_END_RE = re.compile(r"[.!?][\"')\]]?(?=\s)")
+
+# Short lines matching these are page chrome, not content
+BOILERPLATE_PATTERNS = [
+    r"\b(accept|we use) cookies\b",
+    r"\bcookie (policy|settings|preferences)\b",
+    r"\ball rights reserved\b",
+    r"^(©|\(c\)|copyright)\s",
+    r"\bsubscribe to (our|the) newsletter\b",
+    r"^(sign up|log in|sign in|subscribe|share|tweet|advertisement|related posts?|read more|continue reading)\b",
+    r"^share (this|on)\b",
+    r"^follow us\b",
+    r"\bclick here\b",
+    r"^skip to (main )?content\b",
+]
+BOILERPLATE_RE = re.compile("|".join(BOILERPLATE_PATTERNS), re.IGNORECASE)
+BOILERPLATE_MAX_LINE_CHARS = 120
+
+# Lines the prompts depend on: task checkboxes and section headings
+TASK_LINE_RE = re.compile(r"^\s*([-*+]\s*)?\[( |x|X)\]")
+SECTION_HEADING_RE = re.compile(
+    r"^\s*(#{1,6}\s|(morning|evening|plan|plans|reflection|today|tomorrow|wins?|blockers?)\b.{0,40}:\s*$)",
+    re.IGNORECASE,
+)
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+STOPWORDS = {
+    "a", "about", "after", "again", "all", "also", "an", "and", "any", "are", "as", "at", "be",
+    "because", "been", "but", "by", "can", "could", "did", "do", "does", "for", "from", "had",
+    "has", "have", "he", "her", "his", "how", "i", "i'm", "if", "in", "into", "is", "it", "it's",
+    "its", "just", "me", "more", "my", "no", "not", "of", "on", "one", "or", "our", "out", "over",
+    "she", "so", "some", "than", "that", "the", "their", "them", "then", "there", "they", "this",
+    "to", "too", "up", "very", "was", "we", "were", "what", "when", "which", "who", "will",
+    "with", "would", "you", "your",
+}
+
+
+def is_heading(line: str) -> bool:
+    return bool(SECTION_HEADING_RE.match(line))
+
+
+def is_structural(line: str) -> bool:
+    """Task checkbox or section heading; never dropped"""
+    return bool(TASK_LINE_RE.match(line) or SECTION_HEADING_RE.match(line))
+
+
+class ContentCompactor:
+    def __init__(self, token_budget: int = 4000, enabled: bool = True, encoding: str = "cl100k_base"):
+        self.token_budget = token_budget
+        self.enabled = enabled
+
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.get_encoding(encoding)
+            except Exception as e:
+                logger.warning("tiktoken encoding unavailable, estimating token counts: %s", e)
+
+    def count_tokens(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+    def clean(self, text: str) -> str:
+        """Drop boilerplate lines, repeated lines and runs of blank lines"""
+        lines = []
+        seen = set()
+        blank = False
+        for raw_line in text.splitlines():
+            line = raw_line.rstrip()
+            stripped = line.strip()
+
+            if not stripped:
+                if lines and not blank:
+                    lines.append("")
+                blank = True
+                continue
+
+            # Headings repeat legitimately (one "Morning Plan:" per day); anything else only once
+            if not is_heading(line):
+                if not is_structural(line) and len(stripped) <= BOILERPLATE_MAX_LINE_CHARS and BOILERPLATE_RE.search(stripped):
+                    continue
+                key = " ".join(stripped.lower().split())
+                if key in seen:
+                    continue
+                seen.add(key)
+
+            lines.append(line)
+            blank = False
+
+        return "\n".join(lines).strip()
+
+    def _paragraphs(self, text: str) -> List[Tuple[str, bool]]:
+        """Blank-line separated blocks with structural lines split out on their own.
+
+        Each item is ``(text, starts_block)`` so the kept pieces can be
+        joined back with the original line/blank-line layout.
+        """
+        paragraphs = []
+        for block in re.split(r"\n\s*\n", text):
+            current = []
+            starts_block = True
+            for line in block.splitlines():
+                if is_structural(line):
+                    if current:
+                        paragraphs.append(("\n".join(current), starts_block))
+                        current = []
+                        starts_block = False
+                    paragraphs.append((line, starts_block))
+                    starts_block = False
+                else:
+                    current.append(line)
+            if current:
+                paragraphs.append(("\n".join(current), starts_block))
+        return paragraphs
+
+    def _select(self, paragraphs: List[Tuple[str, bool]], budget: int) -> str:
+        """Structural paragraphs plus the highest-scoring others within ``budget``, in original order.
+
+        A paragraph too large for what is left of the budget is trimmed to
+        fit rather than skipped, so one long block (a fetched page, a long
+        reflection) still contributes its opening.
+        """
+        paragraphs, starts = [p for p, _ in paragraphs], [start for _, start in paragraphs]
+        words = [[w for w in WORD_RE.findall(p.lower()) if w not in STOPWORDS] for p in paragraphs]
+        frequencies = Counter(w for paragraph_words in words for w in paragraph_words)
+
+        costs = [self.count_tokens(p) + 1 for p in paragraphs]
+        keep = [is_structural(p) for p in paragraphs]
+        used = sum(cost for cost, kept in zip(costs, keep) if kept)
+
+        scored = []
+        for index, paragraph_words in enumerate(words):
+            if keep[index] or not paragraph_words:
+                continue
+            # Frequent content words mark the page's topic; sqrt keeps long paragraphs from winning by size alone
+            score = sum(frequencies[w] for w in set(paragraph_words)) / math.sqrt(len(paragraph_words))
+            if index == 0 or keep[index - 1]:
+                # Openings and the text right under a heading carry the most context
+                score *= 1.5
+            scored.append((score, index))
+
+        for _, index in sorted(scored, reverse=True):
+            remaining = budget - used
+            if costs[index] <= remaining:
+                keep[index] = True
+                used += costs[index]
+            elif remaining - 1 >= MIN_TRIM_TOKENS:
+                trimmed = self._trim(paragraphs[index], remaining - 1)
+                if trimmed:
+                    paragraphs[index] = trimmed
+                    keep[index] = True
+                    used += self.count_tokens(trimmed) + 1
+
+        pieces = []
+        for paragraph, starts_block, kept in zip(paragraphs, starts, keep):
+            if kept:
+                if pieces:
+                    pieces.append("\n\n" if starts_block else "\n")
+                pieces.append(paragraph)
+        return "".join(pieces)
+
+    def _truncate(self, text: str, budget: int) -> str:
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            return self._encoding.decode(tokens[:budget])
+        return text[:budget * CHARS_PER_TOKEN]
+
+    def _trim(self, text: str, budget: int) -> str:
+        """Leading part of ``text`` within ``budget`` tokens, cut at a sentence end or else a word break"""
+        cut = self._truncate(text, budget)
+        if len(cut) >= len(text):
+            return text
+        sentence_ends = [match.end() for match in SENTENCE_END_RE.finditer(cut)]
+        # Only back off to a sentence end if that keeps most of the cut
+        if sentence_ends and sentence_ends[-1] >= len(cut) // 2:
+            return cut[:sentence_ends[-1]].strip()
+        space = cut.rfind(" ")
+        return (cut[:space] if space > 0 else cut).strip()
+
+    def compact(self, text: str, token_budget: Optional[int] = None) -> str:
+        """Cleaned text, reduced to the most salient paragraphs if it exceeds the budget"""
+        if not self.enabled or not text:
+            return text
+
+        budget = token_budget or self.token_budget
+        original_tokens = self.count_tokens(text)
+
+        compacted = self.clean(text)
+        if self.count_tokens(compacted) > budget:
+            compacted = self._select(self._paragraphs(compacted), budget)
+            # Structural lines alone can still overflow a tiny budget
+            if self.count_tokens(compacted) > budget:
+                compacted = self._truncate(compacted, budget)
+
+        if not compacted.strip():
+            # Nothing but boilerplate; still hand back no more than the budget
+            compacted = self._trim(text.strip(), budget)
+
+        compacted_tokens = self.count_tokens(compacted)
+        if compacted_tokens < original_tokens:
+            logger.info("Compacted content", extra={
+                "original_tokens": original_tokens, "compacted_tokens": compacted_tokens, "sampled": True,
+            })
+        return compacted
+
+
+# Global content compactor instance
+content_compactor = ContentCompactor(
+    token_budget=int(os.getenv("CONTENT_TOKEN_BUDGET", "4000")),
+    enabled=os.getenv("CONTENT_COMPACTION_ENABLED", "true").lower() == "true",
+)
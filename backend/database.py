@@ -1,12 +1,17 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.pool import QueuePool
+import logging
 import os
 from dotenv import load_dotenv
 
+from db_pool import InstrumentedQueuePool, pool_monitor, pool_settings
+from metrics import instrument_engine
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Database URL - fallback to SQLite for development
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./snippetstream.db")
 
@@ -21,20 +26,29 @@ if DATABASE_URL.startswith("sqlite"):
         connect_args={"check_same_thread": False}
     )
 else:
-    # PostgreSQL/Neon configuration with connection pooling
+    # PostgreSQL/Neon configuration with connection pooling, sized per worker process
+    POOL_SETTINGS = pool_settings()
     engine = create_engine(
         DATABASE_URL,
-        poolclass=QueuePool,
-        pool_size=10,
-        max_overflow=20,
-        pool_pre_ping=True,  # Enables automatic reconnection
-        pool_recycle=3600,   # Recycle connections every hour
+        poolclass=InstrumentedQueuePool,
+        pool_size=POOL_SETTINGS["pool_size"],
+        max_overflow=POOL_SETTINGS["max_overflow"],
+        pool_timeout=POOL_SETTINGS["pool_timeout"],
+        pool_recycle=POOL_SETTINGS["pool_recycle"],  # Recycle connections every hour by default
+        # No pool_pre_ping: pool_monitor pings only connections idle past DB_PING_IDLE_SECONDS
         connect_args={
             "sslmode": "require",
             "connect_timeout": 10,
             "application_name": "SnippetStream"
         }
     )
+    logger.info(
+        "Database pool: %s + %s overflow per worker (%s workers)",
+        POOL_SETTINGS["pool_size"], POOL_SETTINGS["max_overflow"], POOL_SETTINGS["workers"],
+    )
+
+pool_monitor.attach(engine)
+instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -0,0 +1,93 @@
+"""
+Database Executor
+Bounded thread pool for blocking SQLAlchemy work called from async route
+handlers, so a slow query waits in a worker thread instead of stalling
+the event loop (and every LLM await sharing it)
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class DBExecutor:
+    def __init__(self, max_workers: int = 10):
+        # Keep at or below the connection pool size, otherwise extra threads just queue for a connection
+        self.max_workers = max_workers
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+        self.completed = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db")
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run ``fn(*args, **kwargs)`` on a pool thread and await its result.
+
+        The session passed in must not be used concurrently from the event
+        loop while the call is running; awaiting each call in turn keeps
+        one request's session on one thread at a time. Context variables
+        (e.g. the request id) are carried into the thread.
+        """
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+
+        state = {"started": False}
+        with self._lock:
+            self._queued += 1
+
+        def tracked():
+            with self._lock:
+                if not state["started"]:
+                    state["started"] = True
+                    self._queued -= 1
+                self._running += 1
+            try:
+                return call()
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self.completed += 1
+
+        try:
+            return await loop.run_in_executor(self._get_executor(), tracked)
+        finally:
+            with self._lock:
+                if not state["started"]:
+                    # Cancelled before a thread picked it up; stop counting it as queued
+                    state["started"] = True
+                    self._queued -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        return {
+            "max_workers": self.max_workers,
+            "running": self._running,
+            "queued": self._queued,
+            "completed": self.completed,
+        }
+
+
+# Global database executor instance
+db_executor = DBExecutor(
+    max_workers=int(os.getenv("DB_EXECUTOR_WORKERS", "10")),
+)
+
+
+async def run_db(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Await blocking database work on the shared database executor"""
+    return await db_executor.run(fn, *args, **kwargs)
@@ -0,0 +1,168 @@
+"""
+Database Pool Sizing and Telemetry
+Derives per-process pool sizes from the deployment's connection budget,
+replaces pre-ping on every checkout with a ping only for connections that
+sat idle past a threshold, and records checkout wait and ping cost
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.pool import QueuePool
+
+WAIT_SAMPLE_SIZE = 1000
+
+
+def pool_settings() -> Dict:
+    """Pool size and overflow for this process.
+
+    DB_POOL_SIZE / DB_MAX_OVERFLOW win when set. Otherwise, when
+    DB_MAX_CONNECTIONS (the server's connection budget for this app) is
+    set, it is split across WEB_CONCURRENCY worker processes, half as
+    persistent pool and half as overflow. Without either the old 10 + 20
+    is kept.
+    """
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    max_connections = os.getenv("DB_MAX_CONNECTIONS")
+
+    if max_connections:
+        per_worker = max(2, int(max_connections) // workers)
+        pool_size = math.ceil(per_worker / 2)
+        max_overflow = per_worker - pool_size
+    else:
+        pool_size, max_overflow = 10, 20
+
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE") or pool_size),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW") or max_overflow),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE_SECONDS", "3600")),
+        "workers": workers,
+    }
+
+
+class PoolMonitor:
+    """Checkout/ping counters for one engine's pool plus the idle-ping liveness check"""
+
+    def __init__(self, ping_idle_seconds: float = 30.0):
+        # Connections used within this window are trusted without a ping
+        self.ping_idle_seconds = ping_idle_seconds
+
+        self._lock = threading.Lock()
+        self._wait_samples = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.checkout_failures = 0  # Pool timeouts and connect errors
+
+        self.connects = 0
+        self.pings = 0
+        self.pings_skipped = 0
+        self.ping_failures = 0
+        self.ping_seconds_total = 0.0
+        self.invalidations = 0
+
+    def record_wait(self, seconds: float, failed: bool = False):
+        """Time to hand out a connection: queueing for a free one, or opening a new one"""
+        with self._lock:
+            if failed:
+                self.checkout_failures += 1
+                return
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            self._wait_samples.append(seconds)
+
+    def attach(self, engine):
+        """Register the pool listeners on ``engine``"""
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            connection_record.info["last_used"] = time.monotonic()
+            with self._lock:
+                self.connects += 1
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            idle = time.monotonic() - connection_record.info.get("last_used", 0.0)
+            if idle < self.ping_idle_seconds:
+                with self._lock:
+                    self.pings_skipped += 1
+                return
+
+            # Idle long enough that the server or a proxy may have dropped it
+            start = time.perf_counter()
+            try:
+                cursor = dbapi_connection.cursor()
+                try:
+                    cursor.execute("SELECT 1")
+                finally:
+                    cursor.close()
+            except Exception as e:
+                with self._lock:
+                    self.ping_failures += 1
+                # The pool discards this connection and retries the checkout with a new one
+                raise DisconnectionError(f"Stale pooled connection: {e}")
+            finally:
+                with self._lock:
+                    self.pings += 1
+                    self.ping_seconds_total += time.perf_counter() - start
+
+        @event.listens_for(engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            connection_record.info["last_used"] = time.monotonic()
+
+        @event.listens_for(engine, "invalidate")
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self.invalidations += 1
+
+    def stats(self, pool) -> Dict:
+        with self._lock:
+            samples = sorted(self._wait_samples)
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0.0
+            stats = {
+                "checkouts": self.checkouts,
+                "checkout_wait_avg_ms": round(self.wait_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "checkout_wait_p95_ms": round(p95 * 1000, 3),
+                "checkout_wait_max_ms": round(self.wait_seconds_max * 1000, 3),
+                "checkout_failures": self.checkout_failures,
+                "connects": self.connects,
+                "pings": self.pings,
+                "pings_skipped": self.pings_skipped,
+                "ping_failures": self.ping_failures,
+                "ping_avg_ms": round(self.ping_seconds_total / self.pings * 1000, 3) if self.pings else 0.0,
+                "ping_idle_seconds": self.ping_idle_seconds,
+                "invalidations": self.invalidations,
+            }
+
+        # QueuePool exposes live occupancy; other pool classes (e.g. SQLite's) may not
+        for name, method in (("size", "size"), ("in_use", "checkedout"), ("idle", "checkedin"), ("overflow", "overflow")):
+            if hasattr(pool, method):
+                stats[name] = getattr(pool, method)()
+        return stats
+
+
+# Global pool monitor instance
+pool_monitor = PoolMonitor(
+    ping_idle_seconds=float(os.getenv("DB_PING_IDLE_SECONDS", "30")),
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_monitor.record_wait(time.perf_counter() - start, failed=True)
+            raise
+        pool_monitor.record_wait(time.perf_counter() - start)
+        return connection
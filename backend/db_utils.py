@@ -1,52 +1,229 @@
 """
 Database utility functions with retry logic for handling connection issues
+
+Retries use jittered exponential backoff within a total deadline, and all
+calls share one retry budget and circuit breaker, so an outage turns into
+fast failures instead of every request sleeping through its own retries.
 """
-import time
+import asyncio
 import functools
+import logging
+import os
+import random
+import threading
+import time
 from sqlalchemy.exc import OperationalError, DisconnectionError
 from sqlalchemy.orm import Session
-from typing import Callable, Any
+from typing import Callable, Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (OperationalError, DisconnectionError)
+
+
+class DatabaseUnavailableError(DisconnectionError):
+    """Raised without touching the database while the shared circuit is open"""
+
+
+class RetryGuard:
+    """Retry budget and circuit breaker shared by every db_retry call in the process.
+
+    Each successful call earns ``budget_ratio`` retry tokens (up to
+    ``budget_max``) and each retry spends one, so retries stay a small
+    fraction of traffic during an outage. After ``failure_threshold``
+    consecutive connection failures the circuit opens and calls fail
+    immediately until ``cooldown_seconds`` have passed; then one probe call
+    is let through to close it again.
+    """
+
+    def __init__(self, budget_ratio: float = 0.2, budget_max: float = 10.0, failure_threshold: int = 5, cooldown_seconds: float = 10.0):
+        self.budget_ratio = budget_ratio
+        self.budget_max = budget_max
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+
+        self._lock = threading.Lock()
+        self._tokens = budget_max
+        self._consecutive_failures = 0
+        self.state = "closed"  # 'closed', 'open', 'half_open'
+        self._opened_at = 0.0
+
+        self.retries = 0
+        self.retries_denied = 0
+        self.rejected = 0
+
+    def allow_call(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            # One probe per cooldown; a probe that never reports back doesn't wedge the circuit
+            if time.time() - self._opened_at >= self.cooldown_seconds:
+                self.state = "half_open"
+                self._opened_at = time.time()
+                return True
+            self.rejected += 1
+            return False
+
+    def allow_retry(self) -> bool:
+        with self._lock:
+            if self.state != "closed" or self._tokens < 1:
+                self.retries_denied += 1
+                return False
+            self._tokens -= 1
+            self.retries += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive_failures = 0
+            self._tokens = min(self.budget_max, self._tokens + self.budget_ratio)
+            if self.state != "closed":
+                logger.info("Database circuit closed")
+            self.state = "closed"
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            if self.state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("Database circuit opened after %d connection failures", self._consecutive_failures)
+                self.state = "open"
+                self._opened_at = time.time()
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "retry_tokens": round(self._tokens, 2),
+            "consecutive_failures": self._consecutive_failures,
+            "retries": self.retries,
+            "retries_denied": self.retries_denied,
+            "rejected": self.rejected,
+        }
 
-def db_retry(max_retries: int = 3, delay: float = 1.0):
+
+# Global retry guard instance
+db_retry_guard = RetryGuard(
+    budget_ratio=float(os.getenv("DB_RETRY_BUDGET_RATIO", "0.2")),
+    budget_max=float(os.getenv("DB_RETRY_BUDGET_MAX", "10")),
+    failure_threshold=int(os.getenv("DB_CIRCUIT_FAILURE_THRESHOLD", "5")),
+    cooldown_seconds=float(os.getenv("DB_CIRCUIT_COOLDOWN_SECONDS", "10")),
+)
+
+
+def _on_event_loop() -> bool:
+    """True when called from the thread running an asyncio loop (sleeping here would stall it)"""
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def _reset_sessions(args):
+    """Roll back and close any session argument so the retry starts on a fresh connection"""
+    for arg in args:
+        if isinstance(arg, Session):
+            try:
+                arg.rollback()
+                arg.close()
+            except Exception:
+                pass
+
+
+def _backoff(attempt: int, delay: float, max_delay: float) -> float:
+    """Full-jitter exponential backoff, so retries from many requests don't land together"""
+    return random.uniform(0, min(max_delay, delay * (2 ** attempt)))
+
+
+def _next_wait(error: Exception, attempt: int, max_retries: int, started: float, deadline: float,
+               delay: float, max_delay: float, guard: RetryGuard) -> Optional[float]:
+    """Seconds to wait before the next attempt, or None to give up and raise"""
+    guard.record_failure()
+    logger.warning("Database connection error (attempt %d/%d): %s", attempt + 1, max_retries, error)
+
+    if attempt >= max_retries - 1:
+        logger.error("All database retry attempts failed")
+        return None
+
+    wait_time = _backoff(attempt, delay, max_delay)
+    if time.monotonic() - started + wait_time > deadline:
+        logger.error("Database retry deadline of %ss exhausted", deadline)
+        return None
+    if not guard.allow_retry():
+        logger.error("Database retry budget exhausted or circuit open, failing fast")
+        return None
+    return wait_time
+
+
+def db_retry(max_retries: int = 3, delay: float = 1.0, max_delay: float = 2.0, deadline: float = 5.0,
+             guard: Optional[RetryGuard] = None):
     """
     Decorator to retry database operations on connection failures
+
+    Works on plain and ``async def`` functions. Async functions back off
+    with ``asyncio.sleep``. Plain functions back off with ``time.sleep``, so
+    async routes must call them through ``run_db``; called on the event
+    loop thread itself they make one attempt and fail fast, since neither
+    sleeping nor retrying without a pause is acceptable there.
+    ``deadline`` caps the total time spent including waits.
     """
+    guard = guard or db_retry_guard
+
     def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs) -> Any:
+                started = time.monotonic()
+                for attempt in range(max_retries):
+                    if not guard.allow_call():
+                        raise DatabaseUnavailableError("Database circuit open, failing fast")
+                    try:
+                        result = await func(*args, **kwargs)
+                    except RETRYABLE_ERRORS as e:
+                        wait_time = _next_wait(e, attempt, max_retries, started, deadline, delay, max_delay, guard)
+                        if wait_time is None:
+                            raise
+                        _reset_sessions(args)
+                        logger.info("Waiting %.2fs before database retry", wait_time)
+                        await asyncio.sleep(wait_time)
+                        continue
+                    except Exception:
+                        # The database answered; this error is not about connectivity
+                        guard.record_success()
+                        raise
+                    guard.record_success()
+                    return result
+
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            last_exception = None
-            
+            started = time.monotonic()
             for attempt in range(max_retries):
+                if not guard.allow_call():
+                    raise DatabaseUnavailableError("Database circuit open, failing fast")
                 try:
-                    return func(*args, **kwargs)
-                except (OperationalError, DisconnectionError) as e:
-                    last_exception = e
-                    print(f"[ERROR] Database connection error (attempt {attempt + 1}/{max_retries}): {e}")
-                    
-                    if attempt < max_retries - 1:
-                        # If we have a database session in args, try to rollback and close it
-                        for arg in args:
-                            if isinstance(arg, Session):
-                                try:
-                                    arg.rollback()
-                                    arg.close()
-                                except:
-                                    pass
-                        
-                        # Wait before retrying with exponential backoff
-                        wait_time = delay * (2 ** attempt)
-                        print(f"[INFO] Waiting {wait_time}s before retry...")
-                        time.sleep(wait_time)
-                    else:
-                        print(f"[FAIL] All database retry attempts failed")
-                        raise last_exception
-                except Exception as e:
-                    # For non-connection errors, don't retry
-                    raise e
-            
-            # This should never be reached, but just in case
-            raise last_exception
-        
+                    result = func(*args, **kwargs)
+                except RETRYABLE_ERRORS as e:
+                    if _on_event_loop():
+                        guard.record_failure()
+                        logger.error("Database connection error on the event loop, not retrying (call %s via run_db): %s",
+                                     func.__qualname__, e)
+                        raise
+                    wait_time = _next_wait(e, attempt, max_retries, started, deadline, delay, max_delay, guard)
+                    if wait_time is None:
+                        raise
+                    _reset_sessions(args)
+                    logger.info("Waiting %.2fs before database retry", wait_time)
+                    time.sleep(wait_time)
+                    continue
+                except Exception:
+                    # The database answered; this error is not about connectivity
+                    guard.record_success()
+                    raise
+                guard.record_success()
+                return result
+
         return wrapper
     return decorator
 
@@ -57,5 +234,5 @@ def safe_db_operation(db: Session, operation: Callable, *args, **kwargs):
     @db_retry(max_retries=3, delay=0.5)
     def _execute():
         return operation(db, *args, **kwargs)
-    
-    return _execute()
\ No newline at end of file
+
+    return _execute()
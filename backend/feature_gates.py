@@ -1,10 +1,10 @@
 """
 Feature gate system for tiered access control
 """
-from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
-from models import User, UsageStats, ContentGeneration
+from models import User
+from quota import get_usage_in_window
 
 
 class FeatureGate:
@@ -12,6 +12,7 @@ class FeatureGate:
     
     def __init__(self, user: User):
         self.user = user
+        self._remaining_generations = None
     
     def get_tier(self) -> str:
         """Get user's current tier"""
@@ -73,11 +74,13 @@ class FeatureGate:
         if not self.user:
             return False
         
-        if not self.user.is_premium:
-            return item_count <= 1
-        
-        # Pro users can process up to 50 items
-        return item_count <= 50
+        return item_count <= self.get_max_bulk_items()
+    
+    def get_max_bulk_items(self) -> int:
+        """Get maximum number of items per bulk request"""
+        if self.user and self.user.is_premium:
+            return 50  # Pro users can process up to 50 items
+        return 1
     
     def can_use_advanced_templates(self) -> bool:
         """Check if user can use advanced AI templates"""
@@ -105,17 +108,13 @@ class FeatureGate:
         if not self.user:
             return 0
         
-        limit = self.get_generation_limit()
+        # Memoized per gate so one request never looks the counters up twice
+        if self._remaining_generations is None:
+            limit = self.get_generation_limit()
+            recent_usage = get_usage_in_window(db, self.user.id, "generate", hours=24)
+            self._remaining_generations = max(0, limit - recent_usage)
         
-        # Count usage in last 24 hours
-        twenty_four_hours_ago = datetime.now(timezone.utc) - timedelta(hours=24)
-        recent_usage = db.query(UsageStats).filter(
-            UsageStats.user_id == self.user.id,
-            UsageStats.action == "generate",
-            UsageStats.created_at >= twenty_four_hours_ago
-        ).count()
-        
-        return max(0, limit - recent_usage)
+        return self._remaining_generations
     
     def get_supported_platforms(self) -> List[str]:
         """Get list of supported social platforms"""
@@ -148,10 +147,14 @@ class FeatureGate:
             "history_limit": self.get_history_limit(),
             "supported_platforms": self.get_supported_platforms(),
             "export_formats": self.get_export_formats(),
-            "max_bulk_items": 50 if self.user and self.user.is_premium else 1,
-            "max_content_length": 50000 if self.user and self.user.is_premium else 10000
+            "max_bulk_items": self.get_max_bulk_items(),
+            "max_content_length": self.get_max_content_length()
         }
     
+    def get_max_content_length(self) -> int:
+        """Get maximum input length in characters"""
+        return 50000 if self.user and self.user.is_premium else 10000
+    
     def get_upgrade_prompt(self, feature: str) -> Dict:
         """Get upgrade prompt for specific feature"""
         prompts = {
@@ -0,0 +1,218 @@
+"""
+Generation Result Cache
+Content-addressed cache for LLM completions with an in-process LRU tier
+and an optional shared database tier
+"""
+import os
+import json
+import time
+import hashlib
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional, List, Dict, Sequence
+
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import GenerationCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(messages: List[Dict], models: Sequence[str], max_tokens: int) -> str:
+    """Hash the full message list plus the model chain and token budget"""
+    payload = json.dumps(
+        {"messages": messages, "models": list(models), "max_tokens": max_tokens},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DatabaseCacheBackend:
+    """Shared cache tier stored in the ``generation_cache`` table.
+
+    Lets several workers (or a restarted process) reuse each other's
+    completions. All methods are blocking and are run off the event loop
+    by ``GenerationCache``.
+    """
+
+    def __init__(self, max_rows: int = 10000):
+        self.max_rows = max_rows
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            entry = db.query(GenerationCacheEntry).filter(
+                GenerationCacheEntry.cache_key == key,
+                GenerationCacheEntry.expires_at > time.time()
+            ).first()
+            return entry.response if entry else None
+        finally:
+            db.close()
+
+    def set(self, key: str, value: str, ttl_seconds: int):
+        db = SessionLocal()
+        try:
+            entry = db.query(GenerationCacheEntry).filter(GenerationCacheEntry.cache_key == key).first()
+            if entry:
+                entry.response = value
+                entry.expires_at = time.time() + ttl_seconds
+            else:
+                db.add(GenerationCacheEntry(
+                    cache_key=key,
+                    response=value,
+                    expires_at=time.time() + ttl_seconds
+                ))
+            db.commit()
+
+            # Purge expired rows and trim to size every so often rather than on every write
+            self._writes += 1
+            if self._writes % 100 == 1:
+                self._purge(db)
+        except Exception as e:
+            db.rollback()
+            logger.warning("Generation cache write failed: %s", e)
+        finally:
+            db.close()
+
+    def _purge(self, db):
+        db.query(GenerationCacheEntry).filter(
+            GenerationCacheEntry.expires_at <= time.time()
+        ).delete(synchronize_session=False)
+
+        overflow = db.query(GenerationCacheEntry).count() - self.max_rows
+        if overflow > 0:
+            oldest = select(GenerationCacheEntry.cache_key).order_by(
+                GenerationCacheEntry.expires_at.asc()
+            ).limit(overflow)
+            db.query(GenerationCacheEntry).filter(
+                GenerationCacheEntry.cache_key.in_(oldest)
+            ).delete(synchronize_session=False)
+        db.commit()
+
+    def clear(self):
+        db = SessionLocal()
+        try:
+            db.query(GenerationCacheEntry).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+class GenerationCache:
+    """Two-tier TTL cache for completion results.
+
+    The local tier is a size-bounded LRU owned by the event loop; the
+    optional shared tier is any object with blocking ``get``/``set``/``clear``
+    methods (see ``DatabaseCacheBackend``).
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: int = 3600, shared_backend=None, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared_backend = shared_backend
+        self.enabled = enabled
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get_local(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: str):
+        self._entries[key] = (time.time() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        value = self._get_local(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.shared_backend is not None:
+            try:
+                value = await asyncio.to_thread(self.shared_backend.get, key)
+            except Exception as e:
+                logger.warning("Shared generation cache lookup failed: %s", e)
+                value = None
+
+            if value is not None:
+                self.shared_hits += 1
+                self._set_local(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        if not self.enabled or not value:
+            return
+
+        self._set_local(key, value)
+
+        if self.shared_backend is not None:
+            try:
+                await asyncio.to_thread(self.shared_backend.set, key, value, self.ttl_seconds)
+            except Exception as e:
+                logger.warning("Shared generation cache write failed: %s", e)
+
+    def clear(self):
+        self._entries.clear()
+        if self.shared_backend is not None:
+            self.shared_backend.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "shared_tier": type(self.shared_backend).__name__ if self.shared_backend else None,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _build_generation_cache() -> GenerationCache:
+    shared_backend = None
+    if os.getenv("GENERATION_CACHE_SHARED", "").lower() == "database":
+        shared_backend = DatabaseCacheBackend(
+            max_rows=int(os.getenv("GENERATION_CACHE_SHARED_MAX_ROWS", "10000"))
+        )
+
+    return GenerationCache(
+        max_entries=int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "512")),
+        ttl_seconds=int(os.getenv("GENERATION_CACHE_TTL_SECONDS", "3600")),
+        shared_backend=shared_backend,
+        enabled=os.getenv("GENERATION_CACHE_ENABLED", "true").lower() == "true",
+    )
+
+
+# Global generation cache instance
+generation_cache = _build_generation_cache()
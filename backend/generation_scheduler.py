@@ -0,0 +1,65 @@
+"""
+Generation Scheduler
+Bounded-concurrency gate for LLM calls: a global limit protects the
+upstream provider and a per-user limit keeps one bulk job from starving
+everyone else on the worker
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict
+
+
+class GenerationScheduler:
+    def __init__(self, max_concurrent: int = 16, per_user_limit: int = 3):
+        self.max_concurrent = max_concurrent
+        self.per_user_limit = per_user_limit
+
+        self._global = asyncio.Semaphore(max_concurrent)
+        # Per-user semaphores exist only while the user has calls queued or running
+        self._user_semaphores: Dict[int, asyncio.Semaphore] = {}
+        self._user_pending: Dict[int, int] = {}
+        self._running = 0
+
+    @asynccontextmanager
+    async def slot(self, user_id: int):
+        """Hold one LLM call slot for ``user_id`` (user slot first, then global)"""
+        if user_id not in self._user_semaphores:
+            self._user_semaphores[user_id] = asyncio.Semaphore(self.per_user_limit)
+            self._user_pending[user_id] = 0
+        self._user_pending[user_id] += 1
+
+        try:
+            async with self._user_semaphores[user_id]:
+                async with self._global:
+                    self._running += 1
+                    try:
+                        yield
+                    finally:
+                        self._running -= 1
+        finally:
+            self._user_pending[user_id] -= 1
+            if self._user_pending[user_id] == 0:
+                del self._user_pending[user_id]
+                del self._user_semaphores[user_id]
+
+    async def run(self, user_id: int, fn: Callable[..., Awaitable], *args, **kwargs):
+        """Await ``fn(*args, **kwargs)`` once a slot is free"""
+        async with self.slot(user_id):
+            return await fn(*args, **kwargs)
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "per_user_limit": self.per_user_limit,
+            "running": self._running,
+            "users_pending": len(self._user_pending),
+            "calls_pending": sum(self._user_pending.values()),
+        }
+
+
+# Global generation scheduler instance
+generation_scheduler = GenerationScheduler(
+    max_concurrent=int(os.getenv("GENERATION_MAX_CONCURRENCY", "16")),
+    per_user_limit=int(os.getenv("GENERATION_PER_USER_CONCURRENCY", "3")),
+)
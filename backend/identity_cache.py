@@ -0,0 +1,143 @@
+"""
+Identity Cache
+Short-TTL cache of resolved users for get_current_user, so hot endpoints
+skip the user lookup and subscription check on every request
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from models import User
+
+
+# (token subject / email, user id)
+IdentityKey = Tuple[str, int]
+
+
+class IdentityCache:
+    """Per-process cache of user rows keyed by the token subject (email) and user id.
+
+    Keying on both means a token only ever resolves to the account it was
+    issued for, even if that email later belongs to another account.
+    Entries hold a snapshot of the user's column values and are handed
+    back to each request as a session-attached ``User`` without touching
+    the database; premium expiry is checked per request from the
+    snapshot's ``premium_until``. Invalidation
+    is explicit (``invalidate_user``) for payment/subscription changes and
+    automatic for any flushed change to a ``User`` row in this process;
+    other workers fall back to the TTL.
+    """
+
+    def __init__(self, ttl_seconds: int = 60, max_entries: int = 10000, enabled: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+
+        # Flush listeners can fire on database executor threads
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[IdentityKey, Dict]" = OrderedDict()
+        self._keys_by_user_id: Dict[int, IdentityKey] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, email: str, user_id: int) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+
+        key = (email, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["expires_at"] <= time.time():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, email: str, user: User):
+        if not self.enabled:
+            return
+
+        key = (email, user.id)
+        values = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        with self._lock:
+            previous = self._keys_by_user_id.get(user.id)
+            if previous is not None and previous != key:
+                self._entries.pop(previous, None)
+            self._entries[key] = {
+                "user_id": user.id,
+                "values": values,
+                "expires_at": time.time() + self.ttl_seconds,
+            }
+            self._entries.move_to_end(key)
+            self._keys_by_user_id[user.id] = key
+
+            while len(self._entries) > self.max_entries:
+                oldest_key, oldest = self._entries.popitem(last=False)
+                if self._keys_by_user_id.get(oldest["user_id"]) == oldest_key:
+                    del self._keys_by_user_id[oldest["user_id"]]
+
+    def attach(self, db: Session, entry: Dict) -> User:
+        """Rebuild the cached user as a persistent instance of ``db`` without a query"""
+        user = User(**entry["values"])
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            key = self._keys_by_user_id.get(user_id)
+            if key is not None:
+                self._drop(key)
+                self.invalidations += 1
+
+    def _drop(self, key: IdentityKey):
+        entry = self._entries.pop(key, None)
+        if entry is not None and self._keys_by_user_id.get(entry["user_id"]) == key:
+            del self._keys_by_user_id[entry["user_id"]]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user_id.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global identity cache instance
+identity_cache = IdentityCache(
+    ttl_seconds=int(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "60")),
+    max_entries=int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", "10000")),
+    enabled=os.getenv("IDENTITY_CACHE_ENABLED", "true").lower() == "true",
+)
+
+
+def invalidate_user_identity(user_id: int):
+    """Drop any cached identity for a user (call after premium/subscription changes)"""
+    identity_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_flushed_users(session, flush_context):
+    """Keep the cache coherent with profile, preference and premium writes made in this process"""
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            identity_cache.invalidate_user(obj.id)
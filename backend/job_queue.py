@@ -0,0 +1,339 @@
+"""
+Repurpose Job Queue
+Runs long repurpose generations on background asyncio workers instead of
+holding the HTTP request open. Jobs live in the repurpose_jobs table, so
+queued and interrupted jobs are picked up again after a restart. A running
+job holds a lease that its worker keeps renewing; only jobs whose lease
+has run out are taken over.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from db_executor import run_db
+from models import RepurposeJob
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("completed", "failed")
+
+# handler(db, user_id, payload, publish) -> JSON-serializable result
+JobHandler = Callable[[Session, int, Dict, Callable[[str, Dict], None]], Awaitable[Dict]]
+
+
+def serialize_job(job: RepurposeJob) -> Dict:
+    """Public view of a job for the polling API"""
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+class RepurposeJobQueue:
+    def __init__(self, worker_count: int = 4, max_attempts: int = 3, stale_after_seconds: int = 600, retention_days: int = 7,
+                 sweep_interval_seconds: float = 60, lease_seconds: float = 60):
+        self.worker_count = worker_count
+        self.max_attempts = max_attempts
+        # A queued job older than this was submitted by a process that is gone; also the
+        # fallback for running rows written before leases existed
+        self.stale_after_seconds = stale_after_seconds
+        # A running job whose lease is not renewed within this window belongs to a dead worker
+        self.lease_seconds = lease_seconds
+        self.retention_days = retention_days
+        # How often stale and orphaned jobs are looked for while the process is up
+        self.sweep_interval_seconds = sweep_interval_seconds
+
+        self._handler: Optional[JobHandler] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._sweep_task: Optional[asyncio.Task] = None
+        # Job ids waiting in or being run from this process's queue
+        self._local_jobs: Set[str] = set()
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    def register_handler(self, handler: JobHandler):
+        self._handler = handler
+
+    # ---------------- Submission ----------------
+
+    async def submit(self, db: Session, user_id: int, payload: Dict) -> RepurposeJob:
+        """Persist a new job and hand it to the workers"""
+        job = await run_db(self._create, db, user_id, payload)
+        self._enqueue(job.id)
+        return job
+
+    def _create(self, db: Session, user_id: int, payload: Dict) -> RepurposeJob:
+        job = RepurposeJob(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            status="queued",
+            payload=json.dumps(payload),
+            attempts=0,
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def count_active(self, db: Session, user_id: int) -> int:
+        """Jobs for ``user_id`` that are still waiting or running"""
+        return db.query(RepurposeJob).filter(
+            RepurposeJob.user_id == user_id,
+            RepurposeJob.status.in_(ACTIVE_STATUSES)
+        ).count()
+
+    # ---------------- Events ----------------
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers[job_id].add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[job_id]
+
+    def publish(self, job_id: str, event: str, data: Dict):
+        """Push an event to listeners in this process (other workers fall back to polling)"""
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait((event, data))
+
+    # ---------------- Lifecycle ----------------
+
+    def _enqueue(self, job_id: str):
+        # Event loop only: asyncio.Queue is not thread-safe
+        if self._queue is not None and job_id not in self._local_jobs:
+            self._local_jobs.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    async def start(self):
+        """Requeue unfinished jobs from the database and start the workers and the recovery sweep"""
+        self._queue = asyncio.Queue()
+
+        job_ids = await run_db(self._recover_jobs)
+        for job_id in job_ids:
+            self._enqueue(job_id)
+
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        self._sweep_task = asyncio.create_task(self._sweeper())
+        logger.info("Repurpose job queue started (%d workers, %d jobs requeued)", self.worker_count, len(job_ids))
+
+    async def stop(self):
+        """Cancel the workers; jobs they were running stay 'running' and are requeued once their lease expires"""
+        tasks = self._workers + ([self._sweep_task] if self._sweep_task else [])
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._sweep_task = None
+        self._local_jobs.clear()
+
+    async def _sweeper(self):
+        """Periodically requeue jobs whose worker died while this process stayed up"""
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            try:
+                job_ids = await run_db(self._recover_jobs, True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Repurpose job recovery sweep failed: %s", e)
+                continue
+            for job_id in job_ids:
+                self._enqueue(job_id)
+
+    def _recover_jobs(self, orphaned_only: bool = False) -> List[str]:
+        """Requeue running jobs with an expired lease, drop old finished ones, and return the ids to enqueue.
+
+        At startup every queued job is returned. The periodic sweep
+        (``orphaned_only``) returns only jobs it just requeued and queued
+        jobs older than the stale window, which were submitted by a process
+        that is gone; fresh queued jobs are still in their own process's
+        queue.
+        """
+        db = SessionLocal()
+        try:
+            # Jobs left 'running' were interrupted by a crash or restart. A live worker in any
+            # process keeps renewing its lease, so only expired leases are taken over.
+            now = datetime.now(timezone.utc)
+            stale_cutoff = now - timedelta(seconds=self.stale_after_seconds)
+            interrupted = db.query(RepurposeJob).filter(
+                RepurposeJob.status == "running",
+                (RepurposeJob.lease_expires_at < now) | (
+                    RepurposeJob.lease_expires_at.is_(None) & (RepurposeJob.started_at < stale_cutoff)
+                )
+            ).all()
+            requeued = []
+            for job in interrupted:
+                if job.id in self._local_jobs:
+                    # Still running in this process, just slow
+                    continue
+                if job.attempts >= self.max_attempts:
+                    job.status = "failed"
+                    job.error = f"Job interrupted {job.attempts} times"
+                    job.finished_at = datetime.now(timezone.utc)
+                else:
+                    job.status = "queued"
+                    requeued.append(job.id)
+            if requeued:
+                logger.warning("Requeued %d repurpose jobs with expired leases", len(requeued), extra={"job_ids": requeued})
+
+            cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+            db.query(RepurposeJob).filter(
+                RepurposeJob.status.in_(FINISHED_STATUSES),
+                RepurposeJob.created_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+
+            queued = db.query(RepurposeJob.id).filter(RepurposeJob.status == "queued")
+            if orphaned_only:
+                queued = queued.filter(
+                    RepurposeJob.id.in_(requeued) | (RepurposeJob.created_at < stale_cutoff)
+                )
+            return [job_id for (job_id,) in queued.order_by(RepurposeJob.created_at).all()]
+        finally:
+            db.close()
+
+    # ---------------- Workers ----------------
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Left for the recovery sweep if it was already marked running
+                logger.exception("Repurpose job crashed: %s", e, extra={"job_id": job_id})
+            finally:
+                self._local_jobs.discard(job_id)
+                self._queue.task_done()
+
+    def _claim(self, db: Session, job_id: str) -> bool:
+        """Atomically move a queued job to running, so only one worker (in any process) runs it"""
+        now = datetime.now(timezone.utc)
+        claimed = db.query(RepurposeJob).filter(
+            RepurposeJob.id == job_id,
+            RepurposeJob.status == "queued"
+        ).update({
+            RepurposeJob.status: "running",
+            RepurposeJob.attempts: RepurposeJob.attempts + 1,
+            RepurposeJob.started_at: now,
+            RepurposeJob.lease_expires_at: now + timedelta(seconds=self.lease_seconds),
+        }, synchronize_session=False)
+        db.commit()
+        return claimed == 1
+
+    def _owned(self, job_id: str, attempt: int):
+        # The attempt number is bumped on every claim, so it tells this run apart from a takeover
+        return (RepurposeJob.id == job_id) & (RepurposeJob.status == "running") & (RepurposeJob.attempts == attempt)
+
+    def _renew_lease(self, job_id: str, attempt: int) -> bool:
+        """Push the lease of a job this worker is running forward; False once it was taken over"""
+        db = SessionLocal()
+        try:
+            renewed = db.query(RepurposeJob).filter(self._owned(job_id, attempt)).update({
+                RepurposeJob.lease_expires_at: datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds),
+            }, synchronize_session=False)
+            db.commit()
+            return renewed == 1
+        finally:
+            db.close()
+
+    async def _heartbeat(self, job_id: str, attempt: int):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await run_db(self._renew_lease, job_id, attempt):
+                    logger.warning("Repurpose job lease lost", extra={"job_id": job_id, "attempt": attempt})
+                    return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Try again on the next beat; the lease has slack for a couple of misses
+                logger.warning("Repurpose job lease renewal failed: %s", e, extra={"job_id": job_id})
+
+    def _finish(self, db: Session, job: RepurposeJob, status: str, result: Optional[Dict] = None, error: Optional[str] = None) -> bool:
+        """Record the outcome unless another worker has taken the job over since it was claimed"""
+        finished = db.query(RepurposeJob).filter(self._owned(job.id, job.attempts)).update({
+            RepurposeJob.status: status,
+            RepurposeJob.result: json.dumps(result) if result is not None else None,
+            RepurposeJob.error: error,
+            RepurposeJob.finished_at: datetime.now(timezone.utc),
+            RepurposeJob.lease_expires_at: None,
+        }, synchronize_session=False)
+        db.commit()
+        if not finished:
+            logger.warning("Repurpose job was taken over; dropping this run's outcome", extra={"job_id": job.id})
+        return finished == 1
+
+    async def _run(self, job_id: str):
+        db = SessionLocal()
+        try:
+            if not await run_db(self._claim, db, job_id):
+                return
+
+            job = await run_db(db.get, RepurposeJob, job_id)
+            self.publish(job_id, "status", {"status": "running"})
+
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, job.attempts))
+            try:
+                result = await self._handler(
+                    db, job.user_id, json.loads(job.payload),
+                    lambda event, data: self.publish(job_id, event, data)
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await run_db(db.rollback)
+                detail = f"Server Error: {str(e) or type(e).__name__}"
+                if await run_db(self._finish, db, job, "failed", error=detail):
+                    self.publish(job_id, "error", {"detail": detail})
+                logger.error("Repurpose job failed: %s", e, extra={"job_id": job_id, "user_id": job.user_id})
+                return
+            finally:
+                heartbeat.cancel()
+
+            if await run_db(self._finish, db, job, "completed", result=result):
+                self.publish(job_id, "done", result)
+        finally:
+            await run_db(db.close)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": len(self._workers),
+            "queued_in_process": self._queue.qsize() if self._queue is not None else 0,
+            "subscribed_jobs": len(self._subscribers),
+        }
+
+
+# Global repurpose job queue instance
+repurpose_jobs = RepurposeJobQueue(
+    worker_count=int(os.getenv("REPURPOSE_JOB_WORKERS", "4")),
+    max_attempts=int(os.getenv("REPURPOSE_JOB_MAX_ATTEMPTS", "3")),
+    stale_after_seconds=int(os.getenv("REPURPOSE_JOB_STALE_SECONDS", "600")),
+    retention_days=int(os.getenv("REPURPOSE_JOB_RETENTION_DAYS", "7")),
+    sweep_interval_seconds=int(os.getenv("REPURPOSE_JOB_SWEEP_SECONDS", "60")),
+    lease_seconds=int(os.getenv("REPURPOSE_JOB_LEASE_SECONDS", "60")),
+)
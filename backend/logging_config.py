@@ -0,0 +1,184 @@
+"""
+Logging Configuration
+Structured logging for the API: records are handed to a bounded in-memory
+queue and written to stdout by a single listener thread, so request
+handlers never block on console I/O. Each record carries the request id
+of the request that produced it, output is JSON (or plain text for local
+development), and high-volume lines can be sampled per request.
+"""
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# Request id of the request being handled; copied into tasks and database executor threads
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed via ``extra`` and becomes a JSON field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "sampled"}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def get_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, request id and any extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", "-") != "-":
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps the current request id on the record and samples lines logged with ``extra={"sampled": True}``.
+
+    Sampling is decided per request id, so a request that is kept keeps all
+    of its sampled lines. Warnings and errors are never sampled out.
+    """
+
+    def __init__(self, sample_rate: float = 1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.sampled_out = 0
+
+    def _keep(self, request_id: Optional[str]) -> bool:
+        if self.sample_rate >= 1.0:
+            return True
+        if request_id:
+            return zlib.crc32(request_id.encode()) % 10000 < self.sample_rate * 10000
+        return random.random() < self.sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        if getattr(record, "sampled", False) and record.levelno < logging.WARNING:
+            if not self._keep(request_id_var.get()):
+                self.sampled_out += 1
+                return False
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args and render the traceback now (they may not be safe to touch later),
+        # but leave formatting to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LoggingPipeline:
+    def __init__(self, level: str = "INFO", fmt: str = "json", sample_rate: float = 1.0, queue_size: int = 10000):
+        self.level = level.upper()
+        self.fmt = fmt
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.queue_size = queue_size
+
+        self._lock = threading.Lock()
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._handler: Optional[NonBlockingQueueHandler] = None
+        self._filter: Optional[RequestContextFilter] = None
+
+    def _formatter(self) -> logging.Formatter:
+        if self.fmt == "text":
+            return logging.Formatter(TEXT_FORMAT)
+        return JsonFormatter()
+
+    def setup(self):
+        """Route the root logger through the queue; safe to call more than once"""
+        with self._lock:
+            if self._listener is not None:
+                return
+
+            log_queue = queue.Queue(maxsize=self.queue_size)
+            output = logging.StreamHandler(sys.stdout)
+            output.setFormatter(self._formatter())
+
+            self._filter = RequestContextFilter(self.sample_rate)
+            self._handler = NonBlockingQueueHandler(log_queue)
+            self._handler.addFilter(self._filter)
+
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            root.addHandler(self._handler)
+            root.setLevel(self.level)
+
+            self._listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+            self._listener.start()
+
+    def shutdown(self):
+        """Flush queued records and stop the listener thread"""
+        with self._lock:
+            if self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+
+    def stats(self) -> Dict:
+        return {
+            "level": self.level,
+            "format": self.fmt,
+            "sample_rate": self.sample_rate,
+            "queued": self._handler.queue.qsize() if self._handler else 0,
+            "dropped": self._handler.dropped if self._handler else 0,
+            "sampled_out": self._filter.sampled_out if self._filter else 0,
+        }
+
+
+# Global logging pipeline instance
+logging_pipeline = LoggingPipeline(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    fmt=os.getenv("LOG_FORMAT", "json").lower(),
+    sample_rate=float(os.getenv("LOG_SAMPLE_RATE", "1.0")),
+    queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+)
+
+
+def setup_logging():
+    logging_pipeline.setup()
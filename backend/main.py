@@ -6,22 +6,39 @@ from dotenv import load_dotenv
 env_path = Path(__file__).resolve().parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+# 2. Route logging through the queue before modules grab their loggers
+from logging_config import setup_logging, logging_pipeline, request_id_var, new_request_id
+setup_logging()
+
 import time
+import logging
+import math
 import asyncio
+import hashlib
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Match
 
 from routes import register_routes
 from database import create_tables, get_db
+from auth import verify_token
+from rate_limiter import rate_limiter
+from metrics import metrics, http_request_duration, register_cache, require_metrics_token
+from generation_cache import generation_cache
+from url_cache import url_text_cache
+from identity_cache import identity_cache
+from pagination import NEXT_CURSOR_HEADER
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
 port = os.getenv("PORT", os.getenv("SNIPPETSTREAM_PORT", "8000"))
 
+logger = logging.getLogger(__name__)
+
 # Background task management
 background_tasks = set()
 
@@ -30,38 +47,42 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager for background tasks and initialization"""
     
     # --- Startup ---
-    print("[INFO] Starting SnippetStream API...")
+    logger.info("Starting SnippetStream API")
     
     # 1. Initialize database tables
     try:
         create_tables()
-        print("[OK] Database tables initialized successfully")
+        logger.info("Database tables initialized successfully")
+        
+        # Columns and indexes added after the tables were first created
+        try:
+            from database import engine
+            from migrations import run_migrations
+            run_migrations(engine)
+        except Exception as mig_error:
+            logger.warning("Migration warning: %s", mig_error)
         
-        # Manual migration for 'context' column in content_generations
+        # Seed hourly quota counters from usage_stats on first run, drop stale buckets
         try:
-            from sqlalchemy import text
+            from quota import backfill_usage_counters, prune_usage_counters
             db_next = next(get_db())
-            # Check if column exists
-            check_query = text("SELECT column_name FROM information_schema.columns WHERE table_name='content_generations' AND column_name='context';")
-            result = db_next.execute(check_query).fetchone()
-            if not result:
-                print("[INFO] Adding 'context' column to 'content_generations'...")
-                db_next.execute(text("ALTER TABLE content_generations ADD COLUMN context TEXT;"))
-                db_next.commit()
-                print("[OK] Successfully added 'context' column!")
+            seeded = backfill_usage_counters(db_next)
+            prune_usage_counters(db_next)
             db_next.close()
-        except Exception as mig_error:
-            print(f"[WARN] Migration warning: {mig_error}")
+            if seeded:
+                logger.info("Seeded %s usage counter buckets", seeded)
+        except Exception as quota_error:
+            logger.warning("Usage counter backfill warning: %s", quota_error)
         
         # Seed public templates
         try:
             from seed_public_templates import seed_public_templates
             seed_public_templates()
-            print("[OK] Public templates seeding completed")
+            logger.info("Public templates seeding completed")
         except Exception as seed_error:
-            print(f"[WARN] Template seeding warning: {seed_error}")
+            logger.warning("Template seeding warning: %s", seed_error)
     except Exception as e:
-        print(f"[WARN] Database initialization warning: {e}")
+        logger.warning("Database initialization warning: %s", e)
 
     # 2. Start subscription background task
     try:
@@ -69,19 +90,52 @@ async def lifespan(app: FastAPI):
         task = asyncio.create_task(subscription_background_task())
         background_tasks.add(task)
         task.add_done_callback(background_tasks.discard)
-        print("[OK] Subscription background task started")
+        logger.info("Subscription background task started")
     except Exception as e:
-        print(f"[WARN] Could not start subscription background task: {e}")
+        logger.warning("Could not start subscription background task: %s", e)
+    
+    # 3. Start repurpose job workers (requeues jobs interrupted by the last shutdown)
+    try:
+        from job_queue import repurpose_jobs
+        await repurpose_jobs.start()
+    except Exception as e:
+        logger.warning("Could not start repurpose job queue: %s", e)
     
     yield
     
     # --- Shutdown ---
-    print("[INFO] Shutting down SnippetStream API...")
+    logger.info("Shutting down SnippetStream API")
     for task in background_tasks:
         task.cancel()
     if background_tasks:
         await asyncio.gather(*background_tasks, return_exceptions=True)
-        print("[OK] Background tasks stopped")
+        logger.info("Background tasks stopped")
+    
+    try:
+        from job_queue import repurpose_jobs
+        await repurpose_jobs.stop()
+    except Exception as e:
+        logger.warning("Could not stop repurpose job queue: %s", e)
+    
+    try:
+        from url_ingestion import url_ingestion
+        await url_ingestion.aclose()
+    except Exception as e:
+        logger.warning("Could not close URL ingestion client: %s", e)
+    
+    try:
+        from db_executor import db_executor
+        db_executor.shutdown()
+    except Exception as e:
+        logger.warning("Could not stop database executor: %s", e)
+    
+    # Last, so records from the steps above are flushed
+    logging_pipeline.shutdown()
+
+# Cache hit ratios read at scrape time
+register_cache("generation", generation_cache.stats)
+register_cache("url_text", url_text_cache.stats)
+register_cache("identity", identity_cache.stats)
 
 app = FastAPI(
     title="SnippetStream API", 
@@ -139,39 +193,77 @@ async def health_check(db: Session = Depends(get_db)):
             }
         )
 
-# Simple rate limiting middleware
-request_times = {}
+# Prometheus text exposition (see metrics.py); scrapers send the METRICS_TOKEN bearer token
+@app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+async def prometheus_metrics():
+    """Request, DB query, LLM and URL fetch histograms plus cache hit counters"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Connection pool telemetry (see db_pool.py)
+@app.get("/metrics/db-pool", dependencies=[Depends(require_metrics_token)])
+async def db_pool_metrics():
+    """Checkout wait, occupancy, overflow and idle-ping cost for this worker's pool"""
+    from database import engine
+    from db_pool import pool_monitor
+    return pool_monitor.stats(engine.pool)
+
+# Logging queue telemetry (see logging_config.py)
+@app.get("/metrics/logging", dependencies=[Depends(require_metrics_token)])
+async def logging_metrics():
+    """Queued, dropped and sampled-out log records"""
+    return logging_pipeline.stats()
+
+# Rate limiting middleware (GCRA, see rate_limiter.py)
+RATE_LIMIT_PER_MINUTE_ANONYMOUS = int(os.getenv("RATE_LIMIT_PER_MINUTE_ANONYMOUS", "100"))
+RATE_LIMIT_PER_MINUTE_AUTHENTICATED = int(os.getenv("RATE_LIMIT_PER_MINUTE_AUTHENTICATED", "200"))
+RATE_LIMIT_PER_MINUTE_API_KEY = int(os.getenv("RATE_LIMIT_PER_MINUTE_API_KEY", "200"))
+
+def get_rate_limit_identity(request: Request):
+    """Pick the rate limit key and per-minute limit for a request.
+    
+    API keys and valid access tokens are limited per key/user, so users
+    behind a shared NAT don't starve each other; everything else is
+    limited per client IP.
+    """
+    api_key = request.headers.get("X-API-Key")
+    if api_key:
+        return f"apikey:{hashlib.sha256(api_key.encode()).hexdigest()[:32]}", RATE_LIMIT_PER_MINUTE_API_KEY
+    
+    auth_header = request.headers.get("Authorization")
+    if auth_header and auth_header.lower().startswith("bearer "):
+        # Signature check only - no database lookup in the middleware
+        email = verify_token(auth_header[7:].strip(), "access")
+        if email:
+            return f"user:{email}", RATE_LIMIT_PER_MINUTE_AUTHENTICATED
+    
+    return f"ip:{request.client.host}", RATE_LIMIT_PER_MINUTE_ANONYMOUS
 
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
-    client_ip = request.client.host
-    current_time = time.time()
-    
     # Skip rate limiting for health checks, static files, and OPTIONS requests
     if request.method == "OPTIONS" or request.url.path in ["/health", "/docs", "/openapi.json"] or request.url.path.startswith("/static"):
         response = await call_next(request)
         return response
     
-    # Clean old entries (older than 1 minute)
-    if client_ip in request_times:
-        request_times[client_ip] = [t for t in request_times[client_ip] if current_time - t < 60]
-    else:
-        request_times[client_ip] = []
+    key, limit = get_rate_limit_identity(request)
     
-    # Check rate limit (max 100 requests per minute for general API - increased for payment flows)
-    # Higher limit for authenticated users (check Authorization header)
-    auth_header = request.headers.get("Authorization")
-    rate_limit = 200 if auth_header else 100
+    try:
+        if rate_limiter.is_shared:
+            allowed, retry_after = await asyncio.to_thread(rate_limiter.hit, key, limit, 60)
+        else:
+            allowed, retry_after = rate_limiter.hit(key, limit, 60)
+    except Exception as e:
+        # Fail open - a limiter outage must not take the API down with it
+        logger.warning("Rate limiter unavailable: %s", e)
+        allowed, retry_after = True, 0.0
     
-    if len(request_times[client_ip]) >= rate_limit:
+    if not allowed:
         return JSONResponse(
             status_code=429,
-            content={"detail": "Too many requests. Please slow down and try again in a minute."}
+            content={"detail": "Too many requests. Please slow down and try again in a minute."},
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
         )
     
-    # Add current request time
-    request_times[client_ip].append(current_time)
-    
     response = await call_next(request)
     return response
 
@@ -185,7 +277,7 @@ async def normalize_path_middleware(request: Request, call_next):
     if "//" in path:
         import re
         normalized_path = re.sub(r'/+', '/', path)
-        print(f"[INFO] Normalizing path from {path} to {normalized_path}")
+        logger.info("Normalizing request path", extra={"path": path, "normalized_path": normalized_path, "sampled": True})
         
         # We can't easily change request.url.path directly in some FastAPI versions, 
         # but we can modify the scope
@@ -194,6 +286,44 @@ async def normalize_path_middleware(request: Request, call_next):
     response = await call_next(request)
     return response
 
+# Request latency metrics. Middlewares registered later wrap the earlier ones, so this
+# timing includes rate limiting and path normalization
+def route_template(request: Request) -> str:
+    """Route path template for metric labels, so /history/123 and /history/456 share a series"""
+    route = request.scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    for candidate in app.router.routes:
+        match, _ = candidate.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(candidate, "path", "unmatched")
+    return "unmatched"
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Streaming responses are timed to their first byte
+        http_request_duration.observe(time.perf_counter() - start, request.method, route_template(request), str(status))
+
+# Request correlation id. Registered after the metrics middleware so it wraps it and every
+# other middleware's log lines; only CORS, added below, sits outside it
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or new_request_id()
+    token = request_id_var.set(request_id[:64])
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id_var.get()
+        return response
+    finally:
+        request_id_var.reset(token)
+
 # Configure CORS properly
 # Note: allow_origins cannot be ["*"] when allow_credentials is True
 allowed_origins = [
@@ -214,7 +344,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["*"],
+    # With credentials, browsers read "*" as a literal header name, so list them
+    expose_headers=[NEXT_CURSOR_HEADER, "X-Request-ID", "Retry-After"],
     max_age=3600,
 )
 
@@ -0,0 +1,97 @@
+"""
+User Memory Digest
+Keeps each Pro user's prompt memory (their saved AI memory plus a preview
+of their latest generations) pre-built in one row, so the generation path
+reads a single row instead of rebuilding the context on every request.
+Editing the memory and saving a Pro user's generation refresh the row, so
+reads never rebuild or write it; free users' saves skip the rebuild
+"""
+import os
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from content_compaction import content_compactor
+from models import ContentGeneration, User, UserMemory, UserMemoryDigest
+
+HISTORY_ITEMS = 3
+HISTORY_PREVIEW_CHARS = 200
+
+# Upper bound for the user-written part of the digest; the history part is already bounded
+MEMORY_DIGEST_TOKEN_BUDGET = int(os.getenv("MEMORY_DIGEST_TOKEN_BUDGET", "1500"))
+
+
+def build_memory_digest(db: Session, user_id: int) -> str:
+    """Static user memory plus a preview of recent generations, as sent to the prompts"""
+    user_memory = db.execute(
+        select(UserMemory.memory_content).where(UserMemory.user_id == user_id)
+    ).scalar() or ""
+    user_memory = content_compactor.compact(user_memory, token_budget=MEMORY_DIGEST_TOKEN_BUDGET)
+
+    past_gens = db.execute(
+        select(
+            func.substr(ContentGeneration.original_content, 1, HISTORY_PREVIEW_CHARS),
+            func.substr(ContentGeneration.linkedin_post, 1, HISTORY_PREVIEW_CHARS),
+            func.substr(ContentGeneration.twitter_thread, 1, HISTORY_PREVIEW_CHARS),
+        ).where(
+            ContentGeneration.user_id == user_id
+        ).order_by(
+            ContentGeneration.created_at.desc(), ContentGeneration.id.desc()
+        ).limit(HISTORY_ITEMS)
+    ).all()
+
+    past_generations_context = ""
+    if past_gens:
+        past_generations_context = "\nPAST GENERATIONS HISTORY:\n"
+        for i, (original, linkedin, twitter) in enumerate(past_gens):
+            past_generations_context += f"--- History Item {i+1} ---\n"
+            past_generations_context += f"Input: {original}...\n"
+            # Include a snippet of what was generated
+            if linkedin:
+                past_generations_context += f"Output Preview: {linkedin}...\n"
+            elif twitter:
+                past_generations_context += f"Output Preview: {twitter}...\n"
+        past_generations_context += "--------------------------\n"
+
+    digest = user_memory
+    if past_generations_context:
+        digest += "\n" + past_generations_context
+    return digest
+
+
+def refresh_memory_digest(db: Session, user_id: int) -> str:
+    """Rebuild the user's digest row inside the caller's transaction"""
+    digest = build_memory_digest(db, user_id)
+
+    table = UserMemoryDigest.__table__
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    statement = insert(table).values(user_id=user_id, digest=digest)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={"digest": digest, "updated_at": func.now()}
+    )
+    db.execute(statement)
+
+    return digest
+
+
+def refresh_memory_digest_after_save(db: Session, user_id: int):
+    """Refresh the digest after new generations, inside the caller's transaction.
+
+    Only Pro users' prompts read the digest, so for everyone else this is
+    a single primary-key lookup.
+    """
+    is_premium = db.execute(select(User.is_premium).where(User.id == user_id)).scalar()
+    if is_premium:
+        refresh_memory_digest(db, user_id)
+
+
+def get_memory_digest(db: Session, user_id: int) -> str:
+    """The stored digest; built without being stored for users whose row has not been written yet"""
+    digest = db.execute(
+        select(UserMemoryDigest.digest).where(UserMemoryDigest.user_id == user_id)
+    ).scalar()
+    if digest is None:
+        digest = build_memory_digest(db, user_id)
+    return digest
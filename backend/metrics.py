@@ -0,0 +1,235 @@
+"""
+Metrics
+In-process counters and histograms rendered in the Prometheus text
+exposition format: HTTP route latency, per-query DB time, per-model LLM
+latency and tokens, URL fetch time and cache hit ratios
+"""
+import bisect
+import hmac
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Shared secret for /metrics and the component stats endpoints; unset keeps them hidden
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Seconds; covers sub-millisecond cache hits up to slow LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += count
+                    labels = _format_labels(self.labels, label_values, ("le", _format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics owned by this module plus collectors that read other components' stats at scrape time"""
+
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], List[str]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.warning("Metrics collector failed: %s", e)
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics registry instance
+metrics = MetricsRegistry()
+
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+db_query_duration = metrics.histogram(
+    "db_query_duration_seconds", "Time per SQL statement, by statement type",
+    ("operation",), buckets=DB_BUCKETS,
+)
+db_query_errors = metrics.counter(
+    "db_query_errors_total", "SQL statements that raised, by statement type", ("operation",),
+)
+llm_request_duration = metrics.histogram(
+    "llm_request_duration_seconds", "LLM completion latency per model and outcome",
+    ("model", "outcome"),
+)
+llm_tokens = metrics.counter(
+    "llm_tokens_total", "LLM tokens per model (provider usage when reported, else estimated)",
+    ("model", "kind"),
+)
+url_fetch_duration = metrics.histogram(
+    "url_fetch_duration_seconds", "URL ingestion fetch time by outcome", ("outcome",),
+)
+
+
+def require_metrics_token(request: Request):
+    """Dependency for the metrics and stats endpoints: ``Authorization: Bearer <METRICS_TOKEN>``.
+
+    They expose traffic, pool and cache internals, so without a configured
+    token they answer 404.
+    """
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    auth_header = request.headers.get("Authorization", "")
+    supplied = auth_header[7:].strip() if auth_header.lower().startswith("bearer ") else ""
+    if not hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+
+
+def observe_llm(model: str, outcome: str, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0):
+    llm_request_duration.observe(seconds, model, outcome)
+    if prompt_tokens:
+        llm_tokens.inc(model, "prompt", amount=prompt_tokens)
+    if completion_tokens:
+        llm_tokens.inc(model, "completion", amount=completion_tokens)
+
+
+def _statement_operation(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def instrument_engine(engine):
+    """Time every statement run through ``engine``"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get("query_start_times")
+        if start_times:
+            db_query_duration.observe(time.perf_counter() - start_times.pop(), _statement_operation(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        start_times = conn.info.get("query_start_times") if conn is not None else None
+        if start_times:
+            start_times.pop()
+        db_query_errors.inc(_statement_operation(exception_context.statement or ""))
+
+
+CACHE_COUNTERS = ("hits", "shared_hits", "revalidated", "misses", "evictions")
+
+_caches: List[Tuple[str, Callable[[], Dict]]] = []
+
+
+def register_cache(name: str, stats: Callable[[], Dict]):
+    """Expose a cache's hit/miss counters and hit ratio, read from its stats() at scrape time"""
+    _caches.append((name, stats))
+
+
+def _collect_caches() -> List[str]:
+    snapshots = [(name, stats()) for name, stats in _caches]
+    lines = []
+    # One TYPE line per metric name, with a sample per cache
+    for key in CACHE_COUNTERS:
+        samples = [(name, values[key]) for name, values in snapshots if key in values]
+        if samples:
+            lines.append(f"# TYPE cache_{key}_total counter")
+            lines.extend(f'cache_{key}_total{{cache="{name}"}} {value}' for name, value in samples)
+    samples = [(name, values["hit_ratio"]) for name, values in snapshots if "hit_ratio" in values]
+    if samples:
+        lines.append("# TYPE cache_hit_ratio gauge")
+        lines.extend(f'cache_hit_ratio{{cache="{name}"}} {value}' for name, value in samples)
+    return lines
+
+
+metrics.register_collector(_collect_caches)
@@ -0,0 +1,69 @@
+"""
+Lightweight Schema Migrations
+Brings existing databases up to date with models.py: create_all only
+creates missing tables, so new columns and indexes on existing tables
+are added here at startup
+"""
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from models import Base
+
+logger = logging.getLogger(__name__)
+
+# (table, column, DDL type) for columns added after their table first shipped
+PENDING_COLUMNS = [
+    ("content_generations", "context", "TEXT"),
+    ("users", "premium_until", "TIMESTAMP WITH TIME ZONE"),
+    ("repurpose_jobs", "lease_expires_at", "TIMESTAMP WITH TIME ZONE"),
+]
+
+
+def add_missing_columns(engine: Engine) -> list:
+    """Add any PENDING_COLUMNS that the live tables don't have yet"""
+    inspector = inspect(engine)
+    added = []
+
+    with engine.begin() as conn:
+        for table_name, column_name, column_type in PENDING_COLUMNS:
+            existing_columns = {column["name"] for column in inspector.get_columns(table_name)}
+            if column_name not in existing_columns:
+                logger.info("Adding '%s' column to '%s'", column_name, table_name)
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+                added.append(f"{table_name}.{column_name}")
+
+    return added
+
+
+def create_missing_indexes(engine: Engine) -> list:
+    """Create every index declared on the models that the database is missing"""
+    inspector = inspect(engine)
+    created = []
+
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                logger.info("Creating index '%s' on '%s'", index.name, table.name)
+                index.create(bind=engine)
+                created.append(index.name)
+
+    return created
+
+
+def run_migrations(engine: Engine):
+    """Apply all pending column and index migrations"""
+    added_columns = add_missing_columns(engine)
+    created_indexes = create_missing_indexes(engine)
+
+    if added_columns:
+        logger.info("Added columns: %s", ", ".join(added_columns))
+    if created_indexes:
+        logger.info("Created indexes: %s", ", ".join(created_indexes))
+
+    return {"columns": added_columns, "indexes": created_indexes}
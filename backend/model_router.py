@@ -0,0 +1,171 @@
+"""
+Adaptive Model Router
+Orders the LLM fallback chain by live per-model latency and error rate
+(EWMA) and takes models with repeated failures out of rotation behind a
+circuit breaker until a cooldown has passed
+"""
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Successful-call latencies kept per model for percentile estimates
+LATENCY_SAMPLE_SIZE = 100
+MIN_PERCENTILE_SAMPLES = 5
+
+
+class ModelStats:
+    """Rolling health of one model"""
+
+    def __init__(self, name: str, position: int):
+        self.name = name
+        self.position = position  # Configured order, used as tie-breaker
+
+        self.ewma_latency: Optional[float] = None
+        self.latency_samples = deque(maxlen=LATENCY_SAMPLE_SIZE)
+        self.ewma_error_rate = 0.0
+        self.consecutive_failures = 0
+        self.successes = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+        self.state = "closed"  # 'closed', 'open', 'half_open'
+        self.opened_at = 0.0
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        models: List[str],
+        alpha: float = 0.2,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 30.0,
+        prior_latency_seconds: float = 5.0,
+    ):
+        self.models = list(models)
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        # Assumed latency for models without samples yet
+        self.prior_latency_seconds = prior_latency_seconds
+
+        self._stats: Dict[str, ModelStats] = {
+            name: ModelStats(name, position) for position, name in enumerate(self.models)
+        }
+
+    def expected_latency(self, stats: ModelStats) -> float:
+        """Expected time to a good answer: latency inflated by the chance of having to retry"""
+        latency = stats.ewma_latency if stats.ewma_latency is not None else self.prior_latency_seconds
+        return latency / max(1.0 - stats.ewma_error_rate, 0.1)
+
+    def latency_percentile(self, model: str, percentile: float) -> Optional[float]:
+        """Latency at ``percentile`` (0-1) over recent successful calls, None until enough samples"""
+        samples = sorted(self._stats[model].latency_samples)
+        if len(samples) < MIN_PERCENTILE_SAMPLES:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(percentile * len(samples)) - 1))
+        return samples[index]
+
+    def hedge_delay(self, model: str, percentile: float, min_delay: float) -> float:
+        """How long to wait on ``model`` before hedging onto the next one"""
+        delay = self.latency_percentile(model, percentile)
+        if delay is None:
+            delay = self.prior_latency_seconds
+        return max(delay, min_delay)
+
+    def _available(self, stats: ModelStats, now: float, claim_probe: bool) -> bool:
+        if stats.state == "closed":
+            return True
+        if now - stats.opened_at >= self.cooldown_seconds:
+            # Let one probe through per cooldown; its outcome closes or re-opens the circuit
+            if claim_probe:
+                stats.state = "half_open"
+                stats.opened_at = now
+            return True
+        return False
+
+    def candidates(self, claim_probes: bool = True) -> List[str]:
+        """Models to try, fastest expected first, skipping open circuits.
+
+        If every circuit is open the full chain is returned anyway (oldest
+        opened first) so requests degrade to the old behaviour instead of
+        failing outright.
+        """
+        now = time.time()
+        available = [stats for stats in self._stats.values() if self._available(stats, now, claim_probes)]
+        if not available:
+            return [stats.name for stats in sorted(self._stats.values(), key=lambda s: s.opened_at)]
+
+        available.sort(key=lambda stats: (self.expected_latency(stats), stats.position))
+        return [stats.name for stats in available]
+
+    def record_success(self, model: str, latency: float):
+        stats = self._stats[model]
+        stats.successes += 1
+        stats.consecutive_failures = 0
+        stats.latency_samples.append(latency)
+        stats.ewma_latency = latency if stats.ewma_latency is None else (
+            self.alpha * latency + (1 - self.alpha) * stats.ewma_latency
+        )
+        stats.ewma_error_rate = (1 - self.alpha) * stats.ewma_error_rate
+        stats.state = "closed"
+
+    def record_failure(self, model: str, latency: float, error: str):
+        stats = self._stats[model]
+        stats.failures += 1
+        stats.consecutive_failures += 1
+        stats.last_error = error[:200]
+        stats.ewma_error_rate = self.alpha + (1 - self.alpha) * stats.ewma_error_rate
+        # A slow failure (e.g. a timeout) also says something about latency
+        if stats.ewma_latency is None or latency > stats.ewma_latency:
+            stats.ewma_latency = latency if stats.ewma_latency is None else (
+                self.alpha * latency + (1 - self.alpha) * stats.ewma_latency
+            )
+
+        if stats.state == "half_open" or stats.consecutive_failures >= self.failure_threshold:
+            if stats.state != "open":
+                logger.warning(
+                    "Circuit opened for model %s after %d failures", model, stats.consecutive_failures,
+                    extra={"model": model},
+                )
+            stats.state = "open"
+            stats.opened_at = time.time()
+
+    def stats(self) -> Dict:
+        """Current routing table, in the order the next request would use"""
+        order = self.candidates(claim_probes=False)
+        table = []
+        for stats in sorted(self._stats.values(), key=lambda s: order.index(s.name) if s.name in order else len(order)):
+            p90 = self.latency_percentile(stats.name, 0.9)
+            table.append({
+                "model": stats.name,
+                "state": stats.state,
+                "expected_latency_seconds": round(self.expected_latency(stats), 3),
+                "ewma_latency_seconds": round(stats.ewma_latency, 3) if stats.ewma_latency is not None else None,
+                "p90_latency_seconds": round(p90, 3) if p90 is not None else None,
+                "ewma_error_rate": round(stats.ewma_error_rate, 4),
+                "consecutive_failures": stats.consecutive_failures,
+                "successes": stats.successes,
+                "failures": stats.failures,
+                "last_error": stats.last_error,
+            })
+        return {"order": order, "models": table}
+
+
+def _configured_models() -> List[str]:
+    raw = os.getenv("LLM_MODELS", "mistral,openai,searchgpt")
+    return [name.strip() for name in raw.split(",") if name.strip()]
+
+
+# Global model router instance
+model_router = ModelRouter(
+    models=_configured_models(),
+    alpha=float(os.getenv("MODEL_ROUTER_EWMA_ALPHA", "0.2")),
+    failure_threshold=int(os.getenv("MODEL_ROUTER_FAILURE_THRESHOLD", "3")),
+    cooldown_seconds=float(os.getenv("MODEL_ROUTER_COOLDOWN_SECONDS", "30")),
+    prior_latency_seconds=float(os.getenv("MODEL_ROUTER_PRIOR_LATENCY_SECONDS", "5")),
+)
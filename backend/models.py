@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -18,6 +18,7 @@ class User(Base):
     is_verified = Column(Boolean, default=False)
     verification_token = Column(String, nullable=True)
     is_premium = Column(Boolean, default=False)
+    premium_until = Column(DateTime(timezone=True), nullable=True)  # Subscription period end + grace period
     
     # User preferences
     auto_save_enabled = Column(Boolean, default=True)
@@ -67,6 +68,15 @@ class UsageStats(Base):
     # Relationships
     user = relationship("User", back_populates="usage_stats")
 
+class UsageCounter(Base):
+    __tablename__ = "usage_counters"
+    
+    # Composite primary key doubles as the (user_id, action, bucket_start) lookup index
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    action = Column(String, primary_key=True)  # 'generate'
+    bucket_start = Column(Integer, primary_key=True)  # Hours since the Unix epoch
+    count = Column(Integer, nullable=False, default=0)
+
 class Subscription(Base):
     __tablename__ = "subscriptions"
     
@@ -216,4 +226,59 @@ class UserMemory(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+class GenerationCacheEntry(Base):
+    __tablename__ = "generation_cache"
+    
+    cache_key = Column(String(64), primary_key=True)  # sha256 of messages + model chain + max_tokens
+    response = Column(Text, nullable=False)
+    expires_at = Column(Float, nullable=False, index=True)  # Unix timestamp, avoids naive/aware datetime mismatches
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class RateLimitState(Base):
+    __tablename__ = "rate_limit_state"
+    
+    key = Column(String, primary_key=True)  # e.g. 'user:<email>', 'apikey:<hash>', 'ip:<address>'
+    tat = Column(Float, nullable=False, index=True)  # GCRA theoretical arrival time (Unix timestamp)
+
+class UserAnalyticsSummary(Base):
+    __tablename__ = "user_analytics_summary"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_generations = Column(Integer, nullable=False, default=0)
+    saved_content = Column(Integer, nullable=False, default=0)
+    favorites = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class RepurposeJob(Base):
+    __tablename__ = "repurpose_jobs"
+    
+    id = Column(String(32), primary_key=True)  # uuid4 hex, handed to the client
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String, nullable=False, default="queued")  # 'queued', 'running', 'completed', 'failed'
+    payload = Column(Text, nullable=False)  # JSON: resolved content, memory, platforms, context
+    result = Column(Text, nullable=True)  # JSON response body once completed
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)  # Renewed by the running worker's heartbeat
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class UserMemoryDigest(Base):
+    __tablename__ = "user_memory_digest"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    digest = Column(Text, nullable=False)  # Ready-to-prompt memory + recent generations context
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+# Composite indexes for the per-user hot paths (quota checks, history pages, analytics).
+# Tables created before these existed get them from migrations.create_missing_indexes.
+Index("ix_usage_stats_user_action_created", UsageStats.user_id, UsageStats.action, UsageStats.created_at)
+Index("ix_content_generations_user_created", ContentGeneration.user_id, ContentGeneration.created_at.desc())
+Index("ix_saved_content_user_created", SavedContent.user_id, SavedContent.created_at.desc())
+Index("ix_payment_history_user_created", PaymentHistory.user_id, PaymentHistory.created_at.desc())
+Index("ix_subscriptions_user_status", Subscription.user_id, Subscription.status)
+Index("ix_repurpose_jobs_user_status", RepurposeJob.user_id, RepurposeJob.status)
+Index("ix_repurpose_jobs_status_created", RepurposeJob.status, RepurposeJob.created_at)
@@ -0,0 +1,78 @@
+"""
+Keyset Pagination
+Cursor-based paging on (created_at, id) so deep pages cost the same as the
+first one; offset paging is kept as a fallback for existing clients
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+# Every paginated endpoint returns the next page's cursor in this header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Larger requested limits are clamped, not rejected; the rest is reached by cursor
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque cursor pointing just past the given row"""
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; malformed cursors are a client error"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def paginate(
+    query: Query,
+    model,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    entity: Callable[[Any], Any] = lambda row: row,
+) -> Tuple[List[Any], Optional[str]]:
+    """Newest-first page of ``query`` and the cursor for the next page.
+
+    With a cursor the page starts strictly after the cursor's row (keyset
+    seek, served by the (user_id, created_at) indexes); without one,
+    ``offset`` is applied as before. ``entity`` picks the ``model``
+    instance out of each row for queries that select several entities.
+    ``limit`` is capped at MAX_PAGE_SIZE. The next cursor is None on the
+    last page.
+    """
+    limit = min(limit, MAX_PAGE_SIZE)
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        # The leading <= bound lets the (user_id, created_at) index range
+        # scan in order; a bare OR makes the planner merge two scans and
+        # sort every older row the user has
+        query = query.filter(and_(
+            model.created_at <= created_at,
+            or_(model.created_at < created_at, model.id < row_id)
+        ))
+    elif offset:
+        query = query.offset(offset)
+
+    rows = query.limit(limit + 1).all()
+    page = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit and page:
+        last = entity(page[-1])
+        if last.created_at is not None:
+            next_cursor = encode_cursor(last.created_at, last.id)
+
+    return page, next_cursor
@@ -8,6 +8,8 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
 from sqlalchemy.orm import Session
 from models import User, Subscription, PaymentHistory
+from identity_cache import invalidate_user_identity
+from subscription_manager import subscription_manager
 import logging
 
 # Set up logging
@@ -136,12 +138,14 @@ class PaymentProcessor:
             
             # Upgrade user to premium
             user.is_premium = True
+            user.premium_until = subscription_manager.compute_premium_until(subscription.current_period_end)
             
             # Mark verification as completed
             payment_record.verification_completed_at = datetime.now(timezone.utc)
             
             # Commit all changes
             self.db.commit()
+            invalidate_user_identity(user_id)
             self.db.refresh(user)
             self.db.refresh(subscription)
             self.db.refresh(payment_record)
@@ -271,6 +275,7 @@ class PaymentProcessor:
             
             # Downgrade user
             user.is_premium = False
+            user.premium_until = None
             
             # Create payment record for cancellation
             cancellation_record = PaymentHistory(
@@ -289,6 +294,7 @@ class PaymentProcessor:
             
             self.db.add(cancellation_record)
             self.db.commit()
+            invalidate_user_identity(user_id)
             
             logger.info(f"✅ Successfully cancelled subscription for user {user.email}")
             
@@ -0,0 +1,98 @@
+"""
+Usage Quota Counters
+Hourly per-user counters for rate-limited actions, so quota checks are a
+single indexed lookup instead of a COUNT(*) over the usage_stats log
+"""
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import UsageCounter, UsageStats
+
+BUCKET_SECONDS = 3600
+
+
+def current_bucket(now: Optional[float] = None) -> int:
+    """Index of the hourly bucket containing ``now`` (hours since the Unix epoch)"""
+    return int((now if now is not None else time.time()) // BUCKET_SECONDS)
+
+
+def _upsert(db: Session):
+    dialect = db.get_bind().dialect.name
+    return postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+
+def record_usage(db: Session, user_id: int, action: str = "generate", amount: int = 1):
+    """Add ``amount`` to the user's counter for the current hour.
+
+    Runs inside the caller's transaction, so commit it together with the
+    matching UsageStats row(s).
+    """
+    table = UsageCounter.__table__
+    statement = _upsert(db)(table).values(
+        user_id=user_id,
+        action=action,
+        bucket_start=current_bucket(),
+        count=amount,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.action, table.c.bucket_start],
+        set_={"count": table.c.count + amount},
+    )
+    db.execute(statement)
+
+
+def get_usage_in_window(db: Session, user_id: int, action: str = "generate", hours: int = 24) -> int:
+    """Usage in the current hourly bucket plus the ``hours`` buckets before it.
+
+    Buckets are aligned to calendar hours, so the window is rounded out
+    rather than in: usage recorded in hour H keeps counting through hour
+    H + ``hours``, i.e. for at least ``hours`` hours and at most one more.
+    """
+    oldest_bucket = current_bucket() - hours
+    total = db.query(func.coalesce(func.sum(UsageCounter.count), 0)).filter(
+        UsageCounter.user_id == user_id,
+        UsageCounter.action == action,
+        UsageCounter.bucket_start >= oldest_bucket
+    ).scalar()
+    return int(total or 0)
+
+
+def prune_usage_counters(db: Session, hours: int = 48):
+    """Delete buckets older than any quota window we check"""
+    db.query(UsageCounter).filter(
+        UsageCounter.bucket_start < current_bucket() - hours
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def backfill_usage_counters(db: Session, action: str = "generate", hours: int = 24):
+    """Seed counters from the usage_stats log the first time the table is used.
+
+    Without this, everyone's quota would reset when the counters ship.
+    """
+    if db.query(UsageCounter.user_id).first() is not None:
+        return 0
+
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    rows = db.query(UsageStats.user_id, UsageStats.created_at).filter(
+        UsageStats.action == action,
+        UsageStats.created_at >= since
+    ).all()
+
+    counts = defaultdict(int)
+    for user_id, created_at in rows:
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        counts[(user_id, current_bucket(created_at.timestamp()))] += 1
+
+    for (user_id, bucket_start), count in counts.items():
+        db.add(UsageCounter(user_id=user_id, action=action, bucket_start=bucket_start, count=count))
+    db.commit()
+
+    return len(counts)
@@ -0,0 +1,126 @@
+"""
+Rate Limiting Engine
+GCRA (generic cell rate algorithm) limiter with O(1) state per key, an
+in-memory backend and an optional shared database backend
+"""
+import os
+import time
+from typing import Dict, Tuple
+
+from sqlalchemy import func, select, delete
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import RateLimitState
+
+
+class MemoryRateLimitBackend:
+    """Per-process GCRA state: one float (theoretical arrival time) per key.
+
+    Keys whose arrival time has passed carry no information (a fresh key
+    behaves identically), so they are swept out periodically instead of
+    accumulating forever.
+    """
+
+    def __init__(self, sweep_interval_seconds: float = 60.0):
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._tats: Dict[str, float] = {}
+        self._last_sweep = time.monotonic()
+
+    def hit(self, key: str, emission_interval: float, burst_tolerance: float, now: float) -> Tuple[bool, float]:
+        self._maybe_sweep(now)
+
+        tat = max(self._tats.get(key, now), now)
+        allow_at = tat - burst_tolerance
+        if allow_at > now:
+            return False, allow_at - now
+
+        self._tats[key] = tat + emission_interval
+        return True, 0.0
+
+    def _maybe_sweep(self, now: float):
+        if time.monotonic() - self._last_sweep < self.sweep_interval_seconds:
+            return
+        self._last_sweep = time.monotonic()
+        self._tats = {key: tat for key, tat in self._tats.items() if tat > now}
+
+    def size(self) -> int:
+        return len(self._tats)
+
+
+class DatabaseRateLimitBackend:
+    """GCRA state shared across workers through the ``rate_limit_state`` table.
+
+    Each hit is a single conditional upsert, so concurrent workers cannot
+    both consume the last slot. Blocking; run it off the event loop.
+    """
+
+    def __init__(self, engine, sweep_interval_seconds: float = 300.0):
+        self.engine = engine
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._last_sweep = time.monotonic()
+
+        if engine.dialect.name == "postgresql":
+            self._insert = postgresql.insert
+            self._greatest = func.greatest
+        else:
+            self._insert = sqlite.insert
+            self._greatest = func.max
+
+    def hit(self, key: str, emission_interval: float, burst_tolerance: float, now: float) -> Tuple[bool, float]:
+        table = RateLimitState.__table__
+        current_tat = self._greatest(table.c.tat, now)
+
+        statement = self._insert(table).values(key=key, tat=now + emission_interval)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={"tat": current_tat + emission_interval},
+            where=(current_tat - burst_tolerance) <= now,
+        ).returning(table.c.tat)
+
+        with self.engine.begin() as conn:
+            allowed = conn.execute(statement).first() is not None
+            if allowed:
+                self._maybe_sweep(conn, now)
+                return True, 0.0
+
+            tat = conn.execute(select(table.c.tat).where(table.c.key == key)).scalar() or now
+            return False, max(0.0, tat - burst_tolerance - now)
+
+    def _maybe_sweep(self, conn, now: float):
+        if time.monotonic() - self._last_sweep < self.sweep_interval_seconds:
+            return
+        self._last_sweep = time.monotonic()
+        table = RateLimitState.__table__
+        conn.execute(delete(table).where(table.c.tat < now))
+
+    def size(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(RateLimitState.__table__)).scalar()
+
+
+class RateLimiter:
+    """Allows ``limit`` requests per ``period_seconds`` per key, including a full-size burst"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def hit(self, key: str, limit: int, period_seconds: float = 60.0) -> Tuple[bool, float]:
+        """Consume one request for ``key``; returns (allowed, retry_after_seconds)"""
+        emission_interval = period_seconds / limit
+        burst_tolerance = period_seconds - emission_interval
+        return self.backend.hit(key, emission_interval, burst_tolerance, time.time())
+
+    @property
+    def is_shared(self) -> bool:
+        return not isinstance(self.backend, MemoryRateLimitBackend)
+
+
+def _build_rate_limiter() -> RateLimiter:
+    if os.getenv("RATE_LIMIT_BACKEND", "memory").lower() == "database":
+        from database import engine
+        return RateLimiter(DatabaseRateLimitBackend(engine))
+    return RateLimiter(MemoryRateLimitBackend())
+
+
+# Global rate limiter instance
+rate_limiter = _build_rate_limiter()
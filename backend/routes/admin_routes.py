@@ -3,7 +3,7 @@ Admin Routes for SnippetStream
 Provides administrative endpoints for subscription management and system monitoring
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
 from datetime import datetime, timezone
@@ -15,6 +15,7 @@ from auth import get_current_user
 from models import User, Subscription
 from subscription_manager import SubscriptionManager
 from background_tasks import manual_subscription_check
+from pagination import paginate, NEXT_CURSOR_HEADER
 
 router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
 
@@ -129,13 +130,15 @@ async def get_admin_stats(
 
 @router.get("/subscriptions", response_model=List[SubscriptionInfo])
 async def get_all_subscriptions(
+    response: Response,
     status_filter: Optional[str] = None,
-    limit: int = 100,
-    offset: int = 0,
+    limit: int = Query(100, ge=1),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     admin_user: User = Depends(is_admin_user)
 ):
-    """Get all subscriptions with detailed information"""
+    """Get all subscriptions with detailed information (next page cursor in X-Next-Cursor)"""
     try:
         current_time = datetime.now(timezone.utc)
         
@@ -144,7 +147,11 @@ async def get_all_subscriptions(
         if status_filter:
             query = query.filter(Subscription.status == status_filter)
         
-        subscriptions = query.order_by(Subscription.created_at.desc()).offset(offset).limit(limit).all()
+        subscriptions, next_cursor = paginate(
+            query, Subscription, limit, cursor=cursor, offset=offset, entity=lambda row: row[0]
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         result = []
         for subscription, user in subscriptions:
@@ -174,6 +181,8 @@ async def get_all_subscriptions(
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
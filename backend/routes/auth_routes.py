@@ -10,10 +10,11 @@ import os
 import requests
 
 from database import get_db
+from db_executor import run_db
 from auth import (
     authenticate_user, create_access_token, create_refresh_token,
     get_current_user, get_current_active_user, create_user,
-    get_user_by_email, get_user_by_username, verify_token,
+    get_user_by_email, get_user_by_username, decode_token,
     ACCESS_TOKEN_EXPIRE_MINUTES, verify_google_token, create_google_user,
     get_user_by_google_id, GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET
 )
@@ -187,12 +188,12 @@ async def google_oauth_callback(
         print(f"✅ Google token verified for user: {google_info['email']}")
         
         # Check if user already exists by Google ID
-        user = get_user_by_google_id(db, google_info['google_id'])
+        user = await run_db(get_user_by_google_id, db, google_info['google_id'])
         
         if not user:
             print(f"🔍 User not found by Google ID, checking by email: {google_info['email']}")
             # Check if user exists by email (linking accounts)
-            user = get_user_by_email(db, google_info['email'])
+            user = await run_db(get_user_by_email, db, google_info['email'])
             if user:
                 print(f"🔗 Linking Google account to existing user: {user.email}")
                 # Link Google account to existing user
@@ -223,7 +224,7 @@ async def google_oauth_callback(
             else:
                 print(f"👤 Creating new user from Google info: {google_info['email']}")
                 # Create new user from Google info
-                user = create_google_user(db, google_info)
+                user = await run_db(create_google_user, db, google_info)
         else:
             print(f"🔄 Updating existing Google user: {user.email}")
             # Update existing Google user info (but preserve user customizations)
@@ -255,9 +256,9 @@ async def google_oauth_callback(
         # Create tokens
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": user.email}, expires_delta=access_token_expires
+            data={"sub": user.email, "uid": user.id}, expires_delta=access_token_expires
         )
-        refresh_token = create_refresh_token(data={"sub": user.email})
+        refresh_token = create_refresh_token(data={"sub": user.email, "uid": user.id})
         
         print(f"✅ Google OAuth successful for user: {user.email}")
         
@@ -298,12 +299,12 @@ async def google_auth(google_data: GoogleAuthRequest, db: Session = Depends(get_
         print(f"✅ Google token verified for user: {google_info['email']}")
         
         # Check if user already exists by Google ID
-        user = get_user_by_google_id(db, google_info['google_id'])
+        user = await run_db(get_user_by_google_id, db, google_info['google_id'])
         
         if not user:
             print(f"🔍 User not found by Google ID, checking by email: {google_info['email']}")
             # Check if user exists by email (linking accounts)
-            user = get_user_by_email(db, google_info['email'])
+            user = await run_db(get_user_by_email, db, google_info['email'])
             if user:
                 print(f"🔗 Linking Google account to existing user: {user.email}")
                 # Link Google account to existing user
@@ -334,7 +335,7 @@ async def google_auth(google_data: GoogleAuthRequest, db: Session = Depends(get_
             else:
                 print(f"👤 Creating new user from Google info: {google_info['email']}")
                 # Create new user from Google info
-                user = create_google_user(db, google_info)
+                user = await run_db(create_google_user, db, google_info)
         else:
             print(f"🔄 Updating existing Google user: {user.email}")
             # Update existing Google user info (but preserve user customizations)
@@ -378,9 +379,9 @@ async def google_auth(google_data: GoogleAuthRequest, db: Session = Depends(get_
         # Create tokens
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": user.email}, expires_delta=access_token_expires
+            data={"sub": user.email, "uid": user.id}, expires_delta=access_token_expires
         )
-        refresh_token = create_refresh_token(data={"sub": user.email})
+        refresh_token = create_refresh_token(data={"sub": user.email, "uid": user.id})
         
         user_response = UserResponse(
             id=user.id,
@@ -431,13 +432,13 @@ async def register(user_data: UserCreate, background_tasks: BackgroundTasks, db:
         )
     
     # Check if user already exists
-    if get_user_by_email(db, user_data.email):
+    if await run_db(get_user_by_email, db, user_data.email):
         raise HTTPException(
             status_code=400,
             detail="Email already registered"
         )
     
-    if get_user_by_username(db, user_data.username):
+    if await run_db(get_user_by_username, db, user_data.username):
         raise HTTPException(
             status_code=400,
             detail="Username already taken"
@@ -445,7 +446,8 @@ async def register(user_data: UserCreate, background_tasks: BackgroundTasks, db:
     
     # Create user
     try:
-        user = create_user(
+        user = await run_db(
+            create_user,
             db=db,
             email=user_data.email,
             username=user_data.username,
@@ -486,9 +488,9 @@ async def register(user_data: UserCreate, background_tasks: BackgroundTasks, db:
         # Create tokens for verified users/OAuth
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": user.email}, expires_delta=access_token_expires
+            data={"sub": user.email, "uid": user.id}, expires_delta=access_token_expires
         )
-        refresh_token = create_refresh_token(data={"sub": user.email})
+        refresh_token = create_refresh_token(data={"sub": user.email, "uid": user.id})
         
         return Token(
             access_token=access_token,
@@ -507,7 +509,7 @@ async def register(user_data: UserCreate, background_tasks: BackgroundTasks, db:
 @auth_router.post("/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Login user"""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await run_db(authenticate_user, db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -530,9 +532,9 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "uid": user.id}, expires_delta=access_token_expires
     )
-    refresh_token = create_refresh_token(data={"sub": user.email})
+    refresh_token = create_refresh_token(data={"sub": user.email, "uid": user.id})
     
     user_response = UserResponse(
         id=user.id,
@@ -556,15 +558,16 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 @auth_router.post("/refresh", response_model=dict)
 async def refresh_token(token_data: TokenRefresh, db: Session = Depends(get_db)):
     """Refresh access token"""
-    email = verify_token(token_data.refresh_token, "refresh")
-    if not email:
+    claims = decode_token(token_data.refresh_token, "refresh")
+    if not claims:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token"
         )
     
-    user = get_user_by_email(db, email)
-    if not user or not user.is_active:
+    user = await run_db(get_user_by_email, db, claims["sub"])
+    # A refresh token with a user id only refreshes that account, even if its email moved
+    if not user or not user.is_active or claims.get("uid", user.id) != user.id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found or inactive"
@@ -572,7 +575,7 @@ async def refresh_token(token_data: TokenRefresh, db: Session = Depends(get_db))
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "uid": user.id}, expires_delta=access_token_expires
     )
     
     return {
@@ -621,7 +624,7 @@ async def update_profile(
             )
         
         # Check if username is already taken by another user
-        existing_user = get_user_by_username(db, profile_data.username)
+        existing_user = await run_db(get_user_by_username, db, profile_data.username)
         if existing_user and existing_user.id != current_user.id:
             print(f"❌ Username already taken: {profile_data.username}")
             raise HTTPException(
@@ -674,14 +677,13 @@ async def get_usage_stats(
     db: Session = Depends(get_db)
 ):
     try:
-        from models import UsageStats, ContentGeneration
+        from models import ContentGeneration
         from datetime import datetime, timedelta, timezone
         import sqlalchemy
         
         # Get current time in UTC
         now_utc = datetime.now(timezone.utc)
         thirty_days_ago = now_utc - timedelta(days=30)
-        twenty_four_hours_ago = now_utc - timedelta(hours=24)
         
         # Helper to handle potential naive/aware comparison issues
         def get_count_robust(query, date_limit):
@@ -691,12 +693,6 @@ async def get_usage_stats(
                 # If it fails due to timezone mismatch, try naive
                 return query.filter(ContentGeneration.created_at >= date_limit.replace(tzinfo=None)).count()
 
-        def get_usage_robust(query, date_limit):
-            try:
-                return query.filter(UsageStats.created_at >= date_limit).count()
-            except sqlalchemy.exc.StatementError:
-                return query.filter(UsageStats.created_at >= date_limit.replace(tzinfo=None)).count()
-        
         total_generations = db.query(ContentGeneration).filter(
             ContentGeneration.user_id == current_user.id
         ).count()
@@ -709,11 +705,8 @@ async def get_usage_stats(
         # Rate limit info - 24 hour window
         rate_limit = 20 if current_user.is_premium else 2
         
-        recent_usage_query = db.query(UsageStats).filter(
-            UsageStats.user_id == current_user.id,
-            UsageStats.action == "generate"
-        )
-        recent_usage = get_usage_robust(recent_usage_query, twenty_four_hours_ago)
+        from quota import get_usage_in_window
+        recent_usage = get_usage_in_window(db, current_user.id, "generate", hours=24)
         remaining_requests = max(0, rate_limit - recent_usage)
         
         return {
@@ -850,7 +843,7 @@ async def request_password_reset(
     db: Session = Depends(get_db)
 ):
     """Request password reset link"""
-    user = get_user_by_email(db, reset_request.email)
+    user = await run_db(get_user_by_email, db, reset_request.email)
     
     # Always return success to prevent email enumeration
     if not user:
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session, defer, load_only
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timezone
@@ -8,9 +9,14 @@ import json
 from database import get_db
 from auth import get_current_active_user, check_rate_limit
 from models import User, ContentGeneration, SavedContent, UsageStats
+from analytics import get_content_analytics as aggregate_content_analytics, bump_analytics_summary
+from pagination import paginate, NEXT_CURSOR_HEADER
+from db_executor import run_db
 
 content_router = APIRouter()
 
+HISTORY_PREVIEW_CHARS = 200
+
 # Pydantic models
 class SaveContentRequest(BaseModel):
     title: str
@@ -71,6 +77,7 @@ async def save_content(
         )
         
         db.add(saved_content)
+        bump_analytics_summary(db, current_user.id, saved_content=1)
         db.commit()
         db.refresh(saved_content)
         
@@ -103,14 +110,20 @@ async def save_content(
 
 @content_router.get("/saved", response_model=List[SavedContentResponse])
 async def get_saved_content(
+    response: Response,
     content_type: Optional[str] = None,
     is_favorite: Optional[bool] = None,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get user's saved content"""
+    """Get user's saved content
+    
+    Pass the X-Next-Cursor response header back as ``cursor`` to fetch the
+    next page; ``offset`` still works when no cursor is given.
+    """
     from feature_gates import get_feature_gate
     
     # Check if user can access saved content (premium only)
@@ -128,7 +141,9 @@ async def get_saved_content(
     if is_favorite is not None:
         query = query.filter(SavedContent.is_favorite == is_favorite)
     
-    saved_content = query.order_by(SavedContent.created_at.desc()).offset(offset).limit(limit).all()
+    saved_content, next_cursor = paginate(query, SavedContent, limit, cursor=cursor, offset=offset)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     return [
         SavedContentResponse(
@@ -177,6 +192,8 @@ async def update_saved_content(
     if request.tags is not None:
         saved_content.tags = request.tags
     if request.is_favorite is not None:
+        if bool(request.is_favorite) != bool(saved_content.is_favorite):
+            bump_analytics_summary(db, current_user.id, favorites=1 if request.is_favorite else -1)
         saved_content.is_favorite = request.is_favorite
     
     saved_content.updated_at = datetime.now(timezone.utc)
@@ -223,18 +240,33 @@ async def delete_saved_content(
         )
     
     db.delete(saved_content)
+    bump_analytics_summary(db, current_user.id, saved_content=-1, favorites=-1 if saved_content.is_favorite else 0)
     db.commit()
     
     return {"message": "Content deleted successfully"}
 
 @content_router.get("/history", response_model=List[ContentHistoryResponse])
 async def get_content_history(
-    limit: int = 20,
-    offset: int = 0,
+    response: Response,
+    limit: int = Query(20, ge=1),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    fields: str = "full",
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get user's content generation history"""
+    """Get user's content generation history
+    
+    Pass the X-Next-Cursor response header back as ``cursor`` to fetch the
+    next page; ``offset`` still works when no cursor is given.
+    
+    ``fields=summary`` returns only metadata and the content preview, with
+    the generated posts left empty; fetch them from /history/{id}.
+    """
+    if fields not in ("full", "summary"):
+        raise HTTPException(status_code=400, detail="fields must be 'full' or 'summary'")
+    summary = fields == "summary"
+    
     from feature_gates import get_feature_gate
     feature_gate = get_feature_gate(current_user)
     tier_limit = feature_gate.get_history_limit()
@@ -242,23 +274,41 @@ async def get_content_history(
     # Use the smaller of requested limit and tier limit
     effective_limit = min(limit, tier_limit)
     
-    history = db.query(ContentGeneration).filter(
+    # The preview is cut in SQL so the full original content never leaves the database
+    preview = func.substr(ContentGeneration.original_content, 1, HISTORY_PREVIEW_CHARS).label("preview")
+    content_length = func.length(ContentGeneration.original_content).label("content_length")
+    if summary:
+        loader = load_only(
+            ContentGeneration.id,
+            ContentGeneration.content_source,
+            ContentGeneration.processing_time,
+            ContentGeneration.created_at
+        )
+    else:
+        loader = defer(ContentGeneration.original_content)
+    
+    query = db.query(ContentGeneration, preview, content_length).options(loader).filter(
         ContentGeneration.user_id == current_user.id
-    ).order_by(ContentGeneration.created_at.desc()).offset(offset).limit(effective_limit).all()
+    )
+    history, next_cursor = await run_db(
+        paginate, query, ContentGeneration, effective_limit, cursor=cursor, offset=offset, entity=lambda row: row[0]
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     return [
         ContentHistoryResponse(
             id=item.id,
-            original_content=item.original_content[:200] + "..." if len(item.original_content) > 200 else item.original_content,
+            original_content=item_preview + "..." if item_length > HISTORY_PREVIEW_CHARS else item_preview,
             content_source=item.content_source,
-            twitter_thread=item.twitter_thread,
-            linkedin_post=item.linkedin_post,
-            instagram_carousel=item.instagram_carousel,
-            context=item.context,
+            twitter_thread=None if summary else item.twitter_thread,
+            linkedin_post=None if summary else item.linkedin_post,
+            instagram_carousel=None if summary else item.instagram_carousel,
+            context=None if summary else item.context,
             processing_time=item.processing_time,
             created_at=item.created_at.isoformat()
         )
-        for item in history
+        for item, item_preview, item_length in history
     ]
 
 @content_router.get("/history/{generation_id}", response_model=ContentHistoryResponse)
@@ -353,42 +403,10 @@ async def get_content_analytics(
     # Get analytics for last 30 days
     thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
     
-    # Content generation stats
-    total_generations = db.query(ContentGeneration).filter(
-        ContentGeneration.user_id == current_user.id
-    ).count()
-    
-    recent_generations = db.query(ContentGeneration).filter(
-        ContentGeneration.user_id == current_user.id,
-        ContentGeneration.created_at >= thirty_days_ago
-    ).count()
-    
-    # Platform breakdown
-    platform_stats = {}
-    for platform in ['twitter', 'linkedin', 'instagram']:
-        count = db.query(UsageStats).filter(
-            UsageStats.user_id == current_user.id,
-            UsageStats.platform == platform,
-            UsageStats.action == 'copy',
-            UsageStats.created_at >= thirty_days_ago
-        ).count()
-        platform_stats[platform] = count
-    
-    # Saved content stats
-    saved_count = db.query(SavedContent).filter(
-        SavedContent.user_id == current_user.id
-    ).count()
-    
-    favorites_count = db.query(SavedContent).filter(
-        SavedContent.user_id == current_user.id,
-        SavedContent.is_favorite == True
-    ).count()
+    # All counters in one round trip
+    analytics = await run_db(aggregate_content_analytics, db, current_user.id, thirty_days_ago)
     
     return {
-        "total_generations": total_generations,
-        "recent_generations": recent_generations,
-        "platform_usage": platform_stats,
-        "saved_content": saved_count,
-        "favorites": favorites_count,
+        **analytics,
         "account_age_days": (datetime.now(timezone.utc) - current_user.created_at).days
     }
\ No newline at end of file
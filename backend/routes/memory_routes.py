@@ -5,6 +5,7 @@ from typing import Optional, List
 from database import get_db
 from auth import get_current_active_user
 from models import User, UserMemory
+from memory_digest import refresh_memory_digest
 import json
 
 memory_router = APIRouter()
@@ -59,6 +60,8 @@ async def update_memory(
         )
         db.add(memory)
     
+    db.flush()
+    refresh_memory_digest(db, current_user.id)
     db.commit()
     db.refresh(memory)
     
@@ -3,9 +3,10 @@ REFACTORED Payment Routes - Simple and Reliable
 """
 import os
 import json
+import logging
 import uuid
 from datetime import datetime, timedelta, timezone
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional
@@ -14,8 +15,12 @@ from database import get_db
 from auth import get_current_active_user
 from models import User, Subscription, PaymentHistory
 from subscription_manager import subscription_manager
+from identity_cache import invalidate_user_identity
+from pagination import paginate, NEXT_CURSOR_HEADER
+from db_executor import run_db
 
 payment_router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Helper function to safely get values from webhook data (dict or object)
 def safe_get(data, key, default=None):
@@ -58,19 +63,19 @@ def serialize_webhook_data(data):
 # Real DodoPayments integration
 try:
     from dodopayments import DodoPayments
-    print("[INFO] Using real DodoPayments SDK")
+    logger.info("Using real DodoPayments SDK")
     
     # Initialize real Dodo Payments client with webhook key
     raw_token = os.environ.get("DODO_PAYMENTS_API_KEY")
     bearer_token = str(raw_token or "").strip()
     
     if not bearer_token:
-        print("[WARN] DODO_PAYMENTS_API_KEY missing, using mock implementation for startup")
+        logger.warning("DODO_PAYMENTS_API_KEY missing, using mock implementation for startup")
         raise ImportError("DODO_PAYMENTS_API_KEY missing")
         
     env_mode = os.environ.get("DODO_PAYMENTS_ENVIRONMENT", "test_mode")
-    print(f"[DODO] Environment: {env_mode}")
-    print(f"[DODO] Token diagnostic: {bearer_token[:8]}... (length: {len(bearer_token)})")
+    # Never log any part of the token itself
+    logger.info("DodoPayments environment: %s (token length %d)", env_mode, len(bearer_token))
     
     dodo_client = DodoPayments(
         bearer_token=bearer_token,
@@ -80,9 +85,9 @@ try:
     
 except (ImportError, Exception) as error:
     if "DODO_PAYMENTS_API_KEY" not in str(error):
-        print(f"[WARN] DodoPayments setup issue: {error}")
+        logger.warning("DodoPayments setup issue: %s", error)
     else:
-        print("[WARN] DODO_PAYMENTS_API_KEY missing, falling back to mock")
+        logger.warning("DODO_PAYMENTS_API_KEY missing, falling back to mock")
     
     # Fallback mock implementation
     class MockSession:
@@ -156,7 +161,7 @@ async def create_checkout(
     """Create Dodo Payments checkout session"""
     
     try:
-        print(f"[INFO] Creating checkout for {current_user.email} - {request.plan_id} ({request.billing_cycle})")
+        logger.info("Creating checkout", extra={"user_id": current_user.id, "plan_id": request.plan_id, "billing_cycle": request.billing_cycle})
         
         # Get product details
         product = PRODUCTS.get(request.plan_id, {}).get(request.billing_cycle)
@@ -172,7 +177,7 @@ async def create_checkout(
         
         if product.get("checkout_url"):
             # Use static checkout URL from env
-            print(f"[INFO] Using static checkout URL for {request.plan_id} {request.billing_cycle}")
+            logger.info("Using static checkout URL", extra={"plan_id": request.plan_id, "billing_cycle": request.billing_cycle})
             
             # Base URL from env
             base_url = product["checkout_url"]
@@ -216,7 +221,7 @@ async def create_checkout(
             
             session_id = f"link_{uuid.uuid4().hex[:16]}"
             
-            print(f"[INFO] Generated dynamic link: {checkout_url}")
+            logger.info("Generated dynamic checkout link", extra={"checkout_url": checkout_url})
             
             # Attempt to append user info if URL allows (simple append)
             # Dodo Payment Links usually serve as a base
@@ -265,8 +270,7 @@ async def create_checkout(
         db.add(payment_record)
         db.commit()
         
-        print(f"[OK] Checkout created: {checkout_url}")
-        print(f"[INFO] Payment ID: {payment_id}")
+        logger.info("Checkout created", extra={"user_id": current_user.id, "payment_id": payment_id, "checkout_url": checkout_url})
         
         return PaymentResponse(
             success=True,
@@ -275,7 +279,7 @@ async def create_checkout(
         )
         
     except Exception as e:
-        print(f"[ERROR] Checkout creation failed: {e}")
+        logger.exception("Checkout creation failed: %s", e, extra={"user_id": current_user.id})
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create checkout: {str(e)}")
 
@@ -296,7 +300,7 @@ async def check_payment_status(
     """
     
     try:
-        print(f"[INFO] Checking payment status for {current_user.email}")
+        logger.info("Checking payment status", extra={"user_id": current_user.id})
         
         # 1. REAL-TIME LOCAL CHECK
         actual_premium_status = subscription_manager.check_user_subscription_status(current_user.id, db)
@@ -314,32 +318,32 @@ async def check_payment_status(
                 sub_id_to_check = request.subscription_id if request else None
                 
                 if sub_id_to_check:
-                    print(f"[INFO] Syncing via sub_id: {sub_id_to_check} using token {token_to_use[:8]}...")
+                    logger.info("Syncing payment status via subscription id", extra={"subscription_id": sub_id_to_check})
                     try:
                         remote_sub = dodo_client.subscriptions.retrieve(sub_id_to_check)
                         if remote_sub and remote_sub.status == 'active':
-                            print(f"[OK] Found active subscription: {sub_id_to_check}")
+                            logger.info("Found active subscription", extra={"subscription_id": sub_id_to_check})
                             sub_data = serialize_webhook_data(remote_sub)
-                            await handle_subscription_active_webhook(sub_data, db)
+                            await run_db(handle_subscription_active_webhook, sub_data, db)
                             db.refresh(current_user)
                             actual_premium_status = True
                     except Exception as sdk_err:
-                        print(f"[WARN] SDK retrieval failed, trying raw request: {sdk_err}")
+                        logger.warning("SDK subscription retrieval failed, trying raw request: %s", sdk_err)
                         import requests
                         r = requests.get(f"{api_base}/subscriptions/{sub_id_to_check}", headers=headers, timeout=10)
                         if r.status_code == 200:
                             sub_data = r.json()
                             if sub_data.get("status") == "active":
-                                print(f"[OK] Raw request found active subscription!")
-                                await handle_subscription_active_webhook(sub_data, db)
+                                logger.info("Raw request found active subscription", extra={"subscription_id": sub_id_to_check})
+                                await run_db(handle_subscription_active_webhook, sub_data, db)
                                 db.refresh(current_user)
                                 actual_premium_status = True
                         else:
-                            print(f"[ERROR] Raw request failed too: {r.status_code} {r.text[:100]}")
+                            logger.error("Raw subscription request failed: %s %s", r.status_code, r.text[:100], extra={"subscription_id": sub_id_to_check})
                 
                 # Priority 2: Try to find by payment_id if provided
                 elif request and request.payment_id:
-                    print(f"[INFO] Syncing via payment_id: {request.payment_id}")
+                    logger.info("Syncing payment status via payment id", extra={"payment_id": request.payment_id})
                     # We can't easily search payments by ID in SDK usually without a specific call
                     # But if we have the payment_id locally, we might have stored the session_id
                     local_payment = db.query(PaymentHistory).filter(PaymentHistory.payment_id == request.payment_id).first()
@@ -354,7 +358,7 @@ async def check_payment_status(
                 
                 # Priority 3: Last resort - list all and filter manually (since email filter failed)
                 if not actual_premium_status:
-                    print(f"[INFO] Proactive sync: Listing all subscriptions for manual filter")
+                    logger.info("Proactive sync: listing subscriptions to match the user", extra={"user_id": current_user.id})
                     # List all (paginated) and look for our user's email
                     subscriptions_list = dodo_client.subscriptions.list(page_size=20)
                     
@@ -368,14 +372,14 @@ async def check_payment_status(
                         email = getattr(cust, 'email', None) if not isinstance(cust, dict) else cust.get('email')
                         
                         if email == current_user.email and sub.status == 'active':
-                            print(f"[OK] Found active subscription in list: {sub.subscription_id}")
+                            logger.info("Found active subscription in list", extra={"subscription_id": sub.subscription_id})
                             sub_data = serialize_webhook_data(sub)
-                            await handle_subscription_active_webhook(sub_data, db)
+                            await run_db(handle_subscription_active_webhook, sub_data, db)
                             db.refresh(current_user)
                             actual_premium_status = True
                             break
             except Exception as sync_error:
-                print(f"[WARN] Proactive sync failed: {sync_error}")
+                logger.warning("Proactive sync failed: %s", sync_error, extra={"user_id": current_user.id})
         
         # 3. RETURN RESPONSE
         if current_user.is_premium and actual_premium_status:
@@ -424,7 +428,7 @@ async def check_payment_status(
         )
         
     except Exception as e:
-        print(f"[ERROR] Error checking payment status: {e}")
+        logger.exception("Error checking payment status: %s", e, extra={"user_id": current_user.id})
         raise HTTPException(status_code=500, detail=f"Failed to check payment status: {str(e)}")
 
 @payment_router.post("/verify-payment", response_model=PaymentResponse)
@@ -504,7 +508,7 @@ async def manual_expiration_check(
     #     raise HTTPException(status_code=403, detail="Admin access required")
     
     try:
-        print(f"[INFO] Manual expiration check triggered by {current_user.email}")
+        logger.info("Manual expiration check triggered", extra={"user_id": current_user.id})
         
         subscription_manager.check_expired_subscriptions(db)
         
@@ -515,7 +519,7 @@ async def manual_expiration_check(
         }
         
     except Exception as e:
-        print(f"[ERROR] Manual expiration check error: {e}")
+        logger.exception("Manual expiration check error: %s", e)
         raise HTTPException(status_code=500, detail=f"Expiration check failed: {str(e)}")
 
 @payment_router.get("/admin/subscription-health")
@@ -577,7 +581,7 @@ async def get_subscription_health(
         }
         
     except Exception as e:
-        print(f"[ERROR] Error getting subscription health: {e}")
+        logger.exception("Error getting subscription health: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get subscription health")
 
 @payment_router.post("/cancel")
@@ -588,7 +592,7 @@ async def cancel_subscription(
     """Cancel subscription"""
     
     try:
-        print(f"[INFO] Cancelling subscription for {current_user.email}")
+        logger.info("Cancelling subscription", extra={"user_id": current_user.id})
         
         # Find active subscription
         subscription = db.query(Subscription).filter(
@@ -605,6 +609,7 @@ async def cancel_subscription(
         
         # Downgrade user
         current_user.is_premium = False
+        current_user.premium_until = None
         
         # Create cancellation record
         cancellation_record = PaymentHistory(
@@ -624,8 +629,9 @@ async def cancel_subscription(
         
         db.add(cancellation_record)
         db.commit()
+        invalidate_user_identity(current_user.id)
         
-        print(f"[OK] Subscription cancelled for {current_user.email}")
+        logger.info("Subscription cancelled", extra={"user_id": current_user.id})
         
         return PaymentResponse(
             success=True,
@@ -635,21 +641,26 @@ async def cancel_subscription(
         )
         
     except Exception as e:
-        print(f"[ERROR] Cancellation failed: {e}")
+        logger.exception("Cancellation failed: %s", e, extra={"user_id": current_user.id})
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Cancellation failed: {str(e)}")
 
 @payment_router.get("/history")
 async def get_payment_history(
+    response: Response,
+    limit: int = Query(50, ge=1),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get payment history for current user"""
+    """Get payment history for current user (next page cursor in X-Next-Cursor)"""
     
     try:
-        payments = db.query(PaymentHistory).filter(
-            PaymentHistory.user_id == current_user.id
-        ).order_by(PaymentHistory.created_at.desc()).limit(50).all()
+        query = db.query(PaymentHistory).filter(PaymentHistory.user_id == current_user.id)
+        payments, next_cursor = await run_db(paginate, query, PaymentHistory, limit, cursor=cursor, offset=offset)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         history = []
         for payment in payments:
@@ -672,8 +683,10 @@ async def get_payment_history(
             "total": len(history)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"[ERROR] Error getting history: {e}")
+        logger.exception("Error getting payment history: %s", e, extra={"user_id": current_user.id})
         raise HTTPException(status_code=500, detail="Failed to get payment history")
 
 @payment_router.get("/admin/payment-stats")
@@ -745,7 +758,7 @@ async def get_payment_stats(
         }
         
     except Exception as e:
-        print(f"[ERROR] Error getting payment stats: {e}")
+        logger.exception("Error getting payment stats: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get payment statistics")
 
 # Webhook handler for Dodo Payments
@@ -753,6 +766,7 @@ async def get_payment_stats(
 async def handle_webhook(request: Request, db: Session = Depends(get_db)):
     """Handle Dodo Payments webhooks - Primary method for subscription management"""
     
+    raw_body = None
     try:
         raw_body = await request.body()
         
@@ -792,9 +806,9 @@ async def handle_webhook(request: Request, db: Session = Depends(get_db)):
                 business_id = payload.get("business_id")
                 timestamp = payload.get("timestamp")
                 
-            print("[OK] Webhook signature verified")
+            logger.info("Webhook signature verified", extra={"sampled": True})
         except Exception as webhook_error:
-            print(f"[WARN] Webhook signature verification failed: {webhook_error}")
+            logger.warning("Webhook signature verification failed: %s", webhook_error)
             # Fallback: parse the raw body as JSON (less secure but functional)
             try:
                 import json
@@ -803,48 +817,42 @@ async def handle_webhook(request: Request, db: Session = Depends(get_db)):
                 event_data = payload.get("data", {})
                 business_id = payload.get("business_id")
                 timestamp = payload.get("timestamp")
-                print("[WARN] Processing webhook without signature verification (fallback mode)")
+                logger.warning("Processing webhook without signature verification (fallback mode)")
             except Exception as parse_error:
-                print(f"[ERROR] Failed to parse webhook body: {parse_error}")
+                logger.error("Failed to parse webhook body: %s", parse_error)
                 raise HTTPException(status_code=400, detail="Invalid webhook payload")
         
-        print(f"[INFO] Webhook received: {event_type}")
-        print(f"[INFO] Business ID: {business_id}")
-        print(f"[INFO] Timestamp: {timestamp}")
+        logger.info("Webhook received: %s", event_type, extra={"business_id": business_id, "webhook_timestamp": timestamp})
         
         # Handle different webhook events according to Dodo documentation
         if event_type == 'subscription.active':
-            await handle_subscription_active_webhook(event_data, db)
+            await run_db(handle_subscription_active_webhook, event_data, db)
         elif event_type == 'subscription.updated':
-            await handle_subscription_updated_webhook(event_data, db)
+            await run_db(handle_subscription_updated_webhook, event_data, db)
         elif event_type == 'subscription.on_hold':
-            await handle_subscription_on_hold_webhook(event_data, db)
+            await run_db(handle_subscription_on_hold_webhook, event_data, db)
         elif event_type == 'subscription.failed':
-            await handle_subscription_failed_webhook(event_data, db)
+            await run_db(handle_subscription_failed_webhook, event_data, db)
         elif event_type == 'subscription.renewed':
-            await handle_subscription_renewed_webhook(event_data, db)
+            await run_db(handle_subscription_renewed_webhook, event_data, db)
         elif event_type == 'subscription.cancelled':
-            await handle_subscription_cancelled_webhook(event_data, db)
+            await run_db(handle_subscription_cancelled_webhook, event_data, db)
         elif event_type == 'payment.succeeded':
-            await handle_payment_success_webhook(event_data, db)
+            await run_db(handle_payment_success_webhook, event_data, db)
         elif event_type == 'payment.failed':
-            await handle_payment_failed_webhook(event_data, db)
+            await run_db(handle_payment_failed_webhook, event_data, db)
         else:
-            print(f"[WARN]  Unhandled webhook event: {event_type}")
+            logger.warning("Unhandled webhook event: %s", event_type)
         
         return {"status": "success", "event_type": event_type}
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[ERROR] Webhook error: {e}")
-        try:
-            print(f"[ERROR] Request body: {raw_body.decode('utf-8') if raw_body else 'None'}")
-        except Exception:
-            pass
+        logger.exception("Webhook error: %s", e, extra={"body": raw_body.decode("utf-8", "replace") if raw_body else None})
         raise HTTPException(status_code=500, detail=f"Webhook processing failed: {str(e)}")
 
-async def handle_subscription_active_webhook(event_data: dict, db: Session):
+def handle_subscription_active_webhook(event_data: dict, db: Session):
     """
     Handle subscription.active webhook - PRIMARY method for upgrading users
     This is called when a subscription is successfully activated after payment
@@ -870,24 +878,25 @@ async def handle_subscription_active_webhook(event_data: dict, db: Session):
         # Convert amount from cents to dollars
         normalized_amount = (amount_cents / 100.0) if isinstance(amount_cents, (int, float)) else 15.00  # Default fallback
 
-        print(f"🎉 Subscription activated!")
-        print(f"📧 Customer: {customer_email}")
-        print(f"🆔 Subscription ID: {subscription_id}")
-        print(f"💰 Amount: ${normalized_amount}")
-        print(f"📅 Billing: {billing_cycle} (derived from {raw_billing_cycle})")
-        print(f"🔢 Raw amount from webhook: {amount_cents}")
+        logger.info("Subscription activated for %s", customer_email, extra={
+            "subscription_id": subscription_id,
+            "amount": normalized_amount,
+            "raw_amount": amount_cents,
+            "billing_cycle": billing_cycle,
+            "raw_billing_cycle": raw_billing_cycle,
+        })
         
         if not customer_email:
-            print("❌ No customer email in webhook data")
+            logger.warning("No customer email in webhook data", extra={"subscription_id": subscription_id})
             return
         
         # Find user by email
         user = db.query(User).filter(User.email == customer_email).first()
         if not user:
-            print(f"❌ User not found for email: {customer_email}")
+            logger.warning("User not found for email: %s", customer_email)
             return
         
-        print(f"👤 Found user: {user.username} (ID: {user.id})")
+        logger.info("Found user %s", user.username, extra={"user_id": user.id, "sampled": True})
         
         # Upgrade user to premium
         user.is_premium = True
@@ -901,7 +910,7 @@ async def handle_subscription_active_webhook(event_data: dict, db: Session):
         ).order_by(Subscription.created_at.desc()).first()
         
         if subscription:
-            print(f"📝 Updating existing subscription")
+            logger.info("Updating existing subscription", extra={"subscription_id": subscription_id})
             subscription.dodo_subscription_id = subscription_id
             subscription.status = "active"
             subscription.plan_type = "pro"  # Map from plan_id if needed
@@ -911,7 +920,7 @@ async def handle_subscription_active_webhook(event_data: dict, db: Session):
             subscription.current_period_end = datetime.now(timezone.utc) + timedelta(days=period_days)
             subscription.updated_at = datetime.now(timezone.utc)
         else:
-            print(f"🆕 Creating new subscription")
+            logger.info("Creating new subscription", extra={"subscription_id": subscription_id})
             subscription = Subscription(
                 user_id=user.id,
                 dodo_subscription_id=subscription_id,
@@ -927,6 +936,8 @@ async def handle_subscription_active_webhook(event_data: dict, db: Session):
             db.add(subscription)
             db.flush()
         
+        user.premium_until = subscription_manager.compute_premium_until(subscription.current_period_end)
+        
         # Create payment history record
         payment_record = PaymentHistory(
             user_id=user.id,
@@ -946,17 +957,18 @@ async def handle_subscription_active_webhook(event_data: dict, db: Session):
         
         db.add(payment_record)
         db.commit()
+        invalidate_user_identity(user.id)
         db.refresh(user)
         
-        print(f"✅ User {user.email} upgraded to premium via webhook!")
-        print(f"📊 Subscription status: {subscription.status}")
-        print(f"💎 Premium status: {user.is_premium}")
+        logger.info("User %s upgraded to premium via webhook", user.email, extra={
+            "subscription_status": subscription.status, "is_premium": user.is_premium,
+        })
         
     except Exception as e:
-        print(f"❌ Error processing subscription.active webhook: {e}")
+        logger.exception("Error processing subscription.active webhook: %s", e)
         db.rollback()
 
-async def handle_subscription_updated_webhook(event_data: dict, db: Session):
+def handle_subscription_updated_webhook(event_data: dict, db: Session):
     """Handle subscription.updated webhook"""
     
     try:
@@ -964,7 +976,7 @@ async def handle_subscription_updated_webhook(event_data: dict, db: Session):
         customer_data = safe_get(event_data, 'customer', {})
         customer_email = safe_get(customer_data, 'email') if customer_data else None
         
-        print(f"📝 Subscription updated: {subscription_id}")
+        logger.info("Subscription updated", extra={"subscription_id": subscription_id})
         
         if not customer_email:
             return
@@ -984,20 +996,21 @@ async def handle_subscription_updated_webhook(event_data: dict, db: Session):
             subscription.extra_metadata = json.dumps(serialize_webhook_data(event_data))
             subscription.updated_at = datetime.now(timezone.utc)
             db.commit()
-            print(f"✅ Subscription updated for {user.email}")
+            invalidate_user_identity(user.id)
+            logger.info("Subscription updated for %s", user.email)
         
     except Exception as e:
-        print(f"❌ Error processing subscription.updated webhook: {e}")
+        logger.exception("Error processing subscription.updated webhook: %s", e)
         db.rollback()
 
-async def handle_subscription_on_hold_webhook(event_data: dict, db: Session):
+def handle_subscription_on_hold_webhook(event_data: dict, db: Session):
     """Handle subscription.on_hold webhook"""
     
     try:
         subscription_id = event_data.get('subscription_id')
         customer_email = event_data.get('customer', {}).get('email')
         
-        print(f"⏸️  Subscription on hold: {subscription_id}")
+        logger.info("Subscription on hold", extra={"subscription_id": subscription_id})
         
         if not customer_email:
             return
@@ -1020,20 +1033,21 @@ async def handle_subscription_on_hold_webhook(event_data: dict, db: Session):
             # user.is_premium = False  # Uncomment if you want to immediately revoke access
             
             db.commit()
-            print(f"⏸️  Subscription on hold for {user.email}")
+            invalidate_user_identity(user.id)
+            logger.info("Subscription on hold for %s", user.email)
         
     except Exception as e:
-        print(f"❌ Error processing subscription.on_hold webhook: {e}")
+        logger.exception("Error processing subscription.on_hold webhook: %s", e)
         db.rollback()
 
-async def handle_subscription_failed_webhook(event_data: dict, db: Session):
+def handle_subscription_failed_webhook(event_data: dict, db: Session):
     """Handle subscription.failed webhook"""
     
     try:
         subscription_id = event_data.get('subscription_id')
         customer_email = event_data.get('customer', {}).get('email')
         
-        print(f"❌ Subscription failed: {subscription_id}")
+        logger.warning("Subscription failed", extra={"subscription_id": subscription_id})
         
         if not customer_email:
             return
@@ -1054,15 +1068,17 @@ async def handle_subscription_failed_webhook(event_data: dict, db: Session):
             
             # Downgrade user
             user.is_premium = False
+            user.premium_until = None
             
             db.commit()
-            print(f"❌ Subscription failed for {user.email} - downgraded to free")
+            invalidate_user_identity(user.id)
+            logger.warning("Subscription failed for %s - downgraded to free", user.email)
         
     except Exception as e:
-        print(f"❌ Error processing subscription.failed webhook: {e}")
+        logger.exception("Error processing subscription.failed webhook: %s", e)
         db.rollback()
 
-async def handle_subscription_renewed_webhook(event_data: dict, db: Session):
+def handle_subscription_renewed_webhook(event_data: dict, db: Session):
     """Handle subscription.renewed webhook"""
     
     try:
@@ -1077,8 +1093,7 @@ async def handle_subscription_renewed_webhook(event_data: dict, db: Session):
         # Convert amount from cents to dollars with fallback
         normalized_amount = (amount_cents / 100.0) if isinstance(amount_cents, (int, float)) else 15.00
         
-        print(f"🔄 Subscription renewed: {subscription_id}")
-        print(f"💰 Renewal amount: ${normalized_amount}")
+        logger.info("Subscription renewed", extra={"subscription_id": subscription_id, "amount": normalized_amount})
         
         if not customer_email:
             return
@@ -1101,6 +1116,7 @@ async def handle_subscription_renewed_webhook(event_data: dict, db: Session):
             
             # Ensure user is premium
             user.is_premium = True
+            user.premium_until = subscription_manager.compute_premium_until(subscription.current_period_end)
             
             # Create payment history record for renewal
             payment_record = PaymentHistory(
@@ -1121,20 +1137,21 @@ async def handle_subscription_renewed_webhook(event_data: dict, db: Session):
             
             db.add(payment_record)
             db.commit()
-            print(f"🔄 Subscription renewed for {user.email}")
+            invalidate_user_identity(user.id)
+            logger.info("Subscription renewed for %s", user.email)
         
     except Exception as e:
-        print(f"❌ Error processing subscription.renewed webhook: {e}")
+        logger.exception("Error processing subscription.renewed webhook: %s", e)
         db.rollback()
 
-async def handle_subscription_cancelled_webhook(event_data: dict, db: Session):
+def handle_subscription_cancelled_webhook(event_data: dict, db: Session):
     """Handle subscription.cancelled webhook"""
     
     try:
         subscription_id = event_data.get('subscription_id')
         customer_email = event_data.get('customer', {}).get('email')
         
-        print(f"❌ Subscription cancelled: {subscription_id}")
+        logger.info("Subscription cancelled", extra={"subscription_id": subscription_id})
         
         if not customer_email:
             return
@@ -1155,22 +1172,24 @@ async def handle_subscription_cancelled_webhook(event_data: dict, db: Session):
             
             # Downgrade user
             user.is_premium = False
+            user.premium_until = None
             
             db.commit()
-            print(f"❌ Subscription cancelled for {user.email} - downgraded to free")
+            invalidate_user_identity(user.id)
+            logger.info("Subscription cancelled for %s - downgraded to free", user.email)
         
     except Exception as e:
-        print(f"❌ Error processing subscription.cancelled webhook: {e}")
+        logger.exception("Error processing subscription.cancelled webhook: %s", e)
         db.rollback()
 
-async def handle_payment_failed_webhook(event_data: dict, db: Session):
+def handle_payment_failed_webhook(event_data: dict, db: Session):
     """Handle payment.failed webhook"""
     
     try:
         payment_id = event_data.get('payment_id')
         customer_email = event_data.get('customer', {}).get('email')
         
-        print(f"❌ Payment failed: {payment_id}")
+        logger.warning("Payment failed", extra={"payment_id": payment_id})
         
         if not customer_email:
             return
@@ -1190,13 +1209,13 @@ async def handle_payment_failed_webhook(event_data: dict, db: Session):
             payment_record.failure_reason = event_data.get('failure_reason', 'Payment failed')
             payment_record.updated_at = datetime.now(timezone.utc)
             db.commit()
-            print(f"❌ Payment marked as failed for {user.email}")
+            logger.info("Payment marked as failed for %s", user.email)
         
     except Exception as e:
-        print(f"❌ Error processing payment.failed webhook: {e}")
+        logger.exception("Error processing payment.failed webhook: %s", e)
         db.rollback()
 
-async def handle_payment_success_webhook(event_data: dict, db: Session):
+def handle_payment_success_webhook(event_data: dict, db: Session):
     """Handle payment.succeeded webhook - for individual payments"""
     
     try:
@@ -1204,15 +1223,15 @@ async def handle_payment_success_webhook(event_data: dict, db: Session):
         customer_email = event_data.get('customer', {}).get('email')
         subscription_id = event_data.get('subscription_id')
         
-        print(f"💰 Payment succeeded: {payment_id}")
+        logger.info("Payment succeeded", extra={"payment_id": payment_id})
         
         if not customer_email:
-            print("⚠️ No customer email in payment webhook")
+            logger.warning("No customer email in payment webhook", extra={"payment_id": payment_id})
             return
         
         user = db.query(User).filter(User.email == customer_email).first()
         if not user:
-            print(f"❌ User not found for email: {customer_email}")
+            logger.warning("User not found for email: %s", customer_email)
             return
         
         # Find and update payment record
@@ -1235,10 +1254,10 @@ async def handle_payment_success_webhook(event_data: dict, db: Session):
             payment_record.payment_completed_at = datetime.now(timezone.utc)
             payment_record.verification_completed_at = datetime.now(timezone.utc)
             db.commit()
-            print(f"✅ Payment record updated for {user.email}")
+            logger.info("Payment record updated for %s", user.email)
         else:
-            print(f"⚠️ No matching payment record found for {payment_id}")
+            logger.warning("No matching payment record found", extra={"payment_id": payment_id})
         
     except Exception as e:
-        print(f"❌ Payment success webhook error: {e}")
+        logger.exception("Payment success webhook error: %s", e)
         db.rollback()
\ No newline at end of file
@@ -1,23 +1,38 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Callable, Awaitable
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 import os
-import re
+import logging
 import json
 import time
-import requests
 import httpx
 
 from dotenv import load_dotenv
 from openai import OpenAI, AsyncOpenAI
 import asyncio
 
-from database import get_db
+from database import get_db, SessionLocal
 from auth import get_current_active_user
-from models import User, ContentGeneration, UsageStats, UserMemory
+from models import User, ContentGeneration, UsageStats, RepurposeJob
 from feature_gates import get_feature_gate
+from generation_cache import generation_cache, make_cache_key
+from model_router import model_router
+from quota import record_usage
+from analytics import bump_analytics_summary
+from memory_digest import get_memory_digest, refresh_memory_digest_after_save
+from url_ingestion import url_ingestion
+from html_extraction import ArticleTextExtractor
+from url_cache import url_text_cache
+from generation_scheduler import generation_scheduler
+from content_compaction import content_compactor
+from db_executor import db_executor, run_db
+from db_utils import db_retry_guard
+from metrics import observe_llm, url_fetch_duration, require_metrics_token
+from job_queue import repurpose_jobs, serialize_job, FINISHED_STATUSES
 
 from utils import (
     clean_twitter_thread,
@@ -29,6 +44,7 @@ from utils import (
 # Router Setup
 # ----------------------------------------------------
 snippetstream_router = APIRouter()
+logger = logging.getLogger(__name__)
 load_dotenv()
 
 # ----------------------------------------------------
@@ -45,6 +61,20 @@ class ContentRequest(BaseModel):
     screen_resolution: Optional[str] = None
     context: Optional[Dict] = None
     enabled_platforms: Optional[List[str]] = ["twitter", "linkedin", "instagram"]
+    engine: Optional[str] = None  # 'fanout' or 'single'; defaults to REPURPOSE_ENGINE
+
+
+class BulkContentItem(BaseModel):
+    content: Optional[str] = None
+    url: Optional[HttpUrl] = None
+    context: Optional[Dict] = None
+
+
+class BulkContentRequest(BaseModel):
+    items: List[BulkContentItem]
+    context: Optional[Dict] = None  # Default for items without their own context
+    enabled_platforms: Optional[List[str]] = ["twitter", "linkedin", "instagram"]
+    engine: Optional[str] = None
 
 
 class SocialMediaResponse(BaseModel):
@@ -67,7 +97,7 @@ def initialize_client():
     global client, async_client
 
     if client is None:
-        print("🔧 Initializing Pollinations Client...")
+        logger.info("Initializing Pollinations client")
         api_key = os.getenv("POLLINATIONS_API_KEY")
         if not api_key:
             raise Exception("❌ POLLINATIONS_API_KEY missing in environment")
@@ -87,77 +117,221 @@ def initialize_client():
             http_client=async_http_client
         )
 
-        print("✅ Connected to Pollinations API (Sync + Async)")
+        logger.info("Pollinations clients ready (sync + async)")
 
 
 # ----------------------------------------------------
 # Async Safe Completion Wrapper
 # ----------------------------------------------------
-async def safe_completion_async(messages, max_tokens=2000):
+# Hedged requests: race the next model once the current one passes its p90 latency
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.9"))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1.0"))
+
+async def safe_completion_async(messages, max_tokens=2000, on_delta: Optional[Callable[[str], None]] = None, use_cache: bool = True):
+    """Run a chat completion with model fallback.
+
+    When ``on_delta`` is given the completion is streamed and every text delta
+    is passed to it as it arrives. Deltas are a best-effort preview only: a
+    retry on another model starts emitting from scratch, so callers should
+    treat the returned string as the authoritative result.
+
+    Successful results are stored in the generation cache keyed by the full
+    message list, model chain and ``max_tokens``; pass ``use_cache=False`` to
+    force a fresh completion.
+
+    Models are tried in the order chosen by the model router (fastest
+    expected first, open circuits skipped). Each model gets one attempt per
+    pass, so a degraded model costs at most one timeout before the next one
+    is tried; a second pass runs only if every model failed.
+
+    With LLM_HEDGING_ENABLED, a model that hasn't answered by its recent
+    p90 latency gets the next model raced against it, and the loser is
+    cancelled. Streaming calls (``on_delta``) are never hedged, since two
+    models would interleave their deltas.
+    """
     global async_client
+
+    cache_key = make_cache_key(messages, model_router.models, max_tokens) if use_cache else None
+    if cache_key:
+        cached = await generation_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Generation cache hit", extra={"sampled": True})
+            if on_delta is not None:
+                on_delta(cached)
+            return cached
+
     if async_client is None:
         initialize_client()
-
-    # Prioritize Mistral for speed and reliability
-    models_to_try = ["mistral", "openai", "searchgpt"]
     
-    for model_name in models_to_try:
-        for attempt in range(2): 
-            try:
-                response = await async_client.chat.completions.create(
-                    model=model_name,
-                    messages=messages,
-                    max_tokens=max_tokens,
-                    temperature=0.7,
-                )
-
-                if not response.choices:
-                    continue
+    for attempt in range(2):
+        if attempt:
+            await asyncio.sleep(0.5)
 
-                content = response.choices[0].message.content
+        if LLM_HEDGING_ENABLED and on_delta is None:
+            model_name, content = await _hedged_completion(model_router.candidates(), messages, max_tokens, attempt)
+        else:
+            model_name, content = await _sequential_completion(model_router.candidates(), messages, max_tokens, on_delta, attempt)
 
-                if not content:
-                    print(f"⚠️ Model {model_name} (attempt {attempt+1}) returned EMPTY content.")
-                    continue
+        if content:
+            logger.info("Generated content", extra={"model": model_name, "sampled": True})
+            content = content.strip()
+            if cache_key:
+                await generation_cache.set(cache_key, content)
+            return content
 
-                print(f"✅ Generated content using {model_name}")
-                return content.strip()
+    return None
 
-            except Exception as e:
-                print(f"❌ Pollinations {model_name} attempt {attempt+1} failed: {str(e)}")
-                await asyncio.sleep(0.5)
 
-    return None
+async def _sequential_completion(candidates: List[str], messages, max_tokens: int, on_delta: Optional[Callable[[str], None]], attempt: int):
+    """Try each candidate in turn; returns (model, content) or (None, None)"""
+    for model_name in candidates:
+        content = await _attempt_completion(model_name, messages, max_tokens, on_delta, attempt)
+        if content:
+            return model_name, content
+    return None, None
 
 
-# ----------------------------------------------------
-# URL Content Fetcher (Advanced)
-# ----------------------------------------------------
-def fetch_content_from_url(url: str) -> str:
+async def _hedged_completion(candidates: List[str], messages, max_tokens: int, attempt: int):
+    """Race candidates: start the next one when the newest hasn't answered by its p90 deadline
+    (or as soon as it fails), return the first good answer and cancel the rest."""
+
+    async def run(model_name: str):
+        return model_name, await _attempt_completion(model_name, messages, max_tokens, None, attempt)
+
+    remaining = list(candidates)
+    pending = set()
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, timeout=10, headers=headers)
-        response.raise_for_status()
+        while remaining or pending:
+            if remaining:
+                model_name = remaining.pop(0)
+                pending.add(asyncio.create_task(run(model_name)))
+                deadline = model_router.hedge_delay(model_name, LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_DELAY_SECONDS)
+            else:
+                deadline = None
 
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(response.text, "html.parser")
+            done, pending = await asyncio.wait(pending, timeout=deadline, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                model_name, content = task.result()
+                if content:
+                    return model_name, content
 
-        # Remove junk
-        for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
-            tag.decompose()
+            if not done and remaining:
+                logger.info("Hedging: no answer within %.1fs, starting %s", deadline, remaining[0],
+                            extra={"model": model_name, "hedge_model": remaining[0]})
+    finally:
+        for task in pending:
+            task.cancel()
 
-        # Extract main content
-        main = soup.find("article") or soup.find("main") or soup.find("div", class_="content")
+    return None, None
 
-        text = main.get_text(" ", strip=True) if main else soup.get_text(" ", strip=True)
 
-        return text[:15000]
+async def _attempt_completion(model_name: str, messages, max_tokens: int, on_delta: Optional[Callable[[str], None]], attempt: int) -> Optional[str]:
+    """One completion on one model, reporting its latency and outcome to the model router and metrics"""
+    started = time.monotonic()
+    usage = None
+    try:
+        if on_delta is not None:
+            content = await _stream_completion(model_name, messages, max_tokens, on_delta)
+        else:
+            response = await async_client.chat.completions.create(
+                model=model_name,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=0.7,
+            )
+            content = response.choices[0].message.content if response.choices else None
+            usage = getattr(response, "usage", None)
+
+        elapsed = time.monotonic() - started
+        if not content:
+            logger.warning("Model returned empty content", extra={"model": model_name, "attempt": attempt + 1})
+            model_router.record_failure(model_name, elapsed, "empty content")
+            observe_llm(model_name, "empty", elapsed)
+            return None
+
+        model_router.record_success(model_name, elapsed)
+        # Streams and some providers don't report usage; estimate locally then
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or sum(
+            content_compactor.count_tokens(message["content"]) for message in messages
+        )
+        completion_tokens = getattr(usage, "completion_tokens", None) or content_compactor.count_tokens(content)
+        observe_llm(model_name, "ok", elapsed, prompt_tokens, completion_tokens)
+        return content
+
+    except asyncio.CancelledError:
+        # Hedged calls that lost the race
+        observe_llm(model_name, "cancelled", time.monotonic() - started)
+        raise
+    except Exception as e:
+        logger.warning("Pollinations completion failed: %s", e, extra={"model": model_name, "attempt": attempt + 1})
+        model_router.record_failure(model_name, time.monotonic() - started, str(e) or type(e).__name__)
+        observe_llm(model_name, "error", time.monotonic() - started)
+        return None
+
+
+async def _stream_completion(model_name: str, messages, max_tokens: int, on_delta: Callable[[str], None]) -> str:
+    """Stream a single completion, forwarding text deltas to ``on_delta``"""
+    stream = await async_client.chat.completions.create(
+        model=model_name,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=0.7,
+        stream=True,
+    )
+
+    parts = []
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            on_delta(delta)
+
+    return "".join(parts)
+
+
+# ----------------------------------------------------
+# URL Content Fetcher (Advanced)
+# ----------------------------------------------------
+async def fetch_content_from_url(url: str, max_chars: int) -> str:
+    """Fetch a page and extract its article text, reading only until ``max_chars`` of text are found.
+
+    Extracted text is cached per normalized URL: fresh entries skip the
+    request entirely and stale ones are revalidated with a conditional GET.
+    """
+    try:
+        cached = await asyncio.to_thread(url_text_cache.get, url, max_chars)
+        if cached and url_text_cache.is_fresh(cached):
+            url_text_cache.record("hit")
+            return cached["text"][:max_chars]
+
+        extractor = ArticleTextExtractor(max_chars)
+        validators = url_text_cache.validators(cached) if cached else None
+        fetch_started = time.perf_counter()
+        try:
+            page = await url_ingestion.fetch(url, headers=validators, consumer=extractor.feed_chunk)
+        except Exception:
+            url_fetch_duration.observe(time.perf_counter() - fetch_started, "error")
+            raise
+        url_fetch_duration.observe(time.perf_counter() - fetch_started, "not_modified" if page.status_code == 304 else "ok")
+
+        if page.status_code == 304 and cached:
+            url_text_cache.record("revalidated")
+            await asyncio.to_thread(url_text_cache.refresh, cached, page.headers)
+            return cached["text"][:max_chars]
+
+        url_text_cache.record("miss")
+        if extractor.done or page.truncated:
+            reason = "text budget met" if extractor.done else "size cap reached"
+            logger.info("Stopped reading URL early (%s)", reason, extra={"url": url, "sampled": True})
+
+        text = extractor.text()
+        complete = not (extractor.done or page.truncated)
+        await asyncio.to_thread(url_text_cache.set, url, text, max_chars, complete, page.headers)
+        return text
 
-    except ImportError:
-        # Fallback if bs4 is missing
-        content = re.sub(r'<[^>]+>', ' ', response.text)
-        content = re.sub(r'\s+', ' ', content).strip()
-        return content[:15000]
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to fetch content: {str(e)}")
 
@@ -168,7 +342,7 @@ def fetch_content_from_url(url: str) -> str:
 # ----------------------------------------------------
 # Twitter Thread Generator (Async)
 # ----------------------------------------------------
-async def create_twitter_thread_async(content: str, context: Optional[Dict] = None, memory: str = "") -> List[str]:
+async def create_twitter_thread_async(content: str, context: Optional[Dict] = None, memory: str = "", on_delta: Optional[Callable[[str], None]] = None) -> List[str]:
 
     system_prompt = """
 You are a "Build in Public" expert for founders.
@@ -220,7 +394,7 @@ You should also look at the PAST GENERATIONS HISTORY (if provided) to ensure the
         {"role": "user", "content": content}
     ]
 
-    result = await safe_completion_async(messages, max_tokens=2000)
+    result = await safe_completion_async(messages, max_tokens=2000, on_delta=on_delta)
 
     if not result:
         return ["❌ Twitter generation failed"]
@@ -237,7 +411,7 @@ You should also look at the PAST GENERATIONS HISTORY (if provided) to ensure the
 # ----------------------------------------------------
 # LinkedIn Post Generator (Async)
 # ----------------------------------------------------
-async def create_linkedin_post_async(content: str, context: Optional[Dict] = None, memory: str = "") -> str:
+async def create_linkedin_post_async(content: str, context: Optional[Dict] = None, memory: str = "", on_delta: Optional[Callable[[str], None]] = None) -> str:
 
     system_prompt = """
 You are a "Build in Public" strategist for LinkedIn.
@@ -277,7 +451,7 @@ Input Content:
         {"role": "user", "content": content}
     ]
 
-    result = await safe_completion_async(messages, max_tokens=1500)
+    result = await safe_completion_async(messages, max_tokens=1500, on_delta=on_delta)
 
     if not result:
         return "❌ LinkedIn generation failed"
@@ -288,7 +462,7 @@ Input Content:
 # ----------------------------------------------------
 # Instagram Carousel Generator (Async)
 # ----------------------------------------------------
-async def create_instagram_carousel_async(content: str, context: Optional[Dict] = None, memory: str = "") -> List[str]:
+async def create_instagram_carousel_async(content: str, context: Optional[Dict] = None, memory: str = "", on_delta: Optional[Callable[[str], None]] = None) -> List[str]:
 
     system_prompt = """
 You are a visual storyteller for founders.
@@ -328,7 +502,7 @@ Strictly return ONLY the slides separated by blank lines. Use the PAST GENERATIO
         {"role": "user", "content": content}
     ]
 
-    result = await safe_completion_async(messages, max_tokens=1500)
+    result = await safe_completion_async(messages, max_tokens=1500, on_delta=on_delta)
 
     if not result:
         return ["❌ Carousel generation failed"]
@@ -346,6 +520,359 @@ Strictly return ONLY the slides separated by blank lines. Use the PAST GENERATIO
 # ----------------------------------------------------
 # Main Repurpose Endpoint (Full)
 # ----------------------------------------------------
+PLATFORM_GENERATORS = {
+    "twitter": create_twitter_thread_async,
+    "linkedin": create_linkedin_post_async,
+    "instagram": create_instagram_carousel_async,
+}
+
+PLATFORM_CLEANERS = {
+    "twitter": clean_twitter_thread,
+    "linkedin": clean_linkedin_post,
+    "instagram": clean_instagram_slides,
+}
+
+PLATFORM_ERROR_RESULTS = {
+    "twitter": ["❌ Twitter error"],
+    "linkedin": "❌ LinkedIn error",
+    "instagram": ["❌ Instagram error"],
+}
+
+
+def resolve_platforms(enabled_platforms: Optional[List[str]]) -> List[str]:
+    """Map the requested platform names onto generator keys (``x`` is an alias for twitter)"""
+    enabled = enabled_platforms or ["twitter", "linkedin", "instagram"]
+
+    platforms = []
+    if "twitter" in enabled or "x" in enabled:
+        platforms.append("twitter")
+    if "linkedin" in enabled:
+        platforms.append("linkedin")
+    if "instagram" in enabled:
+        platforms.append("instagram")
+
+    if not platforms:
+        raise HTTPException(status_code=400, detail="At least one platform must be selected")
+
+    return platforms
+
+
+def clean_platform_result(name: str, raw):
+    """Clean one generator result, substituting the error placeholder for exceptions"""
+    if isinstance(raw, Exception):
+        logger.error("Platform generation error: %s", raw, extra={"platform": name})
+        raw = PLATFORM_ERROR_RESULTS[name]
+    return PLATFORM_CLEANERS[name](raw)
+
+
+def build_social_media_response(results: Dict, preview: str) -> SocialMediaResponse:
+    """Assemble the response model from cleaned per-platform results"""
+    return SocialMediaResponse(
+        twitter_thread=results.get("twitter", []),
+        linkedin_post=results.get("linkedin", ""),
+        instagram_carousel=results.get("instagram", []),
+        original_content_preview=preview,
+    )
+
+
+# ----------------------------------------------------
+# Single-Call Multi-Platform Generator
+# ----------------------------------------------------
+# 'fanout' sends one completion per platform; 'single' asks for every platform
+# in one JSON completion, so the content and memory are only sent once
+REPURPOSE_ENGINES = ("fanout", "single")
+REPURPOSE_ENGINE = os.getenv("REPURPOSE_ENGINE", "fanout").lower()
+
+PLATFORM_MAX_TOKENS = {
+    "twitter": 2000,
+    "linkedin": 1500,
+    "instagram": 1500,
+}
+
+# Expected count per list-valued platform; missing items are padded like the fan-out generators do
+PLATFORM_ITEM_COUNTS = {
+    "twitter": 10,
+    "instagram": 8,
+}
+
+MULTI_PLATFORM_SPECS = {
+    "twitter": """"twitter": an array of exactly 10 tweets forming a viral "Building in Public" thread.
+  Order: hook (biggest win or challenge), context (morning plan), the struggle, the fix, a specific lesson,
+  the result (completed [x] tasks), an honest note on the unfinished [ ] tasks, why it matters, what's next,
+  call-to-action. Each tweet starts with "1/10", "2/10", etc. Short punchy sentences, max 1 emoji per tweet.""",
+    "linkedin": """"linkedin": one string holding a LinkedIn post. Structure: a strong hook about the reality of
+  building a startup, the story (planned X, Y happened, what got finished and what didn't), 3 bullet-point
+  lessons, a takeaway for other founders, and an engagement question. Short 1-2 line paragraphs,
+  no hashtags in the body, exactly 3 hashtags at the end.""",
+    "instagram": """"instagram": an array of exactly 8 carousel slides about "A Day in the Life of a Founder".
+  Slides: title, the plan, the reality (tasks checked off [x]), the challenge (tasks left [ ]), the fix,
+  the lesson, the result, a question for the audience. Each slide is two lines separated by a newline:
+  "EMOJI + TITLE (uppercase)" then a short description.""",
+}
+
+
+def platform_filler(name: str, position: int) -> str:
+    """Placeholder item used to pad a short thread or carousel, as the fan-out generators do"""
+    if name == "twitter":
+        return f"{position}/10 🚀 Building in public is a journey. Keep shipping. #BuildInPublic"
+    return "🚀 KEEP BUILDING\nConsistency is key"
+
+
+def resolve_engine(engine: Optional[str]) -> str:
+    """Validate a requested engine, falling back to REPURPOSE_ENGINE"""
+    engine = (engine or REPURPOSE_ENGINE).lower()
+    if engine not in REPURPOSE_ENGINES:
+        raise HTTPException(status_code=400, detail=f"engine must be one of: {', '.join(REPURPOSE_ENGINES)}")
+    return engine
+
+
+def build_multi_platform_messages(platforms: List[str], content: str, context: Optional[Dict] = None, memory: str = "") -> List[Dict]:
+    """Prompt asking for every platform in ``platforms`` as one JSON object"""
+    specs = "\n".join(f"- {MULTI_PLATFORM_SPECS[name]}" for name in platforms)
+    keys = ", ".join(f'"{name}"' for name in platforms)
+
+    system_prompt = f"""
+You are a "Build in Public" expert for founders, writing for several platforms at once.
+
+Take the founder's daily update (Morning Plans + Evening Reflection) and write a post for each platform below.
+
+Input Interpretation:
+- Tasks marked with [x] in the Morning Plan are COMPLETED.
+- Tasks marked with [ ] in the Morning Plan are UNFINISHED or delayed.
+- Use the Evening Reflection to add color, struggle, and emotional depth.
+
+Be RAW and HONEST, no corporate jargon. If PAST GENERATIONS HISTORY is provided, keep the tone and story consistent with it.
+
+Return ONLY a JSON object with exactly these keys: {keys}
+{specs}
+"""
+
+    if memory:
+        system_prompt += f"\n\nUSER PERSISTENT MEMORY (Always respect this context):\n{memory}\n"
+
+    if context:
+        system_prompt += f"\n\nPersonalization Context:\n"
+        if context.get('audience'): system_prompt += f"- Audience: {context['audience']}\n"
+        if context.get('tone'): system_prompt += f"- Tone: {context['tone']}\n"
+        if context.get('mood'): system_prompt += f"- Mood: {context['mood']}\n"
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": content}
+    ]
+
+
+def parse_multi_platform_result(result: Optional[str], platforms: List[str]) -> Dict:
+    """Pull the per-platform raw results out of a JSON completion.
+
+    Tolerates code fences and text around the object. Raises ValueError if
+    any requested platform is missing or has the wrong shape.
+    """
+    if not result:
+        raise ValueError("empty completion")
+
+    start, end = result.find("{"), result.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError("no JSON object in completion")
+    data = json.loads(result[start:end + 1])
+    if not isinstance(data, dict):
+        raise ValueError("completion is not a JSON object")
+
+    raw_results = {}
+    for name in platforms:
+        value = data.get(name)
+        if name in PLATFORM_ITEM_COUNTS:
+            if not isinstance(value, list) or not value:
+                raise ValueError(f"'{name}' is not a non-empty list")
+            items = [str(item).strip() for item in value if str(item).strip()]
+            count = PLATFORM_ITEM_COUNTS[name]
+            while len(items) < count:
+                items.append(platform_filler(name, len(items) + 1))
+            raw_results[name] = items[:count]
+        else:
+            if not isinstance(value, str) or not value.strip():
+                raise ValueError(f"'{name}' is not a non-empty string")
+            raw_results[name] = value.strip()
+    return raw_results
+
+
+async def create_all_platforms_async(platforms: List[str], content: str, context: Optional[Dict] = None, memory: str = "") -> Dict:
+    """Generate every platform in one completion; raises ValueError if the reply can't be parsed"""
+    messages = build_multi_platform_messages(platforms, content, context, memory)
+    max_tokens = sum(PLATFORM_MAX_TOKENS[name] for name in platforms)
+    result = await safe_completion_async(messages, max_tokens=max_tokens)
+    return parse_multi_platform_result(result, platforms)
+
+
+async def generate_platforms(
+    platforms: List[str],
+    content: str,
+    context: Optional[Dict],
+    memory: str,
+    engine: str,
+    call: Callable[..., Awaitable] = None,
+) -> Dict:
+    """Cleaned results per platform using ``engine``.
+
+    The single-call engine falls back to the per-platform fan-out when its
+    reply is not usable JSON. ``call(fn, *args)`` wraps each generator
+    call, e.g. to run it under the generation scheduler.
+    """
+    call = call or (lambda fn, *args: fn(*args))
+
+    if engine == "single":
+        try:
+            raw_results = await call(create_all_platforms_async, platforms, content, context, memory)
+            return {name: clean_platform_result(name, raw_results[name]) for name in platforms}
+        except ValueError as e:
+            logger.warning("Single-call generation unusable (%s), falling back to per-platform calls", e)
+
+    raw_results = await asyncio.gather(*[
+        call(PLATFORM_GENERATORS[name], content, context, memory)
+        for name in platforms
+    ], return_exceptions=True)
+
+    return {
+        name: clean_platform_result(name, raw)
+        for name, raw in zip(platforms, raw_results)
+    }
+
+
+def build_combined_memory(current_user: User, db: Session) -> str:
+    """Static user memory plus a preview of recent generations (Pro feature), read from the user's digest row"""
+    if not current_user.is_premium:
+        return ""
+    return get_memory_digest(db, current_user.id)
+
+
+async def resolve_content(url: Optional[str], text: Optional[str], max_length: int) -> Dict:
+    """Fetch or take the input text, validate it, compact it and cut it to the tier's length limit"""
+    if url:
+        content = await fetch_content_from_url(url, max_length)
+        source = "url"
+    elif text:
+        content = text
+        source = "text"
+    else:
+        raise HTTPException(status_code=400, detail="Content or URL required")
+
+    if not content or len(content.strip()) < 10:
+        raise HTTPException(status_code=400, detail="Content is too short or empty")
+
+    preview = content[:200] + "..." if len(content) > 200 else content
+
+    # Drop boilerplate/duplicates and keep the most salient parts within the token budget
+    content = await asyncio.to_thread(content_compactor.compact, content)
+
+    # Content length limit
+    if len(content) > max_length:
+        logger.info("Truncating content", extra={"length": len(content), "max_length": max_length, "sampled": True})
+        content = content[:max_length] + "..."
+
+    return {"content": content, "source": source, "preview": preview}
+
+
+async def prepare_repurpose(request: ContentRequest, current_user: User, db: Session) -> Dict:
+    """Run the gate checks and resolve the input content for a repurpose request.
+
+    Raises HTTPException for anything that should be rejected before any
+    LLM call is made, so both the plain and the streaming endpoints fail
+    with a normal HTTP error.
+    """
+    feature_gate = get_feature_gate(current_user)
+
+    # Generation limit check
+    if not await run_db(feature_gate.can_generate_content, db):
+        raise HTTPException(status_code=429, detail="Daily generation limit reached")
+
+    # URL is Pro-only
+    if request.url and not feature_gate.can_process_urls():
+        raise HTTPException(status_code=403, detail="URL processing is Pro feature")
+
+    platforms = resolve_platforms(request.enabled_platforms)
+
+    combined_memory = await run_db(build_combined_memory, current_user, db)
+
+    resolved = await resolve_content(
+        str(request.url) if request.url else None,
+        request.content,
+        feature_gate.get_max_content_length(),
+    )
+
+    return {
+        **resolved,
+        "memory": combined_memory,
+        "platforms": platforms,
+    }
+
+
+def save_generations(db: Session, user_id: int, generations: List[Dict]):
+    """Persist finished generations and their usage records in one transaction.
+
+    Each item needs ``content``, ``source``, ``results``, ``context`` and
+    ``processing_time``. Rows go in as one multi-row INSERT per table, so a
+    bulk batch costs the same round trips as a single generation.
+    Failures are logged, not raised.
+    """
+    if not generations:
+        return
+
+    try:
+        db.execute(insert(ContentGeneration), [
+            {
+                "user_id": user_id,
+                "original_content": item["content"][:1000],
+                "content_source": item["source"],
+                "twitter_thread": json.dumps(item["results"].get("twitter", [])),
+                "linkedin_post": item["results"].get("linkedin", ""),
+                "instagram_carousel": json.dumps(item["results"].get("instagram", [])),
+                "context": json.dumps(item["context"]) if item["context"] else None,
+                "processing_time": item["processing_time"],
+            }
+            for item in generations
+        ])
+        db.execute(insert(UsageStats), [
+            {
+                "user_id": user_id,
+                "action": "generate",
+                "extra_data": json.dumps(
+                    {"source": item["source"], "processing_time": item["processing_time"]}
+                ),
+            }
+            for item in generations
+        ])
+        record_usage(db, user_id, "generate", amount=len(generations))
+        bump_analytics_summary(db, user_id, generations=len(generations))
+        # Pro prompts read the digest, so rebuild it here rather than on the next request
+        refresh_memory_digest_after_save(db, user_id)
+
+        db.commit()
+
+    except Exception as db_error:
+        logger.error("Database save failed: %s", db_error, extra={"user_id": user_id})
+        db.rollback()
+
+
+def save_generations_detached(user_id: int, generations: List[Dict]):
+    """save_generations on its own session, for streams that outlive the request-scoped one"""
+    save_db = SessionLocal()
+    try:
+        save_generations(save_db, user_id, generations)
+    finally:
+        save_db.close()
+
+
+def save_generation(db: Session, user_id: int, content: str, source: str, results: Dict, context: Optional[Dict], processing_time: float):
+    """Persist a finished generation and its usage record (failures are logged, not raised)"""
+    save_generations(db, user_id, [{
+        "content": content,
+        "source": source,
+        "results": results,
+        "context": context,
+        "processing_time": processing_time,
+    }])
+
+
 @snippetstream_router.post("/repurpose", response_model=SocialMediaResponse)
 async def repurpose_content(
     request: ContentRequest,
@@ -354,165 +881,426 @@ async def repurpose_content(
 ):
 
     try:
-        feature_gate = get_feature_gate(current_user)
+        prepared = await prepare_repurpose(request, current_user, db)
+        content = prepared["content"]
+        platforms = prepared["platforms"]
 
-        # Generation limit check
-        if not feature_gate.can_generate_content(db):
-            raise HTTPException(status_code=429, detail="Daily generation limit reached")
+        start_time = time.time()
 
-        # URL is Pro-only
-        if request.url and not feature_gate.can_process_urls():
-            raise HTTPException(status_code=403, detail="URL processing is Pro feature")
+        engine = resolve_engine(request.engine)
+        logger.info("Processing repurpose request", extra={
+            "user_id": current_user.id, "source": prepared["source"], "length": len(content),
+            "platforms": platforms, "engine": engine, "sampled": True,
+        })
 
-        # Fetch User Memory (Pro feature)
-        user_memory = ""
-        past_generations_context = ""
-        
-        if current_user.is_premium:
-            # 1. Static Memory (User defined)
-            memory_obj = db.query(UserMemory).filter(UserMemory.user_id == current_user.id).first()
-            user_memory = memory_obj.memory_content if memory_obj else ""
-            
-            # 2. Dynamic Memory (Past generations)
-            past_gens = db.query(ContentGeneration).filter(
-                ContentGeneration.user_id == current_user.id
-            ).order_by(ContentGeneration.created_at.desc()).limit(3).all()
-            
-            if past_gens:
-                past_generations_context = "\nPAST GENERATIONS HISTORY:\n"
-                for i, gen in enumerate(past_gens):
-                    past_generations_context += f"--- History Item {i+1} ---\n"
-                    past_generations_context += f"Input: {gen.original_content[:200]}...\n"
-                    # Include a snippet of what was generated
-                    if gen.linkedin_post:
-                        past_generations_context += f"Output Preview: {gen.linkedin_post[:200]}...\n"
-                    elif gen.twitter_thread:
-                        past_generations_context += f"Output Preview: {gen.twitter_thread[:200]}...\n"
-                past_generations_context += "--------------------------\n"
-
-        # Combine both memories
-        combined_memory = user_memory
-        if past_generations_context:
-            combined_memory += "\n" + past_generations_context
-
-        # Content input
-        if request.url:
-            content = fetch_content_from_url(str(request.url))
-            source = "url"
-        elif request.content:
-            content = request.content
-            source = "text"
-        else:
-            raise HTTPException(status_code=400, detail="Content or URL required")
+        results = await generate_platforms(platforms, content, request.context, prepared["memory"], engine)
 
-        if not content or len(content.strip()) < 10:
-            raise HTTPException(status_code=400, detail="Content is too short or empty")
+        processing_time = time.time() - start_time
 
-        # Content length limit
-        max_length = feature_gate.get_feature_limits(db)["max_content_length"]
-        if len(content) > max_length:
-            print(f"✂️ Truncating content from {len(content)} to {max_length}")
-            content = content[:max_length] + "..."
+        await run_db(save_generation, db, current_user.id, content, prepared["source"], results, request.context, processing_time)
 
-        preview = content[:200] + "..." if len(content) > 200 else content
+        return build_social_media_response(results, prepared["preview"])
 
-        print(f"🚀 Processing repurpose request for user {current_user.id} (Source: {source}, Length: {len(content)})")
+    except HTTPException:
+        # Re-raise HTTP exceptions (429, 403, etc)
+        raise
+    except Exception as e:
+        logger.exception("Error in repurpose_content: %s", e)
+        raise HTTPException(status_code=500, detail=f"Server Error: {str(e) or type(e).__name__}")
+
+
+# ----------------------------------------------------
+# Streaming Repurpose Endpoint (Server-Sent Events)
+# ----------------------------------------------------
+def format_sse(event: str, data) -> str:
+    """Encode one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_platform_events(platforms: List[str], content: str, context: Optional[Dict], memory: str, include_deltas: bool = False):
+    """Run the platform generators concurrently and yield events as each one finishes.
+
+    Yields ``("delta", {...})`` tuples while text streams in (only when
+    ``include_deltas`` is set) and one ``("platform", {...})`` tuple per
+    platform carrying its cleaned result. Pending generators are cancelled
+    if the consumer stops iterating (e.g. the client disconnected).
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run(name: str):
+        on_delta = None
+        if include_deltas:
+            on_delta = lambda text: queue.put_nowait(("delta", {"platform": name, "text": text}))
+
+        try:
+            raw = await PLATFORM_GENERATORS[name](content, context, memory, on_delta=on_delta)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            raw = e
+
+        queue.put_nowait(("platform", {"platform": name, "result": clean_platform_result(name, raw)}))
+
+    tasks = [asyncio.create_task(run(name)) for name in platforms]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            event, data = await queue.get()
+            if event == "platform":
+                remaining -= 1
+            yield event, data
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+@snippetstream_router.post("/repurpose/stream")
+async def repurpose_content_stream(
+    request: ContentRequest,
+    include_deltas: bool = False,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """Streaming variant of /repurpose.
+
+    Emits Server-Sent Events: ``start`` with the platforms being generated,
+    optional ``delta`` events with raw token text, one ``platform`` event per
+    platform as soon as its cleaned result is ready, and a final ``done``
+    event (or ``error`` if something unexpected happened mid-stream).
+    """
+    prepared = await prepare_repurpose(request, current_user, db)
+    user_id = current_user.id
+
+    logger.info("Processing streaming repurpose request", extra={
+        "user_id": user_id, "source": prepared["source"], "length": len(prepared["content"]), "sampled": True,
+    })
+
+    async def event_stream():
         start_time = time.time()
+        results = {}
 
-        # Generate all outputs in parallel for maximum speed
-        print("⚡ Triggering parallel generation for all platforms...")
-        
-        # Determine which tasks to run based on enabled_platforms
-        enabled = request.enabled_platforms or ["twitter", "linkedin", "instagram"]
-        
-        tasks = []
-        task_names = []
-        
-        if "twitter" in enabled or "x" in enabled:
-            tasks.append(create_twitter_thread_async(content, request.context, combined_memory))
-            task_names.append("twitter")
-        
-        if "linkedin" in enabled:
-            tasks.append(create_linkedin_post_async(content, request.context, combined_memory))
-            task_names.append("linkedin")
-            
-        if "instagram" in enabled:
-            tasks.append(create_instagram_carousel_async(content, request.context, combined_memory))
-            task_names.append("instagram")
-        
-        if not tasks:
-            raise HTTPException(status_code=400, detail="At least one platform must be selected")
-            
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Unpack results and handle potential errors
-        raw_twitter = []
-        raw_linkedin = ""
-        raw_instagram = []
-        
-        for i, name in enumerate(task_names):
-            res = results[i]
-            if isinstance(res, Exception):
-                print(f"❌ {name} generation error: {res}")
-                if name == "twitter": raw_twitter = ["❌ Twitter error"]
-                elif name == "linkedin": raw_linkedin = "❌ LinkedIn error"
-                elif name == "instagram": raw_instagram = ["❌ Instagram error"]
-            else:
-                if name == "twitter": raw_twitter = res
-                elif name == "linkedin": raw_linkedin = res
-                elif name == "instagram": raw_instagram = res
-        
-        # Clean results
-        twitter_thread = clean_twitter_thread(raw_twitter)
-        linkedin_post = clean_linkedin_post(raw_linkedin)
-        instagram_carousel = clean_instagram_slides(raw_instagram)
+        yield format_sse("start", {
+            "platforms": prepared["platforms"],
+            "original_content_preview": prepared["preview"],
+        })
+
+        try:
+            async for event, data in stream_platform_events(
+                prepared["platforms"],
+                prepared["content"],
+                request.context,
+                prepared["memory"],
+                include_deltas=include_deltas,
+            ):
+                if event == "platform":
+                    results[data["platform"]] = data["result"]
+                yield format_sse(event, data)
+        except Exception as e:
+            logger.exception("Error in repurpose_content_stream: %s", e)
+            yield format_sse("error", {"detail": f"Server Error: {str(e) or type(e).__name__}"})
+            return
 
         processing_time = time.time() - start_time
 
-        # Save generation
+        # The request-scoped session may already be closed once the response starts streaming
+        await run_db(save_generations_detached, user_id, [{
+            "content": prepared["content"],
+            "source": prepared["source"],
+            "results": results,
+            "context": request.context,
+            "processing_time": processing_time,
+        }])
+
+        yield format_sse("done", {
+            **build_social_media_response(results, prepared["preview"]).dict(),
+            "processing_time": processing_time,
+        })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ----------------------------------------------------
+# Bulk Repurpose Endpoint (Server-Sent Events)
+# ----------------------------------------------------
+@snippetstream_router.post("/repurpose/bulk")
+async def repurpose_content_bulk(
+    request: BulkContentRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """Repurpose a batch of texts/URLs (up to 50 for Pro) in one request.
+
+    Every LLM call goes through the generation scheduler, so a batch can't
+    exceed the per-user and global concurrency limits. Emits Server-Sent
+    Events: ``start``, one ``item`` event per input as soon as it finishes
+    (``status`` is ``ok`` or ``error``), and a final ``done`` with totals.
+    Successful items are saved together in one batched insert at the end.
+    """
+    feature_gate = get_feature_gate(current_user)
+    item_count = len(request.items)
+
+    if item_count == 0:
+        raise HTTPException(status_code=400, detail="At least one item is required")
+
+    if not feature_gate.can_bulk_process(item_count):
+        if current_user.is_premium:
+            detail = f"Bulk requests are limited to {feature_gate.get_max_bulk_items()} items"
+        else:
+            detail = feature_gate.get_upgrade_prompt("bulk_processing")["message"]
+        raise HTTPException(status_code=403, detail=detail)
+
+    if not await run_db(feature_gate.can_generate_content, db):
+        raise HTTPException(status_code=429, detail="Daily generation limit reached")
+
+    if any(item.url for item in request.items) and not feature_gate.can_process_urls():
+        raise HTTPException(status_code=403, detail="URL processing is Pro feature")
+
+    platforms = resolve_platforms(request.enabled_platforms)
+    engine = resolve_engine(request.engine)
+    memory = await run_db(build_combined_memory, current_user, db)
+    max_length = feature_gate.get_max_content_length()
+    user_id = current_user.id
+
+    logger.info("Processing bulk repurpose request", extra={"user_id": user_id, "items": item_count, "sampled": True})
+
+    async def process_item(index: int, item: BulkContentItem):
+        item_start = time.time()
         try:
-            generation = ContentGeneration(
-                user_id=current_user.id,
-                original_content=content[:1000],
-                content_source=source,
-                twitter_thread=json.dumps(twitter_thread),
-                linkedin_post=linkedin_post,
-                instagram_carousel=json.dumps(instagram_carousel),
-                context=json.dumps(request.context) if request.context else None,
-                processing_time=processing_time,
-            )
-            db.add(generation)
+            resolved = await resolve_content(str(item.url) if item.url else None, item.content, max_length)
+            context = item.context or request.context
 
-            usage = UsageStats(
-                user_id=current_user.id,
-                action="generate",
-                extra_data=json.dumps(
-                    {"source": source, "processing_time": processing_time}
-                ),
+            results = await generate_platforms(
+                platforms, resolved["content"], context, memory, engine,
+                call=lambda fn, *args: generation_scheduler.run(user_id, fn, *args),
             )
-            db.add(usage)
 
-            db.commit()
+            return index, {
+                **resolved,
+                "status": "ok",
+                "context": context,
+                "results": results,
+                "processing_time": time.time() - item_start,
+            }
+        except HTTPException as e:
+            return index, {"status": "error", "detail": e.detail}
+        except Exception as e:
+            logger.error("Bulk item failed: %s", e, extra={"user_id": user_id, "item": index})
+            return index, {"status": "error", "detail": f"Server Error: {str(e) or type(e).__name__}"}
+
+    async def event_stream():
+        start_time = time.time()
+        completed = []
+        failed = 0
 
-        except Exception as db_error:
-            print("⚠️ Database save failed:", db_error)
-            db.rollback()
+        yield format_sse("start", {"count": item_count, "platforms": platforms})
 
-        return SocialMediaResponse(
-            twitter_thread=twitter_thread,
-            linkedin_post=linkedin_post,
-            instagram_carousel=instagram_carousel,
-            original_content_preview=preview,
-        )
+        tasks = [asyncio.create_task(process_item(index, item)) for index, item in enumerate(request.items)]
+        try:
+            for next_finished in asyncio.as_completed(tasks):
+                index, outcome = await next_finished
+                if outcome["status"] == "ok":
+                    completed.append(outcome)
+                    yield format_sse("item", {
+                        "index": index,
+                        "status": "ok",
+                        **build_social_media_response(outcome["results"], outcome["preview"]).dict(),
+                        "processing_time": outcome["processing_time"],
+                    })
+                else:
+                    failed += 1
+                    yield format_sse("item", {"index": index, "status": "error", "detail": outcome["detail"]})
+        except Exception as e:
+            logger.exception("Error in repurpose_content_bulk: %s", e)
+            yield format_sse("error", {"detail": f"Server Error: {str(e) or type(e).__name__}"})
+        finally:
+            # Client disconnects close this generator; stop the remaining items
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        # The request-scoped session may already be closed once the response starts streaming
+        await run_db(save_generations_detached, user_id, completed)
+
+        yield format_sse("done", {
+            "succeeded": len(completed),
+            "failed": failed,
+            "processing_time": time.time() - start_time,
+        })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@snippetstream_router.get("/model-routing/stats", dependencies=[Depends(require_metrics_token)])
+async def model_routing_stats():
+    """Current model order with per-model EWMA latency, error rate and circuit state"""
+    return model_router.stats()
+
+
+@snippetstream_router.get("/generation-scheduler/stats", dependencies=[Depends(require_metrics_token)])
+async def generation_scheduler_stats():
+    """Running and queued LLM calls in the generation scheduler"""
+    return generation_scheduler.stats()
+
+
+@snippetstream_router.get("/db-executor/stats", dependencies=[Depends(require_metrics_token)])
+async def db_executor_stats():
+    """Running and queued blocking database calls on the database executor"""
+    return db_executor.stats()
+
+
+@snippetstream_router.get("/db-retry/stats", dependencies=[Depends(require_metrics_token)])
+async def db_retry_stats():
+    """Shared database retry budget and circuit breaker state"""
+    return db_retry_guard.stats()
 
-    except HTTPException:
-        # Re-raise HTTP exceptions (429, 403, etc)
-        raise
-    except Exception as e:
-        import traceback
-        print(f"❌ Error in repurpose_content: {str(e)}")
-        print(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Server Error: {str(e) or type(e).__name__}")
+
+# ----------------------------------------------------
+# Background Repurpose Jobs
+# ----------------------------------------------------
+JOB_EVENTS_POLL_SECONDS = 5
+
+
+async def run_repurpose_job(db: Session, user_id: int, payload: Dict, publish: Callable[[str, Dict], None]) -> Dict:
+    """Job handler: generate every platform for a prepared request and save it"""
+    start_time = time.time()
+    results = {}
+
+    async for event, data in stream_platform_events(
+        payload["platforms"],
+        payload["content"],
+        payload["context"],
+        payload["memory"],
+    ):
+        results[data["platform"]] = data["result"]
+        publish(event, data)
+
+    processing_time = time.time() - start_time
+    await run_db(save_generation, db, user_id, payload["content"], payload["source"], results, payload["context"], processing_time)
+
+    return {
+        **build_social_media_response(results, payload["preview"]).dict(),
+        "processing_time": processing_time,
+    }
+
+
+repurpose_jobs.register_handler(run_repurpose_job)
+
+
+def get_user_job(db: Session, job_id: str, user_id: int) -> RepurposeJob:
+    job = db.query(RepurposeJob).filter(
+        RepurposeJob.id == job_id,
+        RepurposeJob.user_id == user_id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@snippetstream_router.post("/repurpose/jobs", status_code=202)
+async def submit_repurpose_job(
+    request: ContentRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """Queue a repurpose request and return its job id immediately.
+
+    Gate checks and URL fetching happen here, so invalid requests still
+    fail with a normal HTTP error. Poll /repurpose/jobs/{job_id} or follow
+    /repurpose/jobs/{job_id}/events for the result.
+    """
+    prepared = await prepare_repurpose(request, current_user, db)
+
+    # Usage is recorded when a job finishes, so count queued jobs against the free quota now
+    if not current_user.is_premium:
+        remaining = await run_db(get_feature_gate(current_user).get_remaining_generations, db)
+        if await run_db(repurpose_jobs.count_active, db, current_user.id) >= remaining:
+            raise HTTPException(status_code=429, detail="Daily generation limit reached")
+
+    job = await repurpose_jobs.submit(db, current_user.id, {**prepared, "context": request.context})
+    logger.info("Queued repurpose job", extra={"job_id": job.id, "user_id": current_user.id, "source": prepared["source"]})
+
+    return {"job_id": job.id, "status": job.status}
+
+
+@snippetstream_router.get("/repurpose/jobs/{job_id}")
+async def get_repurpose_job(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """Status of a queued job, with its result once completed"""
+    return serialize_job(await run_db(get_user_job, db, job_id, current_user.id))
+
+
+@snippetstream_router.get("/repurpose/jobs/{job_id}/events")
+async def repurpose_job_events(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """Server-Sent Events for one job: ``status``, ``platform`` per finished
+    platform, then ``done`` with the result or ``error``.
+
+    Events are pushed when the job runs in this process; otherwise the job
+    row is re-read every few seconds until it finishes.
+    """
+    await run_db(get_user_job, db, job_id, current_user.id)
+
+    def load_job() -> Optional[Dict]:
+        poll_db = SessionLocal()
+        try:
+            # None once the row is gone (e.g. removed by the retention sweep)
+            job = poll_db.get(RepurposeJob, job_id)
+            return serialize_job(job) if job else None
+        finally:
+            poll_db.close()
+
+    async def event_stream():
+        # Subscribe before reading the row so a finish in between is not missed
+        queue = repurpose_jobs.subscribe(job_id)
+        try:
+            job = await run_db(load_job)
+            if job is not None:
+                yield format_sse("status", {"status": job["status"]})
+
+            while True:
+                if job is None:
+                    yield format_sse("error", {"detail": "Job not found"})
+                    return
+                if job["status"] in FINISHED_STATUSES:
+                    if job["status"] == "completed":
+                        yield format_sse("done", job["result"])
+                    else:
+                        yield format_sse("error", {"detail": job["error"]})
+                    return
+
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=JOB_EVENTS_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    job = await run_db(load_job)
+                    yield ": keep-alive\n\n"
+                    continue
+
+                yield format_sse(event, data)
+                if event in ("done", "error"):
+                    return
+        finally:
+            repurpose_jobs.unsubscribe(job_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ----------------------------------------------------
@@ -537,7 +1325,7 @@ async def track_usage(
 
         return {"status": "tracked"}
     except Exception as e:
-        print(f"⚠️ Analytics tracking failed: {e}")
+        logger.warning("Analytics tracking failed: %s", e)
         return {"status": "error", "message": str(e)}
 
 
@@ -547,3 +1335,15 @@ async def track_usage(
 @snippetstream_router.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "SnippetStream"}
+
+
+@snippetstream_router.get("/generation-cache/stats", dependencies=[Depends(require_metrics_token)])
+async def generation_cache_stats():
+    """Hit/miss counters and occupancy of the LLM generation cache"""
+    return generation_cache.stats()
+
+
+@snippetstream_router.get("/url-cache/stats", dependencies=[Depends(require_metrics_token)])
+async def url_cache_stats():
+    """Hit/revalidation/miss counters and disk usage of the URL text cache"""
+    return url_text_cache.stats()
@@ -6,6 +6,7 @@ from database import get_db
 from auth import get_current_active_user
 from models import User, CustomTemplate
 from db_utils import db_retry
+from db_executor import run_db
 import json
 from datetime import datetime
 import time
@@ -232,7 +233,7 @@ async def create_custom_template(
                 detail="You already have a template with this name"
             )
         
-        db_template = create_custom_template_db(db, current_user.id, template_data)
+        db_template = await run_db(create_custom_template_db, db, current_user.id, template_data)
         return db_template
         
     except HTTPException:
@@ -269,9 +270,9 @@ async def get_user_templates(
     
     try:
         if include_public:
-            templates = get_all_accessible_templates_db(db, current_user.id, category)
+            templates = await run_db(get_all_accessible_templates_db, db, current_user.id, category)
         else:
-            templates = get_user_templates_db(db, current_user.id, category)
+            templates = await run_db(get_user_templates_db, db, current_user.id, category)
         
         # Add is_own_template flag to distinguish user's templates from public ones
         for template in templates:
@@ -309,7 +310,7 @@ async def get_template(
         )
     
     try:
-        template = get_template_by_id_db(db, template_id, current_user.id)
+        template = await run_db(get_template_by_id_db, db, template_id, current_user.id)
         if not template:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -358,7 +359,7 @@ async def update_template(
                     detail="You already have a template with this name"
                 )
         
-        updated_template = update_template_db(db, template_id, current_user.id, template_data)
+        updated_template = await run_db(update_template_db, db, template_id, current_user.id, template_data)
         if not updated_template:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -384,7 +385,7 @@ async def delete_template(
 ):
     """Delete a custom template"""
     try:
-        success = delete_template_db(db, template_id, current_user.id)
+        success = await run_db(delete_template_db, db, template_id, current_user.id)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -410,7 +411,7 @@ async def use_template(
 ):
     """Use a template (increments usage count and returns template content)"""
     try:
-        template = increment_template_usage_db(db, template_id, current_user.id)
+        template = await run_db(increment_template_usage_db, db, template_id, current_user.id)
         if not template:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
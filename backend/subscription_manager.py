@@ -4,14 +4,18 @@ Handles automatic expiration, grace periods, and subscription lifecycle
 """
 import os
 import asyncio
+import logging
 from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from database import get_db
 from models import User, Subscription, PaymentHistory
+from identity_cache import invalidate_user_identity
 import json
 import uuid
 
+logger = logging.getLogger(__name__)
+
 def get_utc_now():
     """Get current UTC time with timezone awareness"""
     return datetime.now(timezone.utc)
@@ -28,6 +32,30 @@ class SubscriptionManager:
     def __init__(self):
         self.grace_period_days = int(os.getenv("SUBSCRIPTION_GRACE_PERIOD_DAYS", "3"))
         self.check_interval_hours = int(os.getenv("SUBSCRIPTION_CHECK_INTERVAL_HOURS", "6"))
+    
+    def compute_premium_until(self, period_end):
+        """Premium access cutoff stored on the user: period end plus grace period"""
+        period_end = make_timezone_aware(period_end)
+        if period_end is None:
+            return None
+        return period_end + timedelta(days=self.grace_period_days)
+    
+    def has_premium_access(self, user: User, current_time: datetime = None) -> bool:
+        """Per-request premium check against the denormalized ``premium_until``.
+        
+        Pure in-memory comparison with no queries or writes; downgrades and
+        their PaymentHistory records are written by the periodic sweep. Users
+        without ``premium_until`` yet keep their flag until the sweep
+        backfills it.
+        """
+        if not user or not user.is_premium:
+            return False
+        
+        premium_until = make_timezone_aware(user.premium_until)
+        if premium_until is None:
+            return True
+        
+        return premium_until >= (current_time or get_utc_now())
         
     def check_expired_subscriptions(self, db: Session):
         """Check and handle expired subscriptions"""
@@ -36,7 +64,7 @@ class SubscriptionManager:
             current_time = get_utc_now()
             grace_cutoff = current_time - timedelta(days=self.grace_period_days)
             
-            print(f"[INFO] Checking for expired subscriptions at {current_time}")
+            logger.info("Checking for expired subscriptions")
             
             # Find subscriptions that are past their end date + grace period
             expired_subscriptions = db.query(Subscription).filter(
@@ -47,18 +75,21 @@ class SubscriptionManager:
             ).all()
             
             expired_count = 0
+            expired_user_ids = []
             for subscription in expired_subscriptions:
                 try:
                     user = db.query(User).filter(User.id == subscription.user_id).first()
                     if user and user.is_premium:
                         
-                        print(f"[INFO] Expiring subscription for {user.email}")
-                        print(f"   Subscription ID: {subscription.id}")
-                        print(f"   Period ended: {subscription.current_period_end}")
-                        print(f"   Grace period ended: {grace_cutoff}")
+                        logger.info("Expiring subscription for %s", user.email, extra={
+                            "subscription_id": subscription.id,
+                            "period_end": subscription.current_period_end,
+                            "grace_cutoff": grace_cutoff,
+                        })
                         
                         # Downgrade user
                         user.is_premium = False
+                        user.premium_until = None
                         
                         # Update subscription status
                         subscription.status = "expired"
@@ -88,24 +119,66 @@ class SubscriptionManager:
                         
                         db.add(expiration_record)
                         expired_count += 1
+                        expired_user_ids.append(user.id)
                         
-                        print(f"[OK] User {user.email} downgraded due to expiration")
+                        logger.info("User %s downgraded due to expiration", user.email)
                         
                 except Exception as e:
-                    print(f"[ERROR] Error processing expired subscription {subscription.id}: {e}")
+                    logger.error("Error processing expired subscription: %s", e, extra={"subscription_id": subscription.id})
                     continue
             
             if expired_count > 0:
                 db.commit()
-                print(f"[OK] Processed {expired_count} expired subscriptions")
+                for user_id in expired_user_ids:
+                    invalidate_user_identity(user_id)
+                logger.info("Processed %d expired subscriptions", expired_count)
             else:
-                print("[OK] No expired subscriptions found")
+                logger.info("No expired subscriptions found")
                 
+            # Keep the denormalized premium_until in step with active subscriptions
+            self.sync_premium_until(db)
+            
             # Also check for subscriptions expiring soon (for notifications)
             self.check_expiring_soon(db, current_time)
             
         except Exception as e:
-            print(f"[ERROR] Error in subscription expiration check: {e}")
+            logger.exception("Error in subscription expiration check: %s", e)
+            db.rollback()
+    
+    def sync_premium_until(self, db: Session):
+        """Backfill premium_until and downgrade premium users left without an active subscription"""
+        
+        try:
+            premium_users = db.query(User).filter(User.is_premium == True).all()
+            active_subscriptions = {
+                subscription.user_id: subscription
+                for subscription in db.query(Subscription).filter(Subscription.status == "active").all()
+            }
+            
+            changed_user_ids = []
+            for user in premium_users:
+                subscription = active_subscriptions.get(user.id)
+                
+                if not subscription:
+                    logger.warning("User %s marked premium but no active subscription - downgrading", user.email)
+                    user.is_premium = False
+                    user.premium_until = None
+                    changed_user_ids.append(user.id)
+                    continue
+                
+                premium_until = self.compute_premium_until(subscription.current_period_end)
+                if make_timezone_aware(user.premium_until) != premium_until:
+                    user.premium_until = premium_until
+                    changed_user_ids.append(user.id)
+            
+            if changed_user_ids:
+                db.commit()
+                for user_id in changed_user_ids:
+                    invalidate_user_identity(user_id)
+                logger.info("Synced premium_until for %d users", len(changed_user_ids))
+                
+        except Exception as e:
+            logger.exception("Error syncing premium_until: %s", e)
             db.rollback()
     
     def check_expiring_soon(self, db: Session, current_time: datetime):
@@ -124,20 +197,24 @@ class SubscriptionManager:
             ).all()
             
             if expiring_soon:
-                print(f"[WARN] Found {len(expiring_soon)} subscriptions expiring within 3 days")
+                logger.warning("Found %d subscriptions expiring within 3 days", len(expiring_soon))
                 for subscription in expiring_soon:
                     user = db.query(User).filter(User.id == subscription.user_id).first()
                     if user:
                         end_time = make_timezone_aware(subscription.current_period_end)
                         days_left = (end_time - current_time).days
-                        print(f"   {user.email} expires in {days_left} days")
+                        logger.info("%s expires in %d days", user.email, days_left, extra={"subscription_id": subscription.id})
                         # Here you could send email notifications
             
         except Exception as e:
-            print(f"[ERROR] Error checking expiring subscriptions: {e}")
+            logger.exception("Error checking expiring subscriptions: %s", e)
     
     def check_user_subscription_status(self, user_id: int, db: Session) -> bool:
-        """Real-time check if user should have premium access"""
+        """Full check against the Subscription table, used by explicit status checks.
+        
+        Authenticated requests use ``has_premium_access`` instead; this
+        variant queries and may write, so keep it off the per-request path.
+        """
         
         try:
             user = db.query(User).filter(User.id == user_id).first()
@@ -158,9 +235,11 @@ class SubscriptionManager:
             
             if not active_subscription:
                 # User marked as premium but no active subscription - downgrade
-                print(f"[WARN] User {user.email} marked premium but no active subscription - downgrading")
+                logger.warning("User %s marked premium but no active subscription - downgrading", user.email)
                 user.is_premium = False
+                user.premium_until = None
                 db.commit()
+                invalidate_user_identity(user.id)
                 return False
             
             # Check if subscription is expired (with grace period)
@@ -172,8 +251,9 @@ class SubscriptionManager:
             
             if subscription_end < grace_cutoff:
                 # Subscription expired beyond grace period - downgrade immediately
-                print(f"[WARN] User {user.email} subscription expired beyond grace period - downgrading")
+                logger.warning("User %s subscription expired beyond grace period - downgrading", user.email)
                 user.is_premium = False
+                user.premium_until = None
                 active_subscription.status = "expired"
                 active_subscription.updated_at = current_time
                 
@@ -199,13 +279,20 @@ class SubscriptionManager:
                 
                 db.add(expiration_record)
                 db.commit()
+                invalidate_user_identity(user.id)
                 return False
             
-            # User has valid premium access
+            # User has valid premium access - make sure the denormalized cutoff matches
+            premium_until = self.compute_premium_until(active_subscription.current_period_end)
+            if make_timezone_aware(user.premium_until) != premium_until:
+                user.premium_until = premium_until
+                db.commit()
+                invalidate_user_identity(user.id)
+            
             return True
             
         except Exception as e:
-            print(f"[ERROR] Error checking user subscription status: {e}")
+            logger.exception("Error checking user subscription status: %s", e, extra={"user_id": user_id})
             return user.is_premium if user else False
 
 # Global subscription manager instance
@@ -217,7 +304,7 @@ def run_subscription_check():
         db = next(get_db())
         subscription_manager.check_expired_subscriptions(db)
     except Exception as e:
-        print(f"[ERROR] Error in background subscription check: {e}")
+        logger.exception("Error in background subscription check: %s", e)
     finally:
         if 'db' in locals():
             db.close()
@@ -227,12 +314,12 @@ async def subscription_background_task():
     
     check_interval = subscription_manager.check_interval_hours * 3600  # Convert to seconds
     
-    print(f"[INFO] Starting subscription background task (checking every {subscription_manager.check_interval_hours} hours)")
+    logger.info("Starting subscription background task (checking every %d hours)", subscription_manager.check_interval_hours)
     
     while True:
         try:
             run_subscription_check()
             await asyncio.sleep(check_interval)
         except Exception as e:
-            print(f"[ERROR] Error in subscription background task: {e}")
+            logger.exception("Error in subscription background task: %s", e)
             await asyncio.sleep(300)  # Wait 5 minutes before retrying
\ No newline at end of file
@@ -0,0 +1,45 @@
+"""
+Shared fixtures for the backend unit tests
+
+The test_*.py scripts in backend/ are manual checks against a running
+server; the tests in this directory run offline against a throwaway
+SQLite database: python -m pytest -q
+"""
+import importlib.util
+import os
+import tempfile
+
+# Before any project import creates the engine
+_db_dir = tempfile.mkdtemp(prefix="snippetstream-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+
+import pytest
+
+from database import engine, SessionLocal
+from models import Base
+
+
+@pytest.fixture
+def db():
+    """A session on freshly created tables"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def snippetstream():
+    """routes/snippetstream_routes.py loaded on its own.
+
+    Importing the routes package pulls in every router, including the
+    payment SDK wiring, which these tests do not need.
+    """
+    path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "routes", "snippetstream_routes.py")
+    spec = importlib.util.spec_from_file_location("snippetstream_routes", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import analytics
+from analytics import bump_analytics_summary, get_content_analytics
+from models import ContentGeneration, SavedContent, UsageStats, User, UserAnalyticsSummary
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="stats@example.com", username="stats", hashed_password="x")
+    db.add(user)
+    db.commit()
+
+    now = datetime.now(timezone.utc)
+    for created_at in (now, now - timedelta(days=2), now - timedelta(days=40)):
+        db.add(ContentGeneration(user_id=user.id, original_content="text", created_at=created_at))
+    for platform, created_at in (("twitter", now), ("twitter", now), ("linkedin", now), ("instagram", now - timedelta(days=40))):
+        db.add(UsageStats(user_id=user.id, action="copy", platform=platform, created_at=created_at))
+    db.add(UsageStats(user_id=user.id, action="generate", platform="twitter", created_at=now))
+    db.add(SavedContent(user_id=user.id, title="a", content_type="twitter", content="x", is_favorite=True))
+    db.add(SavedContent(user_id=user.id, title="b", content_type="linkedin", content="y"))
+
+    # Another user's rows must not leak into the aggregates
+    other = User(email="noise@example.com", username="noise", hashed_password="x")
+    db.add(other)
+    db.flush()
+    db.add(ContentGeneration(user_id=other.id, original_content="text"))
+    db.add(UsageStats(user_id=other.id, action="copy", platform="twitter", created_at=now))
+    db.commit()
+    return user
+
+
+EXPECTED = {
+    "total_generations": 3,
+    "recent_generations": 2,
+    "platform_usage": {"twitter": 2, "linkedin": 1, "instagram": 0},
+    "saved_content": 2,
+    "favorites": 1,
+}
+
+
+def _since():
+    return datetime.now(timezone.utc) - timedelta(days=30)
+
+
+def test_single_query_aggregates_every_metric(db, user, monkeypatch):
+    monkeypatch.setattr(analytics, "ANALYTICS_SUMMARY_ENABLED", False)
+    assert get_content_analytics(db, user.id, _since()) == EXPECTED
+
+
+def test_user_without_activity_gets_zeroes(db, monkeypatch):
+    monkeypatch.setattr(analytics, "ANALYTICS_SUMMARY_ENABLED", False)
+    empty = User(email="empty@example.com", username="empty", hashed_password="x")
+    db.add(empty)
+    db.commit()
+
+    result = get_content_analytics(db, empty.id, _since())
+    assert result["total_generations"] == 0
+    assert result["platform_usage"] == {"twitter": 0, "linkedin": 0, "instagram": 0}
+    assert result["saved_content"] == 0
+
+
+def test_summary_path_seeds_row_and_applies_deltas(db, user, monkeypatch):
+    monkeypatch.setattr(analytics, "ANALYTICS_SUMMARY_ENABLED", True)
+    assert get_content_analytics(db, user.id, _since()) == EXPECTED
+    assert db.get(UserAnalyticsSummary, user.id) is not None
+
+    db.add(ContentGeneration(user_id=user.id, original_content="more"))
+    bump_analytics_summary(db, user.id, generations=1)
+    db.commit()
+
+    result = get_content_analytics(db, user.id, _since())
+    assert result["total_generations"] == 4
+    assert result["recent_generations"] == 3
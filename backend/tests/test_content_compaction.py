@@ -0,0 +1,59 @@
+from content_compaction import ContentCompactor
+
+SENTENCE = "We shipped the onboarding flow and measured activation for new users."
+
+
+def long_paragraph(sentences: int) -> str:
+    return " ".join(f"{SENTENCE[:-1]} on day {i}." for i in range(sentences))
+
+
+def test_short_text_is_only_cleaned():
+    compactor = ContentCompactor(token_budget=1000)
+    text = "Shipped the beta.\nShipped the beta.\n\nAccept cookies\nFixed the login bug."
+    assert compactor.compact(text) == "Shipped the beta.\n\nFixed the login bug."
+
+
+def test_single_line_input_is_trimmed_to_budget():
+    # URL extraction yields one space-joined line with no paragraph breaks
+    compactor = ContentCompactor()
+    text = long_paragraph(400)
+    assert compactor.count_tokens(text) > 1000
+
+    compacted = compactor.compact(text, token_budget=100)
+    assert 0 < compactor.count_tokens(compacted) <= 100
+    assert text.startswith(compacted)
+    assert compacted.endswith(".")
+
+
+def test_daily_log_keeps_structure_and_trims_reflection():
+    compactor = ContentCompactor()
+    text = "Morning Plan:\n- [x] ship\n\n" + long_paragraph(500)
+
+    compacted = compactor.compact(text, token_budget=500)
+    assert compactor.count_tokens(compacted) <= 500
+    assert compacted.startswith("Morning Plan:\n- [x] ship\n\n")
+    # The reflection is shortened, not dropped
+    assert compactor.count_tokens(compacted) > 400
+
+
+def test_salient_paragraphs_win_over_off_topic_ones():
+    compactor = ContentCompactor()
+    on_topic = "Activation for new users rose after the onboarding flow shipped."
+    paragraphs = [on_topic] * 3 + ["Lunch was a sandwich and the weather was grey outside."]
+    text = "\n\n".join(f"{p} ({i})" for i, p in enumerate(paragraphs))
+
+    compacted = compactor.compact(text, token_budget=compactor.count_tokens(text) - 10)
+    assert "onboarding" in compacted
+    assert "sandwich" not in compacted
+
+
+def test_boilerplate_only_input_stays_within_budget():
+    compactor = ContentCompactor()
+    text = "\n".join(["Accept cookies", "All rights reserved", "Subscribe to our newsletter"] * 50)
+    assert compactor.count_tokens(compactor.compact(text, token_budget=10)) <= 10
+
+
+def test_disabled_compactor_returns_input():
+    compactor = ContentCompactor(enabled=False)
+    text = long_paragraph(50)
+    assert compactor.compact(text, token_budget=10) == text
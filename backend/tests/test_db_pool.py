@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from db_pool import PoolMonitor, pool_settings
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/pool.db")
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("env, expected", [
+    ({}, (10, 20)),
+    ({"DB_MAX_CONNECTIONS": "40", "WEB_CONCURRENCY": "4"}, (5, 5)),
+    ({"DB_MAX_CONNECTIONS": "25", "WEB_CONCURRENCY": "2"}, (6, 6)),
+    ({"DB_MAX_CONNECTIONS": "3", "WEB_CONCURRENCY": "8"}, (1, 1)),
+    ({"DB_MAX_CONNECTIONS": "40", "DB_POOL_SIZE": "7"}, (7, 20)),
+])
+def test_pool_settings_split_connection_budget_across_workers(monkeypatch, env, expected):
+    for name in ("DB_MAX_CONNECTIONS", "WEB_CONCURRENCY", "DB_POOL_SIZE", "DB_MAX_OVERFLOW"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    settings = pool_settings()
+    assert (settings["pool_size"], settings["max_overflow"]) == expected
+
+
+def test_recently_used_connections_skip_the_ping(engine):
+    monitor = PoolMonitor(ping_idle_seconds=60)
+    monitor.attach(engine)
+
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    assert monitor.connects == 1
+    assert monitor.pings == 0
+    assert monitor.pings_skipped == 3
+
+
+def test_idle_connections_are_pinged(engine):
+    monitor = PoolMonitor(ping_idle_seconds=0)
+    monitor.attach(engine)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert monitor.pings == 1
+    assert monitor.ping_failures == 0
+
+
+def test_dead_idle_connection_is_replaced_transparently(tmp_path):
+    # No rollback on checkin, so the dead connection goes back into the pool unnoticed
+    engine = create_engine(f"sqlite:///{tmp_path}/dead.db", pool_reset_on_return=None)
+    monitor = PoolMonitor(ping_idle_seconds=60)
+    monitor.attach(engine)
+
+    with engine.connect() as conn:
+        conn.connection.dbapi_connection.close()
+
+    monitor.ping_idle_seconds = 0
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+
+    assert monitor.ping_failures == 1
+    assert monitor.connects == 2
+    engine.dispose()
+
+
+def test_stats_report_waits_and_failures():
+    monitor = PoolMonitor()
+    for seconds in (0.001, 0.002, 0.010):
+        monitor.record_wait(seconds)
+    monitor.record_wait(30.0, failed=True)
+
+    stats = monitor.stats(pool=None)
+    assert stats["checkouts"] == 3
+    assert stats["checkout_failures"] == 1
+    assert stats["checkout_wait_max_ms"] == 10.0
+    assert "in_use" not in stats
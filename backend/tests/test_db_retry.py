@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from db_utils import DatabaseUnavailableError, RetryGuard, db_retry
+
+
+def connection_error():
+    return OperationalError("SELECT 1", {}, Exception("server closed the connection"))
+
+
+class Flaky:
+    """Raises a connection error for the first ``failures`` calls"""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise connection_error()
+        return "ok"
+
+
+def test_guard_opens_after_threshold_and_probes_after_cooldown():
+    guard = RetryGuard(failure_threshold=2, cooldown_seconds=0.05)
+    guard.record_failure()
+    assert guard.allow_call()
+    guard.record_failure()
+    assert guard.state == "open"
+    assert not guard.allow_call()
+
+    time.sleep(0.06)
+    assert guard.allow_call()
+    assert guard.state == "half_open"
+    # Only one probe per cooldown
+    assert not guard.allow_call()
+
+    guard.record_success()
+    assert guard.state == "closed"
+
+
+def test_retry_budget_limits_retries():
+    guard = RetryGuard(budget_ratio=0.5, budget_max=1)
+    assert guard.allow_retry()
+    assert not guard.allow_retry()
+    guard.record_success()
+    guard.record_success()
+    assert guard.allow_retry()
+
+
+def test_sync_retry_recovers_off_the_event_loop():
+    flaky = Flaky(failures=2)
+    call = db_retry(max_retries=3, delay=0.001, max_delay=0.002, guard=RetryGuard())(flaky)
+    assert call() == "ok"
+    assert flaky.calls == 3
+
+
+def test_sync_retry_gives_up_after_max_retries():
+    flaky = Flaky(failures=5)
+    call = db_retry(max_retries=3, delay=0.001, max_delay=0.002, guard=RetryGuard())(flaky)
+    with pytest.raises(OperationalError):
+        call()
+    assert flaky.calls == 3
+
+
+def test_sync_retry_fails_fast_on_the_event_loop():
+    flaky = Flaky(failures=1)
+
+    @db_retry(max_retries=3, delay=0.001, guard=RetryGuard())
+    def call():
+        return flaky()
+
+    async def on_loop():
+        with pytest.raises(OperationalError):
+            call()
+
+    asyncio.run(on_loop())
+    assert flaky.calls == 1
+
+
+def test_async_retry_backs_off_and_recovers():
+    flaky = Flaky(failures=1)
+
+    @db_retry(max_retries=3, delay=0.001, max_delay=0.002, guard=RetryGuard())
+    async def call():
+        return flaky()
+
+    assert asyncio.run(call()) == "ok"
+    assert flaky.calls == 2
+
+
+def test_open_circuit_rejects_without_calling():
+    guard = RetryGuard(failure_threshold=1, cooldown_seconds=60)
+    guard.record_failure()
+    flaky = Flaky(failures=0)
+    call = db_retry(guard=guard)(flaky)
+    with pytest.raises(DatabaseUnavailableError):
+        call()
+    assert flaky.calls == 0
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+import generation_cache as cache_module
+from generation_cache import DatabaseCacheBackend, GenerationCache, make_cache_key
+from models import GenerationCacheEntry
+
+MESSAGES = [{"role": "user", "content": "Summarise this"}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    class Clock:
+        now = 1_000_000.0
+
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", lambda: clock.now)
+    return clock
+
+
+def test_key_covers_messages_models_and_budget():
+    key = make_cache_key(MESSAGES, ["a", "b"], 500)
+    assert key == make_cache_key([dict(MESSAGES[0])], ("a", "b"), 500)
+    assert key != make_cache_key(MESSAGES, ["b", "a"], 500)
+    assert key != make_cache_key(MESSAGES, ["a", "b"], 600)
+    assert key != make_cache_key([{"role": "user", "content": "Summarise that"}], ["a", "b"], 500)
+
+
+def test_lru_evicts_least_recently_used(clock):
+    cache = GenerationCache(max_entries=2)
+
+    async def scenario():
+        await cache.set("a", "A")
+        await cache.set("b", "B")
+        assert await cache.get("a") == "A"
+        await cache.set("c", "C")
+        return [await cache.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == ["A", None, "C"]
+    assert cache.evictions == 1
+    assert cache.stats()["entries"] == 2
+
+
+def test_local_entries_expire(clock):
+    cache = GenerationCache(ttl_seconds=60)
+
+    async def scenario():
+        await cache.set("a", "A")
+        clock.now += 61
+        return await cache.get("a")
+
+    assert asyncio.run(scenario()) is None
+    assert cache.misses == 1
+
+
+def test_empty_results_and_disabled_cache_store_nothing(clock):
+    async def scenario():
+        cache = GenerationCache()
+        await cache.set("a", "")
+        disabled = GenerationCache(enabled=False)
+        await disabled.set("b", "B")
+        return await cache.get("a"), await disabled.get("b")
+
+    assert asyncio.run(scenario()) == (None, None)
+
+
+def test_shared_tier_hit_fills_the_local_tier(db, clock):
+    shared = DatabaseCacheBackend()
+    writer = GenerationCache(shared_backend=shared)
+    reader = GenerationCache(shared_backend=shared)
+
+    async def scenario():
+        await writer.set("k", "answer")
+        first = await reader.get("k")
+        shared.clear()
+        # Served from the local copy now
+        second = await reader.get("k")
+        return first, second
+
+    assert asyncio.run(scenario()) == ("answer", "answer")
+    assert reader.shared_hits == 1
+    assert reader.hits == 1
+
+
+def test_shared_tier_miss_and_expiry(db, clock):
+    shared = DatabaseCacheBackend()
+    shared.set("k", "answer", ttl_seconds=60)
+    assert shared.get("missing") is None
+    assert shared.get("k") == "answer"
+
+    clock.now += 61
+    cache = GenerationCache(shared_backend=shared)
+    assert asyncio.run(cache.get("k")) is None
+    assert cache.misses == 1
+
+
+def test_shared_tier_overwrites_and_purges(db, clock):
+    shared = DatabaseCacheBackend(max_rows=2)
+    shared.set("old", "1", ttl_seconds=10)
+    shared.set("old", "2", ttl_seconds=10)
+    assert shared.get("old") == "2"
+
+    clock.now += 1
+    for key in ("x", "y", "z"):
+        shared.set(key, key, ttl_seconds=100)
+    shared._purge(db)
+
+    keys = {entry.cache_key for entry in db.query(GenerationCacheEntry)}
+    assert len(keys) == 2
+    assert "old" not in keys
+
+
+def test_shared_tier_errors_degrade_to_a_miss(clock):
+    class Broken:
+        def get(self, key):
+            raise RuntimeError("database down")
+
+        def set(self, key, value, ttl_seconds):
+            raise RuntimeError("database down")
+
+    cache = GenerationCache(shared_backend=Broken())
+
+    async def scenario():
+        await cache.set("k", "v")
+        cache._entries.clear()
+        return await cache.get("k")
+
+    assert asyncio.run(scenario()) is None
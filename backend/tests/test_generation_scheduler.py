@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from generation_scheduler import GenerationScheduler
+
+
+class Tracker:
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self.per_user = {}
+        self.per_user_peak = {}
+        self.order = []
+
+    async def call(self, user_id, label, seconds=0.02):
+        self.running += 1
+        self.per_user[user_id] = self.per_user.get(user_id, 0) + 1
+        self.peak = max(self.peak, self.running)
+        self.per_user_peak[user_id] = max(self.per_user_peak.get(user_id, 0), self.per_user[user_id])
+        self.order.append(label)
+        try:
+            await asyncio.sleep(seconds)
+            return label
+        finally:
+            self.running -= 1
+            self.per_user[user_id] -= 1
+
+
+def test_global_and_per_user_limits_hold():
+    tracker = Tracker()
+
+    async def scenario():
+        scheduler = GenerationScheduler(max_concurrent=4, per_user_limit=2)
+        calls = [
+            scheduler.run(user_id, tracker.call, user_id, f"{user_id}-{i}")
+            for user_id in (1, 2, 3)
+            for i in range(5)
+        ]
+        return await asyncio.gather(*calls), scheduler.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert len(results) == 15
+    assert tracker.peak == 4
+    assert max(tracker.per_user_peak.values()) == 2
+    assert stats["running"] == 0 and stats["users_pending"] == 0 and stats["calls_pending"] == 0
+
+
+def test_bulk_user_does_not_starve_a_later_user():
+    tracker = Tracker()
+
+    async def scenario():
+        scheduler = GenerationScheduler(max_concurrent=4, per_user_limit=2)
+        bulk = [asyncio.create_task(scheduler.run(1, tracker.call, 1, f"bulk-{i}")) for i in range(20)]
+        await asyncio.sleep(0)
+        single = asyncio.create_task(scheduler.run(2, tracker.call, 2, "single"))
+        await asyncio.gather(*bulk, single)
+
+    asyncio.run(scenario())
+    # Only the bulk user's own two slots were ahead of it
+    assert tracker.order.index("single") <= 2
+
+
+def test_slots_are_released_when_the_call_fails():
+    async def boom():
+        raise RuntimeError("upstream")
+
+    async def scenario():
+        scheduler = GenerationScheduler(max_concurrent=1, per_user_limit=1)
+        with pytest.raises(RuntimeError):
+            await scheduler.run(1, boom)
+        # Would block forever if the failed call had kept its slot
+        return await asyncio.wait_for(scheduler.run(1, asyncio.sleep, 0, result="ok"), timeout=1)
+
+    assert asyncio.run(scenario()) == "ok"
+
+
+def test_stats_report_pending_calls():
+    async def scenario():
+        scheduler = GenerationScheduler(max_concurrent=1, per_user_limit=1)
+        gate = asyncio.Event()
+        tasks = [asyncio.create_task(scheduler.run(user_id, gate.wait)) for user_id in (1, 1, 2)]
+        await asyncio.sleep(0.01)
+        stats = scheduler.stats()
+        gate.set()
+        await asyncio.gather(*tasks)
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["running"] == 1
+    assert stats["users_pending"] == 2
+    assert stats["calls_pending"] == 3
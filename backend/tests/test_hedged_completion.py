@@ -0,0 +1,126 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from model_router import ModelRouter
+
+
+class FakeCompletions:
+    """Per-model scripted behaviour: (delay_seconds, text or exception)"""
+
+    def __init__(self, behaviours):
+        self.behaviours = behaviours
+        self.started = []
+        self.cancelled = []
+
+    async def create(self, model, messages, max_tokens, temperature, stream=False):
+        self.started.append(model)
+        delay, outcome = self.behaviours[model]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(model)
+            raise
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=outcome))], usage=None)
+
+
+@pytest.fixture
+def llm(snippetstream, monkeypatch):
+    router = ModelRouter(["a", "b", "c"], prior_latency_seconds=0.05)
+    monkeypatch.setattr(snippetstream, "model_router", router)
+    monkeypatch.setattr(snippetstream, "LLM_HEDGE_MIN_DELAY_SECONDS", 0.05)
+
+    def script(**behaviours):
+        completions = FakeCompletions(behaviours)
+        monkeypatch.setattr(snippetstream, "async_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+        return completions
+
+    return SimpleNamespace(router=router, script=script)
+
+
+def _hedged(snippetstream, candidates):
+    messages = [{"role": "user", "content": "hi"}]
+    return asyncio.run(snippetstream._hedged_completion(candidates, messages, 100, 0))
+
+
+def test_fast_answer_is_not_hedged(snippetstream, llm):
+    calls = llm.script(a=(0.0, "from a"), b=(0.0, "from b"))
+    assert _hedged(snippetstream, ["a", "b"]) == ("a", "from a")
+    assert calls.started == ["a"]
+
+
+def test_hedge_fires_after_the_delay_and_cancels_the_loser(snippetstream, llm):
+    calls = llm.script(a=(2.0, "from a"), b=(0.0, "from b"))
+
+    started = time.monotonic()
+    assert _hedged(snippetstream, ["a", "b"]) == ("b", "from b")
+    assert time.monotonic() - started < 1.0
+    assert calls.started == ["a", "b"]
+    assert calls.cancelled == ["a"]
+    # The cancelled call is neither a success nor a failure for routing
+    assert llm.router._stats["a"].failures == 0
+    assert llm.router._stats["b"].successes == 1
+
+
+def test_slow_first_model_can_still_win_the_race(snippetstream, llm):
+    calls = llm.script(a=(0.1, "from a"), b=(2.0, "from b"))
+    assert _hedged(snippetstream, ["a", "b"]) == ("a", "from a")
+    assert calls.cancelled == ["b"]
+
+
+def test_failure_starts_the_next_model_without_waiting(snippetstream, llm):
+    llm.router.prior_latency_seconds = 5.0
+    calls = llm.script(a=(0.0, RuntimeError("upstream 500")), b=(0.0, "from b"))
+
+    started = time.monotonic()
+    assert _hedged(snippetstream, ["a", "b"]) == ("b", "from b")
+    assert time.monotonic() - started < 1.0
+    assert calls.started == ["a", "b"]
+    assert llm.router._stats["a"].failures == 1
+    assert llm.router._stats["a"].last_error == "upstream 500"
+
+
+def test_all_models_failing_returns_nothing(snippetstream, llm):
+    llm.script(a=(0.0, RuntimeError("down")), b=(0.0, ""), c=(0.0, RuntimeError("down")))
+    assert _hedged(snippetstream, ["a", "b", "c"]) == (None, None)
+    assert all(llm.router._stats[name].failures == 1 for name in "abc")
+
+
+def test_unexpected_errors_surface_and_cancel_pending_calls(snippetstream, llm, monkeypatch):
+    calls = llm.script(a=(2.0, "from a"))
+    real_attempt = snippetstream._attempt_completion
+
+    async def attempt(model_name, *args):
+        if model_name == "b":
+            raise KeyError("bug")
+        return await real_attempt(model_name, *args)
+
+    monkeypatch.setattr(snippetstream, "_attempt_completion", attempt)
+    with pytest.raises(KeyError):
+        _hedged(snippetstream, ["a", "b"])
+    assert calls.cancelled == ["a"]
+
+
+def test_streaming_calls_are_never_hedged(snippetstream, llm, monkeypatch):
+    monkeypatch.setattr(snippetstream, "LLM_HEDGING_ENABLED", True)
+    llm.script(a=(0.0, "x"))
+
+    async def hedged(*args):
+        raise AssertionError("streaming call was hedged")
+
+    async def sequential(candidates, messages, max_tokens, on_delta, attempt):
+        on_delta("streamed")
+        return "a", "streamed"
+
+    monkeypatch.setattr(snippetstream, "_hedged_completion", hedged)
+    monkeypatch.setattr(snippetstream, "_sequential_completion", sequential)
+    deltas = []
+    result = asyncio.run(snippetstream.safe_completion_async(
+        [{"role": "user", "content": "hi"}], on_delta=deltas.append, use_cache=False,
+    ))
+    assert result == "streamed"
+    assert deltas == ["streamed"]
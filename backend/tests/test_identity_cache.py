@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from auth import create_access_token, get_current_user
+from identity_cache import IdentityCache, identity_cache
+from models import User
+
+
+def make_user(db, email="cache@example.com", username="cache") -> User:
+    user = User(email=email, username=username, hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def resolve(db, claims):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token(claims))
+    return asyncio.run(get_current_user(credentials, db))
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    identity_cache.clear()
+    yield
+    identity_cache.clear()
+
+
+def test_entries_are_keyed_by_email_and_user_id(db):
+    cache = IdentityCache()
+    user = make_user(db)
+    cache.put(user.email, user)
+
+    assert cache.get(user.email, user.id) is not None
+    assert cache.get(user.email, user.id + 1) is None
+    assert "is_premium" not in cache.get(user.email, user.id)
+
+
+def test_invalidate_and_ttl(db):
+    cache = IdentityCache(ttl_seconds=0)
+    user = make_user(db)
+    cache.put(user.email, user)
+    assert cache.get(user.email, user.id) is None
+
+    cache = IdentityCache()
+    cache.put(user.email, user)
+    cache.invalidate_user(user.id)
+    assert cache.get(user.email, user.id) is None
+
+
+def test_cached_identity_is_served_without_a_query(db):
+    user = make_user(db)
+    assert resolve(db, {"sub": user.email, "uid": user.id}).id == user.id
+    assert identity_cache.stats()["misses"] == 1
+
+    assert resolve(db, {"sub": user.email, "uid": user.id}).id == user.id
+    assert identity_cache.stats()["hits"] == 1
+
+
+def test_token_for_a_reused_email_is_rejected(db):
+    old = make_user(db)
+    make_user(db, email="other@example.com", username="other")
+    token_claims = {"sub": old.email, "uid": old.id}
+    resolve(db, token_claims)
+
+    # The email now belongs to a different account
+    db.delete(old)
+    db.commit()
+    make_user(db, username="newowner")
+
+    with pytest.raises(HTTPException) as error:
+        resolve(db, token_claims)
+    assert error.value.status_code == 401
+
+
+def test_tokens_without_user_id_are_not_cached(db):
+    user = make_user(db)
+    assert resolve(db, {"sub": user.email}).id == user.id
+    assert identity_cache.stats()["entries"] == 0
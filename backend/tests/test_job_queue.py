@@ -0,0 +1,212 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+from job_queue import RepurposeJobQueue
+from models import RepurposeJob, User
+
+
+def make_user(db) -> User:
+    user = User(email="jobs@example.com", username="jobs", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def make_job(db, user, status="queued", started_ago=None, created_ago=None, attempts=0, lease_left=None) -> RepurposeJob:
+    now = datetime.now(timezone.utc)
+    job = RepurposeJob(
+        id=f"job-{db.query(RepurposeJob).count()}",
+        user_id=user.id,
+        status=status,
+        payload=json.dumps({"n": 1}),
+        attempts=attempts,
+        started_at=now - timedelta(seconds=started_ago) if started_ago is not None else None,
+        lease_expires_at=now + timedelta(seconds=lease_left) if lease_left is not None else None,
+    )
+    if created_ago is not None:
+        job.created_at = now - timedelta(seconds=created_ago)
+    db.add(job)
+    db.commit()
+    return job
+
+
+def test_submit_persists_a_queued_job(db):
+    user = make_user(db)
+    queue = RepurposeJobQueue()
+    job = asyncio.run(queue.submit(db, user.id, {"content": "hello"}))
+
+    stored = db.get(RepurposeJob, job.id)
+    assert stored.status == "queued"
+    assert json.loads(stored.payload) == {"content": "hello"}
+    assert queue.count_active(db, user.id) == 1
+
+
+def test_claim_is_exclusive(db):
+    user = make_user(db)
+    job = make_job(db, user)
+    queue = RepurposeJobQueue()
+
+    assert queue._claim(db, job.id) is True
+    assert queue._claim(db, job.id) is False
+
+    db.refresh(job)
+    assert job.status == "running"
+    assert job.attempts == 1
+    assert job.lease_expires_at is not None
+
+
+def test_recovery_requeues_only_expired_leases(db):
+    user = make_user(db)
+    expired = make_job(db, user, status="running", started_ago=30, attempts=1, lease_left=-1)
+    # Running for longer than the stale window, but its worker is still renewing the lease
+    long_running = make_job(db, user, status="running", started_ago=3600, attempts=1, lease_left=40)
+    exhausted = make_job(db, user, status="running", started_ago=700, attempts=3, lease_left=-1)
+    queue = RepurposeJobQueue(max_attempts=3, stale_after_seconds=600)
+
+    assert queue._recover_jobs() == [expired.id]
+
+    db.expire_all()
+    assert db.get(RepurposeJob, expired.id).status == "queued"
+    assert db.get(RepurposeJob, long_running.id).status == "running"
+    assert db.get(RepurposeJob, exhausted.id).status == "failed"
+
+
+def test_rows_without_a_lease_fall_back_to_the_stale_window(db):
+    user = make_user(db)
+    stale = make_job(db, user, status="running", started_ago=700, attempts=1)
+    make_job(db, user, status="running", started_ago=10, attempts=1)
+    queue = RepurposeJobQueue(stale_after_seconds=600)
+
+    assert queue._recover_jobs() == [stale.id]
+
+
+def test_outcome_of_a_taken_over_run_is_dropped(db):
+    user = make_user(db)
+    job = make_job(db, user)
+    queue = RepurposeJobQueue()
+    queue._claim(db, job.id)
+    db.refresh(job)
+    first_attempt = db.get(RepurposeJob, job.id).attempts
+
+    # Lease expired, job requeued and claimed again elsewhere
+    db.query(RepurposeJob).update({RepurposeJob.status: "queued"})
+    db.commit()
+    queue._claim(db, job.id)
+
+    assert queue._renew_lease(job.id, first_attempt) is False
+    stale_view = RepurposeJob(id=job.id, attempts=first_attempt)
+    assert queue._finish(db, stale_view, "completed", result={"late": True}) is False
+
+    db.expire_all()
+    stored = db.get(RepurposeJob, job.id)
+    assert stored.status == "running"
+    assert stored.result is None
+    assert queue._renew_lease(job.id, stored.attempts) is True
+
+
+def test_sweep_skips_fresh_queued_jobs(db):
+    user = make_user(db)
+    fresh = make_job(db, user, created_ago=5)
+    orphaned = make_job(db, user, created_ago=900)
+    stale = make_job(db, user, status="running", started_ago=700, created_ago=30, attempts=1)
+    queue = RepurposeJobQueue(stale_after_seconds=600)
+
+    assert set(queue._recover_jobs(orphaned_only=True)) == {orphaned.id, stale.id}
+    # Startup recovery takes every queued job
+    assert set(queue._recover_jobs()) == {fresh.id, orphaned.id, stale.id}
+
+
+def test_workers_run_and_finish_jobs(db):
+    user = make_user(db)
+
+    async def handler(job_db, user_id, payload, publish):
+        if payload.get("fail"):
+            raise RuntimeError("boom")
+        publish("platform", {"platform": "twitter"})
+        return {"echo": payload["content"]}
+
+    async def scenario():
+        queue = RepurposeJobQueue(worker_count=2)
+        queue.register_handler(handler)
+        await queue.start()
+        try:
+            ok = await queue.submit(db, user.id, {"content": "hi"})
+            bad = await queue.submit(db, user.id, {"content": "hi", "fail": True})
+            await asyncio.wait_for(queue._queue.join(), timeout=5)
+            return ok.id, bad.id
+        finally:
+            await queue.stop()
+
+    ok_id, bad_id = asyncio.run(scenario())
+    db.expire_all()
+    ok, bad = db.get(RepurposeJob, ok_id), db.get(RepurposeJob, bad_id)
+    assert ok.status == "completed" and json.loads(ok.result) == {"echo": "hi"}
+    assert bad.status == "failed" and "boom" in bad.error
+
+
+def test_sweeper_recovers_a_crashed_job_while_running(db):
+    user = make_user(db)
+    runs = []
+
+    async def handler(job_db, user_id, payload, publish):
+        runs.append(payload)
+        return {}
+
+    async def scenario():
+        queue = RepurposeJobQueue(worker_count=1, stale_after_seconds=600, sweep_interval_seconds=0.05)
+        queue.register_handler(handler)
+        await queue.start()
+        try:
+            # Left 'running' by a worker that died after startup recovery
+            job = make_job(db, user, status="running", started_ago=700, attempts=1, lease_left=-1)
+            for _ in range(100):
+                await asyncio.sleep(0.02)
+                db.expire_all()
+                if db.get(RepurposeJob, job.id).status == "completed":
+                    break
+            return job.id
+        finally:
+            await queue.stop()
+
+    job_id = asyncio.run(scenario())
+    db.expire_all()
+    job = db.get(RepurposeJob, job_id)
+    assert job.status == "completed"
+    assert job.attempts == 2
+    assert len(runs) == 1
+
+
+def test_heartbeat_keeps_a_long_job_from_being_taken_over(db):
+    user = make_user(db)
+    runs = []
+
+    async def handler(job_db, user_id, payload, publish):
+        runs.append(payload)
+        # Several lease lengths
+        await asyncio.sleep(1.0)
+        return {"ok": True}
+
+    async def scenario():
+        # Two queues stand in for two worker processes; the second one's sweeper
+        # would take the job over if the first stopped renewing its lease
+        owner = RepurposeJobQueue(worker_count=1, lease_seconds=0.3, sweep_interval_seconds=60)
+        other = RepurposeJobQueue(worker_count=1, lease_seconds=0.3, sweep_interval_seconds=0.05)
+        for queue in (owner, other):
+            queue.register_handler(handler)
+            await queue.start()
+        try:
+            job = await owner.submit(db, user.id, {"content": "long"})
+            await asyncio.wait_for(owner._queue.join(), timeout=5)
+            await asyncio.wait_for(other._queue.join(), timeout=5)
+            return job.id
+        finally:
+            await owner.stop()
+            await other.stop()
+
+    job_id = asyncio.run(scenario())
+    db.expire_all()
+    job = db.get(RepurposeJob, job_id)
+    assert job.status == "completed"
+    assert job.attempts == 1
+    assert len(runs) == 1
@@ -0,0 +1,47 @@
+import json
+import logging
+
+from logging_config import JsonFormatter, RequestContextFilter, request_id_var
+
+
+def _record(level=logging.INFO, sampled=False, **extra):
+    record = logging.LogRecord("snippetstream.test", level, __file__, 1, "hello %s", ("world",), None)
+    if sampled:
+        record.sampled = True
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_json_lines_carry_request_id_and_extra_fields():
+    token = request_id_var.set("req-123")
+    try:
+        record = _record(model="gpt")
+        assert RequestContextFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "hello world"
+    assert entry["level"] == "INFO"
+    assert entry["request_id"] == "req-123"
+    assert entry["model"] == "gpt"
+    assert "sampled" not in entry
+
+
+def test_sampling_drops_sampled_info_lines_but_never_warnings():
+    log_filter = RequestContextFilter(sample_rate=0.0)
+    assert not log_filter.filter(_record(sampled=True))
+    assert log_filter.filter(_record(level=logging.WARNING, sampled=True))
+    assert log_filter.filter(_record())
+    assert log_filter.sampled_out == 1
+
+
+def test_sampling_decision_is_stable_per_request():
+    log_filter = RequestContextFilter(sample_rate=0.5)
+    token = request_id_var.set("req-stable")
+    try:
+        decisions = {log_filter.filter(_record(sampled=True)) for _ in range(20)}
+    finally:
+        request_id_var.reset(token)
+    assert len(decisions) == 1
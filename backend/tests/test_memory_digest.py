@@ -0,0 +1,75 @@
+import memory_digest
+from memory_digest import get_memory_digest, refresh_memory_digest, refresh_memory_digest_after_save
+from models import ContentGeneration, User, UserMemory, UserMemoryDigest
+
+
+def make_user(db) -> User:
+    user = User(email="memory@example.com", username="memory", hashed_password="x", is_premium=True)
+    db.add(user)
+    db.flush()
+    db.add(UserMemory(user_id=user.id, memory_content="I build a habit tracker for indie hackers."))
+    db.commit()
+    return user
+
+
+def add_generation(db, user, text):
+    db.add(ContentGeneration(user_id=user.id, original_content=text, linkedin_post=f"Post about {text}"))
+    db.commit()
+
+
+def test_stored_digest_is_read_not_rebuilt(db):
+    user = make_user(db)
+    add_generation(db, user, "launch day")
+    refresh_memory_digest(db, user.id)
+    db.commit()
+
+    digest = get_memory_digest(db, user.id)
+    assert digest.startswith("I build a habit tracker")
+    assert "Input: launch day..." in digest
+    assert "Output Preview: Post about launch day..." in digest
+
+    db.query(UserMemoryDigest).update({UserMemoryDigest.digest: "stored"})
+    db.commit()
+    assert get_memory_digest(db, user.id) == "stored"
+
+
+def test_missing_digest_is_built_without_writing(db):
+    user = make_user(db)
+    add_generation(db, user, "launch day")
+
+    assert "launch day" in get_memory_digest(db, user.id)
+    assert db.get(UserMemoryDigest, user.id) is None
+
+
+def test_save_refreshes_digest_so_next_read_does_not_rebuild(db, snippetstream, monkeypatch):
+    user = make_user(db)
+    snippetstream.save_generation(db, user.id, "first paying customer", "text", {"linkedin": "We did it"}, None, 1.0)
+
+    def fail(*args):
+        raise AssertionError("digest rebuilt on read")
+
+    monkeypatch.setattr(memory_digest, "build_memory_digest", fail)
+    digest = get_memory_digest(db, user.id)
+    assert "Input: first paying customer..." in digest
+    assert "Output Preview: We did it..." in digest
+
+
+def test_free_users_saves_skip_the_digest(db):
+    user = make_user(db)
+    user.is_premium = False
+    db.commit()
+
+    add_generation(db, user, "side project")
+    refresh_memory_digest_after_save(db, user.id)
+    db.commit()
+    assert db.query(UserMemoryDigest).count() == 0
+
+
+def test_refresh_upserts(db):
+    user = make_user(db)
+    refresh_memory_digest(db, user.id)
+    db.query(UserMemory).update({UserMemory.memory_content: "Now writing a newsletter."})
+    refresh_memory_digest(db, user.id)
+    db.commit()
+    assert db.query(UserMemoryDigest).count() == 1
+    assert db.get(UserMemoryDigest, user.id).digest == "Now writing a newsletter."
@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+import metrics as metrics_module
+from metrics import MetricsRegistry, instrument_engine
+
+
+def test_counter_renders_labels_escaped_and_sorted():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    requests.inc("/b")
+    requests.inc('/a"quoted"', amount=2)
+    requests.inc("/b")
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a\\"quoted\\""} 2',
+        'requests_total{route="/b"} 2',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, "/x")
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{route="/x",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/x",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/x"} 3.65' in lines
+    assert 'latency_seconds_count{route="/x"} 4' in lines
+
+
+def test_failing_collector_does_not_break_the_scrape():
+    registry = MetricsRegistry()
+    registry.counter("up_total", "Up").inc()
+    registry.register_collector(lambda: 1 / 0)
+    registry.register_collector(lambda: ["extra_metric 1"])
+
+    output = registry.render()
+    assert "up_total 1" in output
+    assert "extra_metric 1" in output
+
+
+def _sample(lines, prefix):
+    values = [float(line.rsplit(" ", 1)[1]) for line in lines if line.startswith(prefix + " ")]
+    return values[0] if values else 0.0
+
+
+def test_engine_statements_are_timed_by_operation(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/metrics.db")
+    instrument_engine(engine)
+    selects = 'db_query_duration_seconds_count{operation="SELECT"}'
+    errors = 'db_query_errors_total{operation="SELECT"}'
+    selects_before = _sample(metrics_module.db_query_duration.render(), selects)
+    errors_before = _sample(metrics_module.db_query_errors.render(), errors)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with pytest.raises(Exception):
+            conn.execute(text("SELECT * FROM missing_table"))
+    engine.dispose()
+
+    assert _sample(metrics_module.db_query_duration.render(), selects) == selects_before + 1
+    assert _sample(metrics_module.db_query_errors.render(), errors) == errors_before + 1
+
+
+def test_cache_collector_reports_counters_and_ratio(monkeypatch):
+    monkeypatch.setattr(metrics_module, "_caches", [])
+    metrics_module.register_cache("urls", lambda: {"hits": 3, "misses": 1, "hit_ratio": 0.75})
+
+    lines = metrics_module._collect_caches()
+    assert 'cache_hits_total{cache="urls"} 3' in lines
+    assert 'cache_misses_total{cache="urls"} 1' in lines
+    assert 'cache_hit_ratio{cache="urls"} 0.75' in lines
+    assert "# TYPE cache_evictions_total counter" not in lines
+
+
+@pytest.fixture
+def guarded_client():
+    from fastapi import Depends, FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+
+    @app.get("/metrics", dependencies=[Depends(metrics_module.require_metrics_token)])
+    async def scrape():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_metrics_are_hidden_without_a_configured_token(guarded_client, monkeypatch):
+    monkeypatch.setattr(metrics_module, "METRICS_TOKEN", "")
+    assert guarded_client.get("/metrics").status_code == 404
+    assert guarded_client.get("/metrics", headers={"Authorization": "Bearer "}).status_code == 404
+
+
+def test_metrics_need_the_bearer_token(guarded_client, monkeypatch):
+    monkeypatch.setattr(metrics_module, "METRICS_TOKEN", "s3cret")
+    assert guarded_client.get("/metrics").status_code == 401
+    assert guarded_client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert guarded_client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).json() == {"ok": True}
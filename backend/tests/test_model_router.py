@@ -0,0 +1,113 @@
+import pytest
+
+import model_router as router_module
+from model_router import ModelRouter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    class Clock:
+        now = 1_000.0
+
+    clock = Clock()
+    monkeypatch.setattr(router_module.time, "time", lambda: clock.now)
+    return clock
+
+
+def test_unmeasured_models_keep_configured_order(clock):
+    router = ModelRouter(["a", "b", "c"])
+    assert router.candidates() == ["a", "b", "c"]
+
+
+def test_faster_model_moves_to_the_front(clock):
+    router = ModelRouter(["a", "b", "c"], prior_latency_seconds=5)
+    router.record_success("a", 4.0)
+    router.record_success("b", 1.0)
+    assert router.candidates() == ["b", "a", "c"]
+
+
+def test_ewma_tracks_latency_and_errors(clock):
+    router = ModelRouter(["a"], alpha=0.5)
+    router.record_success("a", 2.0)
+    router.record_success("a", 4.0)
+    stats = router._stats["a"]
+    assert stats.ewma_latency == pytest.approx(3.0)
+
+    router.record_failure("a", 1.0, "boom")
+    assert stats.ewma_error_rate == pytest.approx(0.5)
+    # Expected latency is inflated by the chance of having to retry
+    assert router.expected_latency(stats) == pytest.approx(6.0)
+
+
+def test_error_prone_model_drops_behind_a_slower_reliable_one(clock):
+    router = ModelRouter(["flaky", "steady"], alpha=0.5, failure_threshold=10)
+    router.record_success("flaky", 1.0)
+    router.record_success("steady", 1.5)
+    for _ in range(2):
+        router.record_failure("flaky", 0.5, "500")
+    assert router.candidates() == ["steady", "flaky"]
+
+
+def test_circuit_opens_after_consecutive_failures(clock):
+    router = ModelRouter(["a", "b"], failure_threshold=3, cooldown_seconds=30)
+    router.record_failure("a", 1.0, "err")
+    router.record_failure("a", 1.0, "err")
+    assert "a" in router.candidates()
+
+    router.record_failure("a", 1.0, "err")
+    assert router._stats["a"].state == "open"
+    assert router.candidates() == ["b"]
+
+
+def test_half_open_lets_one_probe_through_after_cooldown(clock):
+    router = ModelRouter(["a", "b"], failure_threshold=1, cooldown_seconds=30)
+    router.record_failure("a", 1.0, "err")
+
+    clock.now += 30
+    assert "a" in router.candidates()
+    assert router._stats["a"].state == "half_open"
+    # The probe is claimed; other requests skip the model until it reports back
+    assert router.candidates() == ["b"]
+
+    router.record_success("a", 0.5)
+    assert router._stats["a"].state == "closed"
+    assert router.candidates() == ["a", "b"]
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    router = ModelRouter(["a", "b"], failure_threshold=3, cooldown_seconds=30)
+    for _ in range(3):
+        router.record_failure("a", 1.0, "err")
+    clock.now += 30
+    router.candidates()
+
+    router.record_failure("a", 1.0, "still down")
+    assert router._stats["a"].state == "open"
+    assert router.candidates() == ["b"]
+
+
+def test_all_open_falls_back_to_the_full_chain(clock):
+    router = ModelRouter(["a", "b"], failure_threshold=1, cooldown_seconds=30)
+    router.record_failure("b", 1.0, "err")
+    clock.now += 1
+    router.record_failure("a", 1.0, "err")
+    assert router.candidates() == ["b", "a"]
+
+
+def test_stats_do_not_claim_probes(clock):
+    router = ModelRouter(["a", "b"], failure_threshold=1, cooldown_seconds=30)
+    router.record_failure("a", 1.0, "err")
+    clock.now += 30
+    router.stats()
+    assert router._stats["a"].state == "open"
+
+
+def test_hedge_delay_uses_the_latency_percentile(clock):
+    router = ModelRouter(["a"], prior_latency_seconds=5)
+    assert router.hedge_delay("a", 0.9, min_delay=0.5) == 5
+
+    for latency in (1, 2, 3, 4, 5, 6, 7, 8, 9, 10):
+        router.record_success("a", latency)
+    assert router.latency_percentile("a", 0.9) == 9
+    assert router.hedge_delay("a", 0.9, min_delay=0.5) == 9
+    assert router.hedge_delay("a", 0.1, min_delay=2.0) == 2.0
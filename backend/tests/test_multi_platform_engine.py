@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+
+PLATFORMS = ["twitter", "linkedin", "instagram"]
+
+
+def _reply(**overrides):
+    data = {
+        "twitter": [f"{i}/10 tweet" for i in range(1, 11)],
+        "linkedin": "A post about shipping.",
+        "instagram": [f"Slide {i}" for i in range(1, 9)],
+    }
+    data.update(overrides)
+    return json.dumps(data)
+
+
+def test_parses_fenced_json_with_surrounding_text(snippetstream):
+    reply = "Here you go:\n```json\n" + _reply() + "\n```\nEnjoy!"
+    results = snippetstream.parse_multi_platform_result(reply, PLATFORMS)
+    assert len(results["twitter"]) == 10
+    assert results["linkedin"] == "A post about shipping."
+    assert len(results["instagram"]) == 8
+
+
+def test_short_lists_are_padded_and_long_ones_cut(snippetstream):
+    reply = _reply(twitter=["1/10 only one", "  "], instagram=[f"Slide {i}" for i in range(12)])
+    results = snippetstream.parse_multi_platform_result(reply, PLATFORMS)
+    assert results["twitter"][0] == "1/10 only one"
+    assert len(results["twitter"]) == 10
+    assert len(results["instagram"]) == 8
+
+
+def test_only_requested_platforms_are_checked(snippetstream):
+    reply = json.dumps({"linkedin": "Just LinkedIn"})
+    assert snippetstream.parse_multi_platform_result(reply, ["linkedin"]) == {"linkedin": "Just LinkedIn"}
+
+
+@pytest.mark.parametrize("reply", [
+    None,
+    "",
+    "no json here",
+    '{"twitter": ["1/10 cut off mid',
+    "[1, 2, 3]",
+    '{"twitter": ["a"], "linkedin": "b", "instagram": ["c"]',
+])
+def test_malformed_replies_raise_value_error(snippetstream, reply):
+    with pytest.raises(ValueError):
+        snippetstream.parse_multi_platform_result(reply, PLATFORMS)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"linkedin": None},
+    {"linkedin": "   "},
+    {"twitter": []},
+    {"twitter": "not a list"},
+    {"instagram": None},
+])
+def test_missing_or_wrong_shaped_platforms_raise(snippetstream, overrides):
+    with pytest.raises(ValueError):
+        snippetstream.parse_multi_platform_result(_reply(**overrides), PLATFORMS)
+
+
+@pytest.fixture
+def generators(snippetstream, monkeypatch):
+    calls = []
+
+    def fake(name, result):
+        async def generate(content, context=None, memory=""):
+            calls.append(name)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return generate
+
+    monkeypatch.setitem(snippetstream.PLATFORM_GENERATORS, "twitter", fake("twitter", [f"{i}/10 fan-out" for i in range(1, 11)]))
+    monkeypatch.setitem(snippetstream.PLATFORM_GENERATORS, "linkedin", fake("linkedin", "Fan-out post"))
+    monkeypatch.setitem(snippetstream.PLATFORM_GENERATORS, "instagram", fake("instagram", RuntimeError("down")))
+    return calls
+
+
+def _generate(snippetstream, monkeypatch, reply, platforms=PLATFORMS):
+    async def completion(messages, max_tokens=2000, **kwargs):
+        return reply
+
+    monkeypatch.setattr(snippetstream, "safe_completion_async", completion)
+    return asyncio.run(snippetstream.generate_platforms(platforms, "content", None, "", "single"))
+
+
+def test_single_engine_uses_one_completion(snippetstream, monkeypatch, generators):
+    results = _generate(snippetstream, monkeypatch, _reply())
+    assert generators == []
+    assert results["linkedin"] == snippetstream.clean_linkedin_post("A post about shipping.")
+
+
+def test_unusable_reply_falls_back_to_per_platform_calls(snippetstream, monkeypatch, generators):
+    results = _generate(snippetstream, monkeypatch, '{"twitter": ["1/10 partial')
+    assert sorted(generators) == sorted(PLATFORMS)
+    assert results["linkedin"] == snippetstream.clean_linkedin_post("Fan-out post")
+    # A failing platform in the fan-out gets the error placeholder, not an exception
+    assert results["instagram"] == snippetstream.clean_instagram_slides(["❌ Instagram error"])
+
+
+def test_missing_platform_falls_back_too(snippetstream, monkeypatch, generators):
+    _generate(snippetstream, monkeypatch, json.dumps({"linkedin": "Only one"}), platforms=["twitter", "linkedin"])
+    assert sorted(generators) == ["linkedin", "twitter"]
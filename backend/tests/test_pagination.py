@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from models import PaymentHistory, User
+from pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, paginate
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 3, 1, 12, 30, 15, 123456)
+    cursor = encode_cursor(created_at, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor(datetime(2026, 1, 1), 1)[:-3], "W10"])
+def test_malformed_cursor_is_a_client_error(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_walking_cursors_visits_every_row_once_in_order(db):
+    user = User(email="pages@example.com", username="pages", hashed_password="x")
+    db.add(user)
+    db.flush()
+    base = datetime(2026, 1, 1)
+    # Several rows share a timestamp, so the id tie-break matters
+    for i in range(23):
+        db.add(PaymentHistory(
+            user_id=user.id, payment_id=f"p{i}", amount=1.0, status="completed",
+            plan_type="pro", billing_cycle="monthly",
+            created_at=base + timedelta(minutes=i // 3),
+        ))
+    db.commit()
+
+    query = db.query(PaymentHistory).filter(PaymentHistory.user_id == user.id)
+    expected = [p.id for p in query.order_by(PaymentHistory.created_at.desc(), PaymentHistory.id.desc())]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page, cursor = paginate(query, PaymentHistory, 5, cursor=cursor)
+        seen.extend(p.id for p in page)
+        pages += 1
+        if cursor is None:
+            break
+
+    assert seen == expected
+    assert pages == 5
+
+
+def test_offset_fallback_matches_cursor_pages(db):
+    user = User(email="offset@example.com", username="offset", hashed_password="x")
+    db.add(user)
+    db.flush()
+    for i in range(7):
+        db.add(PaymentHistory(
+            user_id=user.id, payment_id=f"o{i}", amount=1.0, status="completed",
+            plan_type="pro", billing_cycle="monthly",
+            created_at=datetime(2026, 1, 1) + timedelta(hours=i),
+        ))
+    db.commit()
+
+    query = db.query(PaymentHistory)
+    first, cursor = paginate(query, PaymentHistory, 3)
+    by_cursor, _ = paginate(query, PaymentHistory, 3, cursor=cursor)
+    by_offset, _ = paginate(query, PaymentHistory, 3, offset=3)
+    assert [p.id for p in by_cursor] == [p.id for p in by_offset]
+    assert [p.id for p in first] == [7, 6, 5]
+
+
+def test_oversized_limit_is_clamped_not_rejected(db):
+    user = User(email="clamp@example.com", username="clamp", hashed_password="x")
+    db.add(user)
+    db.flush()
+    for i in range(MAX_PAGE_SIZE + 5):
+        db.add(PaymentHistory(
+            user_id=user.id, payment_id=f"c{i}", amount=1.0, status="completed",
+            plan_type="pro", billing_cycle="monthly",
+            created_at=datetime(2026, 1, 1) + timedelta(minutes=i),
+        ))
+    db.commit()
+
+    page, cursor = paginate(db.query(PaymentHistory), PaymentHistory, 1000)
+    assert len(page) == MAX_PAGE_SIZE
+    rest, cursor = paginate(db.query(PaymentHistory), PaymentHistory, 1000, cursor=cursor)
+    assert len(rest) == 5
+    assert cursor is None
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import Subscription, User
+from subscription_manager import SubscriptionManager
+
+NOW = datetime(2026, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def manager():
+    manager = SubscriptionManager()
+    manager.grace_period_days = 3
+    return manager
+
+
+def test_premium_until_adds_grace_period_and_accepts_naive_times(manager):
+    assert manager.compute_premium_until(datetime(2026, 6, 1)) == datetime(2026, 6, 4, tzinfo=timezone.utc)
+    assert manager.compute_premium_until(None) is None
+
+
+@pytest.mark.parametrize("is_premium, premium_until, expected", [
+    (True, NOW + timedelta(seconds=1), True),
+    (True, NOW, True),
+    (True, NOW - timedelta(seconds=1), False),
+    (True, None, True),
+    (False, NOW + timedelta(days=30), False),
+])
+def test_premium_access_is_a_timestamp_comparison(manager, is_premium, premium_until, expected):
+    user = User(is_premium=is_premium, premium_until=premium_until)
+    assert manager.has_premium_access(user, NOW) is expected
+
+
+def test_sync_backfills_active_users_and_downgrades_orphans(db, manager):
+    period_end = datetime.now(timezone.utc) + timedelta(days=10)
+    active = User(email="active@example.com", username="active", hashed_password="x", is_premium=True)
+    orphan = User(email="orphan@example.com", username="orphan", hashed_password="x", is_premium=True,
+                  premium_until=period_end)
+    db.add_all([active, orphan])
+    db.flush()
+    db.add(Subscription(user_id=active.id, plan_type="pro", status="active", current_period_end=period_end))
+    db.add(Subscription(user_id=orphan.id, plan_type="pro", status="cancelled", current_period_end=period_end))
+    db.commit()
+
+    manager.sync_premium_until(db)
+    db.expire_all()
+
+    assert manager.has_premium_access(active)
+    assert active.premium_until.replace(tzinfo=timezone.utc) == period_end + timedelta(days=3)
+    assert not orphan.is_premium
+    assert orphan.premium_until is None
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import quota
+from models import UsageCounter, UsageStats, User
+from quota import (
+    BUCKET_SECONDS,
+    backfill_usage_counters,
+    get_usage_in_window,
+    prune_usage_counters,
+    record_usage,
+)
+
+# Ten minutes into an hourly bucket
+START = 1_000 * BUCKET_SECONDS + 600
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    class Clock:
+        now = START
+
+        def advance(self, seconds):
+            self.now += seconds
+
+    clock = Clock()
+    monkeypatch.setattr(quota.time, "time", lambda: clock.now)
+    return clock
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="quota@example.com", username="quota", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_usage_in_same_hour_shares_one_bucket(db, user, clock):
+    record_usage(db, user.id)
+    clock.advance(60)
+    record_usage(db, user.id, amount=2)
+    db.commit()
+
+    assert db.query(UsageCounter).count() == 1
+    assert get_usage_in_window(db, user.id) == 3
+
+
+def test_usage_never_leaves_the_window_early(db, user, clock):
+    # Recorded at the very end of its hour, the worst case for early expiry
+    clock.advance(BUCKET_SECONDS - 600 - 1)
+    record_usage(db, user.id, amount=5)
+    db.commit()
+
+    # Exactly 24 hours later it must still count
+    clock.advance(24 * BUCKET_SECONDS)
+    assert get_usage_in_window(db, user.id) == 5
+
+    # ...and it is gone once the following hour starts
+    clock.advance(1)
+    assert get_usage_in_window(db, user.id) == 0
+
+
+def test_usage_rolls_out_one_full_hour_after_its_bucket_turns_24(db, user, clock):
+    record_usage(db, user.id, amount=5)
+    db.commit()
+    clock.advance(BUCKET_SECONDS)
+    record_usage(db, user.id)
+    db.commit()
+
+    # Now 24 hours into the first bucket's window, which is still counted
+    clock.advance(23 * BUCKET_SECONDS)
+    assert get_usage_in_window(db, user.id) == 6
+
+    clock.advance(BUCKET_SECONDS)
+    assert get_usage_in_window(db, user.id) == 1
+
+    clock.advance(BUCKET_SECONDS)
+    assert get_usage_in_window(db, user.id) == 0
+
+
+def test_window_is_per_action_and_per_user(db, user, clock):
+    other = User(email="other@example.com", username="other", hashed_password="x")
+    db.add(other)
+    db.commit()
+
+    record_usage(db, user.id, action="generate")
+    record_usage(db, user.id, action="export", amount=4)
+    record_usage(db, other.id, action="generate", amount=7)
+    db.commit()
+
+    assert get_usage_in_window(db, user.id, action="generate") == 1
+    assert get_usage_in_window(db, user.id, action="export") == 4
+    assert get_usage_in_window(db, other.id, action="generate") == 7
+
+
+def test_prune_keeps_buckets_inside_the_retention_window(db, user, clock):
+    record_usage(db, user.id)
+    db.commit()
+    clock.advance(30 * BUCKET_SECONDS)
+    record_usage(db, user.id)
+    db.commit()
+
+    clock.advance(20 * BUCKET_SECONDS)
+    prune_usage_counters(db, hours=48)
+    assert db.query(UsageCounter).count() == 1
+
+
+def test_backfill_seeds_buckets_from_recent_usage_once(db, user):
+    now = datetime.now(timezone.utc)
+    for created_at in (now, now, now - timedelta(hours=3), now - timedelta(hours=30)):
+        db.add(UsageStats(user_id=user.id, action="generate", created_at=created_at))
+    db.add(UsageStats(user_id=user.id, action="copy", created_at=now))
+    db.commit()
+
+    assert backfill_usage_counters(db) == 2
+    assert get_usage_in_window(db, user.id) == 3
+
+    # Counters already exist, so a second startup leaves them alone
+    assert backfill_usage_counters(db) == 0
+    assert get_usage_in_window(db, user.id) == 3
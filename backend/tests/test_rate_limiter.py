@@ -0,0 +1,68 @@
+import pytest
+
+import rate_limiter as rl
+from database import engine
+from rate_limiter import DatabaseRateLimitBackend, MemoryRateLimitBackend, RateLimiter
+
+# 5 requests per 10s: one every 2s, with room for the full 5 as a burst
+EMISSION = 2.0
+TOLERANCE = 8.0
+NOW = 1_000_000.0
+
+
+@pytest.fixture(params=["memory", "database"])
+def backend(request, db):
+    if request.param == "memory":
+        return MemoryRateLimitBackend()
+    return DatabaseRateLimitBackend(engine)
+
+
+def test_full_burst_is_allowed_then_denied_with_retry_after(backend):
+    for _ in range(5):
+        assert backend.hit("user:1", EMISSION, TOLERANCE, NOW) == (True, 0.0)
+
+    allowed, retry_after = backend.hit("user:1", EMISSION, TOLERANCE, NOW)
+    assert not allowed
+    assert retry_after == pytest.approx(EMISSION)
+
+
+def test_denied_hits_do_not_consume_capacity(backend):
+    for _ in range(5):
+        backend.hit("user:1", EMISSION, TOLERANCE, NOW)
+    for _ in range(3):
+        assert not backend.hit("user:1", EMISSION, TOLERANCE, NOW + 1)[0]
+
+    # One emission interval after the burst exactly one slot has freed up
+    assert backend.hit("user:1", EMISSION, TOLERANCE, NOW + EMISSION)[0]
+    assert not backend.hit("user:1", EMISSION, TOLERANCE, NOW + EMISSION)[0]
+
+
+def test_keys_are_limited_independently(backend):
+    for _ in range(5):
+        backend.hit("user:1", EMISSION, TOLERANCE, NOW)
+    assert not backend.hit("user:1", EMISSION, TOLERANCE, NOW)[0]
+    assert backend.hit("user:2", EMISSION, TOLERANCE, NOW)[0]
+
+
+def test_idle_key_recovers_full_burst(backend):
+    for _ in range(5):
+        backend.hit("user:1", EMISSION, TOLERANCE, NOW)
+    later = NOW + 10
+    assert all(backend.hit("user:1", EMISSION, TOLERANCE, later)[0] for _ in range(5))
+    assert not backend.hit("user:1", EMISSION, TOLERANCE, later)[0]
+
+
+def test_sweep_drops_only_expired_keys():
+    backend = MemoryRateLimitBackend(sweep_interval_seconds=0)
+    backend.hit("old", EMISSION, TOLERANCE, NOW)
+    backend.hit("new", EMISSION, TOLERANCE, NOW + 100)
+    assert backend.size() == 1
+
+
+def test_rate_limiter_derives_interval_from_limit(monkeypatch):
+    monkeypatch.setattr(rl.time, "time", lambda: NOW)
+    limiter = RateLimiter(MemoryRateLimitBackend())
+    results = [limiter.hit("ip:1", limit=3, period_seconds=30)[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+    assert limiter.hit("ip:1", limit=3, period_seconds=30)[1] == pytest.approx(10.0)
+    assert not limiter.is_shared
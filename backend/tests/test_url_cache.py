@@ -0,0 +1,126 @@
+import pytest
+
+import url_cache
+from url_cache import URLTextCache, normalize_url, ttl_from_headers
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    class Clock:
+        now = 1_000_000.0
+
+    clock = Clock()
+    monkeypatch.setattr(url_cache.time, "time", lambda: clock.now)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return URLTextCache(directory=str(tmp_path), max_bytes=1_000_000, ttl_seconds=3600)
+
+
+def test_normalize_url_drops_noise():
+    assert normalize_url("HTTPS://Example.com:443/post?b=2&utm_source=x&a=1&fbclid=y#top") == \
+        "https://example.com/post?a=1&b=2"
+    assert normalize_url("http://example.com:8080") == "http://example.com:8080/"
+
+
+def test_normalize_url_keeps_content_params():
+    assert normalize_url("https://example.com/repo?ref=main&gclid=z") == \
+        "https://example.com/repo?ref=main"
+    assert normalize_url("https://example.com/repo?ref=main") != \
+        normalize_url("https://example.com/repo?ref=dev")
+
+
+def test_ttl_from_headers():
+    assert ttl_from_headers({"cache-control": "no-store"}, 3600) is None
+    assert ttl_from_headers({"cache-control": "public, max-age=60"}, 3600) == 60
+    assert ttl_from_headers({"cache-control": "max-age=86400"}, 3600) == 3600
+    assert ttl_from_headers({}, 3600) == 3600
+    assert ttl_from_headers({"cache-control": "no-cache"}, 3600) == 0
+    assert ttl_from_headers({"cache-control": "public, no-cache, max-age=600"}, 3600) == 0
+
+
+def test_entry_is_shared_across_equivalent_urls(cache, clock):
+    cache.set("https://example.com/a?utm_medium=mail", "page text", 5000, True, {})
+    entry = cache.get("https://EXAMPLE.com/a", 5000)
+    assert entry["text"] == "page text"
+    assert cache.is_fresh(entry)
+
+
+def test_truncated_entry_only_serves_smaller_budgets(cache, clock):
+    cache.set("https://example.com/long", "x" * 100, 100, False, {})
+    assert cache.get("https://example.com/long", 100) is not None
+    assert cache.get("https://example.com/long", 50) is not None
+    assert cache.get("https://example.com/long", 200) is None
+
+
+def test_stale_entry_with_validators_is_revalidated_after_304(cache, clock):
+    cache.set("https://example.com/a", "text", 5000, True, {"etag": '"v1"', "last-modified": "Mon, 01 Jun 2026 00:00:00 GMT"})
+    clock.now += 3601
+
+    entry = cache.get("https://example.com/a", 5000)
+    assert entry is not None and not cache.is_fresh(entry)
+    assert cache.validators(entry) == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 01 Jun 2026 00:00:00 GMT",
+    }
+
+    cache.refresh(entry, {"cache-control": "max-age=120"})
+    refreshed = cache.get("https://example.com/a", 5000)
+    assert cache.is_fresh(refreshed)
+    assert refreshed["expires_at"] == clock.now + 120
+
+
+def test_stale_entry_without_validators_is_dropped(cache, clock):
+    cache.set("https://example.com/a", "text", 5000, True, {})
+    clock.now += 3601
+    assert cache.get("https://example.com/a", 5000) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_no_store_responses_are_not_cached(cache, clock):
+    cache.set("https://example.com/a", "text", 5000, True, {"cache-control": "no-store"})
+    assert cache.get("https://example.com/a", 5000) is None
+
+
+def test_no_cache_responses_are_stored_stale_and_revalidated(cache, clock):
+    cache.set("https://example.com/a", "text", 5000, True, {"cache-control": "no-cache", "etag": '"v1"'})
+
+    entry = cache.get("https://example.com/a", 5000)
+    assert entry is not None and not cache.is_fresh(entry)
+    assert cache.validators(entry) == {"If-None-Match": '"v1"'}
+
+    # A 304 that still says no-cache keeps the entry stale
+    cache.refresh(entry, {"cache-control": "no-cache"})
+    assert not cache.is_fresh(cache.get("https://example.com/a", 5000))
+
+
+def test_no_cache_responses_without_validators_are_not_stored(cache, clock):
+    cache.set("https://example.com/a", "text", 5000, True, {"cache-control": "no-cache"})
+    assert cache.get("https://example.com/a", 5000) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_size_bound_evicts_least_recently_used(tmp_path, clock):
+    probe = URLTextCache(directory=str(tmp_path / "probe"), max_bytes=1_000_000, ttl_seconds=3600)
+    probe.set("https://example.com/a", "a" * 200, 5000, True, {})
+    max_bytes = probe.stats()["bytes"] * 5 // 2
+
+    # Room for two entries, not three
+    cache = URLTextCache(directory=str(tmp_path / "cache"), max_bytes=max_bytes, ttl_seconds=3600)
+    for name in ("a", "b"):
+        cache.set(f"https://example.com/{name}", name * 200, 5000, True, {})
+    cache.get("https://example.com/a", 5000)
+    cache.set("https://example.com/c", "c" * 200, 5000, True, {})
+
+    assert cache.evictions == 1
+    assert cache.get("https://example.com/b", 5000) is None
+    assert cache.get("https://example.com/a", 5000) is not None
+    assert cache.stats()["bytes"] <= max_bytes
+
+
+def test_index_is_rebuilt_from_disk(tmp_path, clock):
+    URLTextCache(str(tmp_path), 1_000_000, 3600).set("https://example.com/a", "text", 5000, True, {})
+    reopened = URLTextCache(str(tmp_path), 1_000_000, 3600)
+    assert reopened.get("https://example.com/a", 5000)["text"] == "text"
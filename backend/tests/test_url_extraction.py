@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from html_extraction import ArticleTextExtractor
+from url_cache import URLTextCache
+from url_ingestion import URLIngestionService
+
+PAGE = """<html><head><title>T</title><script>var x = "tracking";</script></head>
+<body><nav>Home | About</nav>
+<article><h1>Shipping day</h1><p>We launched the beta &amp; got 40 signups.</p></article>
+<footer>Copyright</footer></body></html>"""
+
+
+def _extract(html, max_chars=1000, chunk_size=None):
+    extractor = ArticleTextExtractor(max_chars)
+    step = chunk_size or len(html)
+    for i in range(0, len(html), step):
+        if extractor.feed_chunk(html[i:i + step]):
+            break
+    return extractor
+
+
+def test_article_region_wins_and_boilerplate_is_dropped():
+    assert _extract(PAGE).text() == "Shipping day We launched the beta & got 40 signups."
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64])
+def test_chunk_boundaries_do_not_change_the_text(chunk_size):
+    assert _extract(PAGE, chunk_size=chunk_size).text() == _extract(PAGE).text()
+
+
+def test_pages_without_a_main_region_keep_all_visible_text():
+    html = "<body><div><p>First</p><p>Second</p></div><script>no</script></body>"
+    assert _extract(html).text() == "First Second"
+
+
+def test_content_div_counts_as_main_region():
+    html = '<body><div class="sidebar">Ads</div><div class="post content"><p>Real text</p></div></body>'
+    assert _extract(html).text() == "Real text"
+
+
+def test_reading_stops_once_the_budget_is_met():
+    html = "<article>" + "<p>" + "word " * 50 + "</p>" * 1 + "</article>" + "<p>tail</p>" * 1000
+    extractor = _extract(html, max_chars=100, chunk_size=50)
+    assert extractor.done
+    assert len(extractor.text()) == 100
+
+
+@pytest.fixture
+def fetcher(snippetstream, monkeypatch, tmp_path):
+    """fetch_content_from_url wired to a scripted HTTP handler and a throwaway cache"""
+    requests = []
+    responses = []
+
+    def handler(request):
+        requests.append(request)
+        return responses.pop(0)
+
+    service = URLIngestionService()
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    cache = URLTextCache(str(tmp_path), 1_000_000, 3600)
+    monkeypatch.setattr(snippetstream, "url_ingestion", service)
+    monkeypatch.setattr(snippetstream, "url_text_cache", cache)
+
+    def fetch(url="https://example.com/post", max_chars=1000):
+        return asyncio.run(snippetstream.fetch_content_from_url(url, max_chars))
+
+    return SimpleNamespace(fetch=fetch, requests=requests, responses=responses, cache=cache)
+
+
+def test_fetch_extracts_and_caches(fetcher):
+    fetcher.responses.append(httpx.Response(200, html=PAGE, headers={"etag": '"v1"'}))
+    assert fetcher.fetch() == "Shipping day We launched the beta & got 40 signups."
+
+    # Fresh cache entry: no second request
+    assert fetcher.fetch() == "Shipping day We launched the beta & got 40 signups."
+    assert len(fetcher.requests) == 1
+    assert fetcher.cache.hits == 1 and fetcher.cache.misses == 1
+
+
+def test_stale_entry_is_revalidated_with_a_conditional_get(fetcher):
+    fetcher.responses.append(httpx.Response(200, html=PAGE, headers={"etag": '"v1"', "cache-control": "max-age=0"}))
+    fetcher.fetch()
+
+    fetcher.responses.append(httpx.Response(304))
+    assert fetcher.fetch().startswith("Shipping day")
+    assert fetcher.requests[-1].headers["if-none-match"] == '"v1"'
+    assert fetcher.cache.revalidated == 1
+
+
+def test_fetch_errors_become_a_400(fetcher):
+    fetcher.responses.append(httpx.Response(404))
+    with pytest.raises(HTTPException) as error:
+        fetcher.fetch()
+    assert error.value.status_code == 400
@@ -0,0 +1,85 @@
+import asyncio
+
+import httpx
+import pytest
+
+from url_ingestion import URLIngestionService
+
+
+def _service(handler, **kwargs):
+    service = URLIngestionService(**kwargs)
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return service
+
+
+def _fetch(service, *args, **kwargs):
+    async def scenario():
+        try:
+            return await service.fetch(*args, **kwargs)
+        finally:
+            await service.aclose()
+    return asyncio.run(scenario())
+
+
+def test_body_is_decoded_with_response_charset():
+    def handler(request):
+        return httpx.Response(200, content="café".encode("latin-1"), headers={"content-type": "text/html; charset=latin-1"})
+
+    page = _fetch(_service(handler), "https://example.com/")
+    assert page.text == "café"
+    assert not page.truncated
+
+
+def test_body_is_capped_at_max_bytes():
+    def handler(request):
+        return httpx.Response(200, content=b"a" * 5000)
+
+    page = _fetch(_service(handler, max_bytes=1000), "https://example.com/")
+    assert page.truncated
+    assert len(page.text) == 1000
+
+
+def test_consumer_receives_chunks_and_can_stop_early():
+    def handler(request):
+        return httpx.Response(200, stream=httpx.ByteStream(b"hello world"))
+
+    seen = []
+    page = _fetch(_service(handler), "https://example.com/", consumer=lambda text: seen.append(text) or True)
+    assert "".join(seen).startswith("hello")
+    assert page.text == ""
+
+
+def test_not_modified_is_returned_and_errors_raise():
+    def handler(request):
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(404)
+
+    page = _fetch(_service(handler), "https://example.com/", headers={"If-None-Match": '"v1"'})
+    assert page.status_code == 304
+
+    with pytest.raises(httpx.HTTPStatusError):
+        _fetch(_service(handler), "https://example.com/missing")
+
+
+def test_per_host_concurrency_is_bounded_and_released():
+    in_flight = {"now": 0, "peak": 0}
+
+    async def handler(request):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        return httpx.Response(200, content=b"ok")
+
+    service = _service(handler, per_host_limit=2)
+
+    async def scenario():
+        try:
+            await asyncio.gather(*(service.fetch(f"https://example.com/{i}") for i in range(6)))
+        finally:
+            await service.aclose()
+
+    asyncio.run(scenario())
+    assert in_flight["peak"] == 2
+    assert service._host_semaphores == {}
@@ -0,0 +1,262 @@
+"""
+URL Text Cache
+Size-bounded on-disk cache of extracted page text keyed by normalized URL,
+with per-entry TTLs and ETag/Last-Modified validators for cheap
+conditional revalidation of stale entries
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Click and campaign identifiers that only track the visit and never change
+# the page. Generic names like ``ref`` are left alone: sites use them for
+# content (``?ref=main`` on a code host selects a branch).
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid"}
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form used as the cache key.
+
+    Lowercases scheme and host, drops default ports, fragments and
+    tracking parameters (utm_*, fbclid, gclid, ...) and sorts the query
+    string.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def ttl_from_headers(headers, default_ttl: float) -> Optional[float]:
+    """Entry TTL from Cache-Control, capped at ``default_ttl``; None means do not cache.
+
+    ``no-cache`` allows storing but not reusing without revalidation, so it
+    gives a TTL of 0: the entry is stale from the start and every use goes
+    through a conditional request.
+    """
+    cache_control = (headers.get("cache-control") or "").lower()
+    if "no-store" in cache_control:
+        return None
+    if re.search(r"(^|[\s,])no-cache($|[\s,=])", cache_control):
+        return 0.0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    if match:
+        return min(float(match.group(1)), default_ttl)
+    return default_ttl
+
+
+class URLTextCache:
+    """Extracted text per normalized URL, one JSON file per entry.
+
+    An entry records the text budget it was extracted with and whether the
+    whole page fit in it, so it can serve any request whose budget is no
+    larger (or any budget at all when complete). Entries past their TTL
+    are kept while they carry validators, since a 304 makes them fresh
+    again. The size bound is enforced per process, evicting least
+    recently used files first.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, ttl_seconds: float, enabled: bool = True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._index: Optional["OrderedDict[str, int]"] = None  # key -> file size, LRU order
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self):
+        """Build the LRU index from the files already on disk, oldest first"""
+        if self._index is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, name[:-len(".json")], stat.st_size))
+
+        self._index = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._total_bytes = sum(self._index.values())
+
+    def get(self, url: str, max_chars: int) -> Optional[Dict]:
+        """Cached entry usable for a ``max_chars`` budget, fresh or stale, or None"""
+        if not self.enabled:
+            return None
+
+        key = hashlib.sha256(normalize_url(url).encode()).hexdigest()
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._remove(key)
+            return None
+
+        if not entry["complete"] and entry["max_chars"] < max_chars:
+            return None
+
+        if entry["expires_at"] <= time.time() and not (entry.get("etag") or entry.get("last_modified")):
+            # Stale and nothing to revalidate with
+            self._remove(key)
+            return None
+
+        entry["key"] = key
+        return entry
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return entry["expires_at"] > time.time()
+
+    def validators(self, entry: Dict) -> Dict[str, str]:
+        """Conditional request headers for revalidating a stale entry"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(self, outcome: str):
+        """Count a lookup outcome: 'hit', 'revalidated' or 'miss'"""
+        if outcome == "hit":
+            self.hits += 1
+        elif outcome == "revalidated":
+            self.revalidated += 1
+        else:
+            self.misses += 1
+
+    def refresh(self, entry: Dict, headers):
+        """Extend a stale entry after a 304 Not Modified"""
+        ttl = ttl_from_headers(headers, self.ttl_seconds)
+        if ttl is None:
+            self._remove(entry["key"])
+            return
+        entry["expires_at"] = time.time() + ttl
+        self._write(entry["key"], {k: v for k, v in entry.items() if k != "key"})
+
+    def set(self, url: str, text: str, max_chars: int, complete: bool, headers):
+        """Store freshly extracted text along with the response's validators"""
+        if not self.enabled:
+            return
+        ttl = ttl_from_headers(headers, self.ttl_seconds)
+        if ttl is None:
+            return
+        if ttl <= 0 and not (headers.get("etag") or headers.get("last-modified")):
+            # Stale on arrival with nothing to revalidate with
+            return
+
+        normalized = normalize_url(url)
+        key = hashlib.sha256(normalized.encode()).hexdigest()
+        self._write(key, {
+            "url": normalized,
+            "text": text,
+            "max_chars": max_chars,
+            "complete": complete,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "fetched_at": time.time(),
+            "expires_at": time.time() + ttl,
+        })
+
+    def _write(self, key: str, entry: Dict):
+        data = json.dumps(entry).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            self._load_index()
+            # Write then rename so concurrent readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+
+            self._total_bytes += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+
+            while self._total_bytes > self.max_bytes and self._index:
+                evicted_key, size = self._index.popitem(last=False)
+                self._total_bytes -= size
+                self.evictions += 1
+                try:
+                    os.remove(self._path(evicted_key))
+                except FileNotFoundError:
+                    pass
+
+    def _remove(self, key: str):
+        with self._lock:
+            if self._index is not None and key in self._index:
+                self._total_bytes -= self._index.pop(key)
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._load_index()
+            for key in list(self._index):
+                try:
+                    os.remove(self._path(key))
+                except FileNotFoundError:
+                    pass
+            self._index.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._index) if self._index is not None else None,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.revalidated) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global URL text cache instance
+url_text_cache = URLTextCache(
+    directory=os.getenv("URL_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "snippetstream_url_cache"),
+    max_bytes=int(os.getenv("URL_CACHE_MAX_BYTES", str(100 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("URL_CACHE_TTL_SECONDS", "3600")),
+    enabled=os.getenv("URL_CACHE_ENABLED", "true").lower() == "true",
+)
@@ -0,0 +1,163 @@
+"""
+URL Ingestion Service
+Fetches user-supplied URLs on one pooled async HTTP client (keep-alive,
+HTTP/2 when available) with per-host concurrency limits and a hard cap on
+how many bytes are read from any response
+"""
+import asyncio
+import codecs
+import importlib.util
+import os
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+# HTTP/2 needs the optional "h2" package (pip install "httpx[http2]")
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+USER_AGENT = "Mozilla/5.0 (compatible; SnippetStream/2.0; +https://snippetstream.app)"
+
+
+class FetchedPage:
+    """Decoded body of a fetched URL plus the response metadata callers need"""
+
+    def __init__(self, url: str, status_code: int, headers: httpx.Headers, text: str, truncated: bool):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+        self.truncated = truncated
+
+
+def _incremental_decoder(encoding: Optional[str]):
+    try:
+        return codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+class URLIngestionService:
+    def __init__(
+        self,
+        timeout_seconds: float = 10.0,
+        max_bytes: int = 2 * 1024 * 1024,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        per_host_limit: int = 4,
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.max_bytes = max_bytes
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.per_host_limit = per_host_limit
+
+        self._client: Optional[httpx.AsyncClient] = None
+        # Semaphores exist only while a host has requests in flight
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._host_in_flight: Dict[str, int] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared client, created on first use inside the running event loop"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                follow_redirects=True,
+                timeout=httpx.Timeout(self.timeout_seconds, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=30.0,
+                ),
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self._client
+
+    async def fetch(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        consumer: Optional[Callable[[str], bool]] = None,
+    ) -> FetchedPage:
+        """GET ``url`` and return its decoded body, reading at most ``max_bytes``.
+
+        The body is streamed and reading stops at the cap (``truncated`` is
+        set), so huge pages never sit in memory whole. With a ``consumer``,
+        each decoded chunk is handed to it instead of being kept (``text``
+        is empty) and reading stops as soon as it returns True, which
+        closes the connection early. HTTP errors other than 304 raise
+        httpx.HTTPStatusError.
+        """
+        host = urlsplit(url).netloc.lower()
+        semaphore = self._acquire_host(host)
+        try:
+            async with semaphore:
+                async with self.client.stream("GET", url, headers=headers) as response:
+                    if response.status_code != 304:
+                        response.raise_for_status()
+
+                    decoder = _incremental_decoder(response.encoding)
+                    parts = []
+                    bytes_read = 0
+                    truncated = False
+                    async for chunk in response.aiter_bytes():
+                        if bytes_read + len(chunk) > self.max_bytes:
+                            chunk = chunk[:self.max_bytes - bytes_read]
+                            truncated = True
+                        bytes_read += len(chunk)
+
+                        text = decoder.decode(chunk, final=truncated)
+                        if consumer is None:
+                            parts.append(text)
+                        elif consumer(text):
+                            break
+                        if truncated:
+                            break
+                    else:
+                        text = decoder.decode(b"", final=True)
+                        if consumer is None:
+                            parts.append(text)
+                        elif text:
+                            consumer(text)
+
+                    return FetchedPage(str(response.url), response.status_code, response.headers, "".join(parts), truncated)
+        finally:
+            self._release_host(host)
+
+    def _acquire_host(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+            self._host_in_flight[host] = 0
+        self._host_in_flight[host] += 1
+        return self._host_semaphores[host]
+
+    def _release_host(self, host: str):
+        self._host_in_flight[host] -= 1
+        if self._host_in_flight[host] == 0:
+            del self._host_in_flight[host]
+            del self._host_semaphores[host]
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def stats(self) -> Dict:
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "client_open": self._client is not None and not self._client.is_closed,
+            "hosts_in_flight": dict(self._host_in_flight),
+            "max_bytes": self.max_bytes,
+            "per_host_limit": self.per_host_limit,
+        }
+
+
+# Global URL ingestion service instance
+url_ingestion = URLIngestionService(
+    timeout_seconds=float(os.getenv("URL_FETCH_TIMEOUT_SECONDS", "10")),
+    max_bytes=int(os.getenv("URL_FETCH_MAX_BYTES", str(2 * 1024 * 1024))),
+    max_connections=int(os.getenv("URL_FETCH_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("URL_FETCH_MAX_KEEPALIVE", "20")),
+    per_host_limit=int(os.getenv("URL_FETCH_PER_HOST_LIMIT", "4")),
+)